@@ -1 +1,9 @@
-from . import agent
\ No newline at end of file
+import importlib
+
+def __getattr__(name):
+    # ADK finds the agent as first_responder_agent.agent. It is imported on first
+    # access rather than with the package, so the backend can import utils,
+    # lexicon and scheduler without paying for google.adk and Vertex AI.
+    if name == "agent":
+        return importlib.import_module(".agent", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
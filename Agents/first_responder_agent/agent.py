@@ -1,65 +1,120 @@
 from google.adk.agents import Agent
+from concurrent.futures import ThreadPoolExecutor, wait
+import asyncio
 from datetime import datetime
 import json
+import logging
 import os
-import threading
 import time
+from .scheduler import scheduler, scheduler_settings
 from .utils import (
-    load_config,
+    get_config,
     send_to_backend,
-    calculate_severity_score,
-    calculate_wellness_scores,
-    update_user_wellness_scores
+    score_severity,
+    score_severity_async,
+    fetch_wellness_buckets,
+    compute_wellness_from_buckets,
+    update_user_wellness_scores,
+    NEUTRAL_WELLNESS_SCORES
 )
 
+logger = logging.getLogger(__name__)
+
 # Load configuration
-config = load_config()
+config = get_config()
 
-def trigger_chat_after_delay(user_id: str, call_id: int, severity_score: int, delay_seconds: int = 10):
+# Shared pool for the independent stages of analyze_call_and_update_wellness
+pipeline_executor = ThreadPoolExecutor(
+    max_workers=config.get("pipeline", {}).get("max_workers", 8),
+    thread_name_prefix="analyze-call"
+)
+
+# Separate, bounded pool for batch scoring so a large batch cannot starve
+# the stages of single /analyze-call requests
+batch_executor = ThreadPoolExecutor(
+    max_workers=config.get("batch", {}).get("max_parallel_scoring", 8),
+    thread_name_prefix="analyze-calls"
+)
+
+def _timed(timings: dict, stage: str, func, *args):
+    """Run one pipeline stage and record its wall time in milliseconds"""
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
+def _call_store_failure(call_id: int, severity_score: int, error: Exception, user_result, timings: dict) -> dict:
     """
-    Trigger chat notification after delay when severity meets threshold
+    Result for a call whose record could not be stored. The wellness scores are not
+    written, since they count this call, but the user's call append runs alongside
+    the store and may have gone through, so the result says which writes did.
     """
-    def delayed_trigger():
-        time.sleep(delay_seconds)
-        try:
-            # Create chat trigger notification
-            chat_trigger_data = {
-                "user_id": user_id,
-                "call_id": call_id,
-                "severity_score": severity_score,
-                "action": "trigger_chat",
-                "timestamp": datetime.now().isoformat(),
-                "message": f"High severity call detected (score: {severity_score}). Support chat available."
-            }
-
-            # Post notification to backend endpoint that frontend polls
-            result = send_to_backend("notifications", chat_trigger_data)
+    return {
+        "status": "error",
+        "error_message": f"Failed to store call record: {str(error)}",
+        "call_id": call_id,
+        "severity_score": severity_score,
+        "call_stored": False,
+        "call_added": isinstance(user_result, dict) and user_result.get("status") == "success",
+        "wellness_updated": False,
+        "stage_timings_ms": timings
+    }
 
-            if result and result.get("status") == "success":
-                print(f"✓ Chat trigger notification sent for user {user_id} after {delay_seconds}s (call {call_id}, severity {severity_score})")
-            else:
-                print(f"✗ Failed to send chat trigger notification for user {user_id}")
+def send_chat_notification(payload: dict):
+    """
+    Scheduled job: post a chat trigger notification to the backend endpoint the frontend polls
+    """
+    chat_trigger_data = {
+        **payload,
+        "action": "trigger_chat",
+        "timestamp": datetime.now().isoformat(),
+        "message": f"High severity call detected (score: {payload['severity_score']}). Support chat available."
+    }
+    result = send_to_backend("notifications", chat_trigger_data)
+    if not result or result.get("status") != "success":
+        # Raising lets the scheduler retry the job
+        raise RuntimeError(f"Failed to send chat trigger notification for user {payload['user_id']}")
+    print(f"✓ Chat trigger notification sent for user {payload['user_id']} (call {payload['call_id']}, severity {payload['severity_score']})")
 
-        except Exception as e:
-            print(f"✗ Error triggering chat notification: {e}")
+# The backend loads this module lazily, possibly after it has started the
+# scheduler with the same settings
+if not scheduler.running:
+    scheduler.configure(**scheduler_settings(config))
+scheduler.register("chat_notification", send_chat_notification)
 
-    # Start delayed trigger in background thread
-    trigger_thread = threading.Thread(target=delayed_trigger)
-    trigger_thread.daemon = True
-    trigger_thread.start()
+def trigger_chat_after_delay(user_id: str, call_id: int, severity_score: int, delay_seconds: int = 10):
+    """
+    Trigger chat notification after delay when severity meets threshold.
+    Scheduled once per call on the shared scheduler rather than a sleeping thread.
+    """
+    scheduler.schedule(
+        "chat_notification",
+        {"user_id": user_id, "call_id": call_id, "severity_score": severity_score},
+        delay_seconds=delay_seconds,
+        job_id=f"chat_notification:{user_id}:{call_id}"
+    )
     print(f"Chat trigger scheduled for user {user_id} in {delay_seconds} seconds")
 
 def analyze_call_and_update_wellness(transcript: str, call_id: int, user_id: str) -> dict:
     """
     Analyze emergency call, calculate severity score, update user call arrays, and recalculate wellness scores.
 
+    Independent stages run concurrently on pipeline_executor:
+      1. severity scoring, the severity bucket fetch and the user call append
+      2. once the score is known: storing the call record while the wellness scores
+         are recomputed; they are saved only after the record is stored
+
+    Severity buckets are fetched before the new call record is stored, so the new
+    call is counted exactly once (via the new severity) in the wellness calculation.
+
     Args:
         transcript: Audio transcript from 911/dispatch call
         call_id: Unique integer call ID that ties to calls table
         user_id: String user ID who responded to this call
 
     Returns:
-        dict: Results including call_id, severity_score, and updated wellness scores
+        dict: Results including call_id, severity_score, updated wellness scores and per-stage timings
     """
     try:
         # Validate inputs
@@ -69,8 +124,21 @@ def analyze_call_and_update_wellness(transcript: str, call_id: int, user_id: str
                 "error_message": "Transcript, call_id, and user_id are required"
             }
 
+        timings = {}
+        pipeline_start = time.perf_counter()
+
+        # Stage 1: nothing here depends on the severity score except the scoring itself
+        score_future = pipeline_executor.submit(
+            _timed, timings, "severity_score", score_severity, transcript, user_id, config)
+        history_future = pipeline_executor.submit(
+            _timed, timings, "fetch_history", fetch_wellness_buckets, user_id)
+        # Add call_id to user's calls array using existing PUT endpoint
+        user_future = pipeline_executor.submit(
+            _timed, timings, "user_update", send_to_backend, f"user/{user_id}",
+            {"callID": call_id, "response": "delta"}, None, "PUT")
+
         # Calculate severity score (1-100) using only transcript
-        severity_score = calculate_severity_score(transcript, user_id, config)
+        severity_score, severity_source = score_future.result()
 
         # Check if severity meets threshold for chat trigger (from config: auto_escalate = 0.78)
         threshold = config.get("thresholds", {}).get("auto_escalate", 0.78)
@@ -83,24 +151,38 @@ def analyze_call_and_update_wellness(transcript: str, call_id: int, user_id: str
             "callID": call_id,
             "transcripts": transcript,
             "severityScore": severity_score,
+            "severitySource": severity_source,
             "date": datetime.now().isoformat(),
             "userID": user_id
         }
-        
-        # Store call in database
-        call_result = send_to_backend("call", call_record)
 
-        # Add call_id to user's calls array using existing PUT endpoint
-        user_call_update = {
-            "callID": call_id
-        }
-        backend_result = send_to_backend(f"user/{user_id}", user_call_update, method="PUT")
+        # Calculate new wellness scores including this call's severity. The buckets
+        # are read before the call is stored, so its severity is not counted twice
+        try:
+            wellness_scores = compute_wellness_from_buckets(
+                history_future.result(), [severity_score] if severity_score else [])
+        except Exception as e:
+            logger.error(f"Failed to calculate wellness scores for user {user_id}: {str(e)}")
+            wellness_scores = dict(NEUTRAL_WELLNESS_SCORES)
+
+        # Stage 2: store the call once its severity buckets have been read
+        call_future = pipeline_executor.submit(
+            _timed, timings, "store_call", send_to_backend, "call", call_record)
 
-        # Calculate new wellness scores including this call's severity
-        wellness_scores = calculate_wellness_scores(user_id, severity_score)
+        # The new wellness scores count this call, so they are saved only once its record is
+        try:
+            call_result = call_future.result()
+        except Exception as e:
+            logger.error(f"Failed to store call {call_id} for user {user_id}: {str(e)}")
+            user_error = user_future.exception()
+            return _call_store_failure(call_id, severity_score, e, user_error or user_future.result(), timings)
+        backend_result = user_future.result()
 
         # Update user's wellness scores in database
-        wellness_result = update_user_wellness_scores(user_id, wellness_scores)
+        wellness_result = _timed(timings, "wellness_update", update_user_wellness_scores, user_id, wellness_scores)
+
+        timings["total"] = round((time.perf_counter() - pipeline_start) * 1000, 1)
+        logger.info(f"Analyzed call {call_id} for user {user_id}, stage timings (ms): {timings}")
 
         return {
             "status": "success",
@@ -109,7 +191,8 @@ def analyze_call_and_update_wellness(transcript: str, call_id: int, user_id: str
             "call_stored": call_result.get("status") == "success",
             "call_added": backend_result.get("status") == "success",
             "wellness_updated": wellness_result.get("status") == "success",
-            "new_wellness_scores": wellness_scores
+            "new_wellness_scores": wellness_scores,
+            "stage_timings_ms": timings
         }
         
     except Exception as e:
@@ -118,6 +201,283 @@ def analyze_call_and_update_wellness(transcript: str, call_id: int, user_id: str
             "error_message": f"Failed to analyze call: {str(e)}"
         }
 
+async def _timed_async(timings: dict, stage: str, awaitable):
+    """Await one pipeline stage and record its wall time in milliseconds"""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
+async def analyze_call_and_update_wellness_async(transcript: str, call_id: int, user_id: str) -> dict:
+    """
+    analyze_call_and_update_wellness for the async (ASGI) serving mode, returning the same result.
+
+    The severity model request is awaited on the event loop, so a request waiting
+    on the LLM holds no thread. The backend stages are short and go through
+    send_to_backend in worker threads, with the same staging as the sync pipeline.
+    """
+    try:
+        # Validate inputs
+        if not transcript or call_id is None or user_id is None:
+            return {
+                "status": "error",
+                "error_message": "Transcript, call_id, and user_id are required"
+            }
+
+        timings = {}
+        pipeline_start = time.perf_counter()
+
+        # Stage 1: scoring, the severity bucket fetch and the user call append
+        history_task = asyncio.create_task(_timed_async(
+            timings, "fetch_history", asyncio.to_thread(fetch_wellness_buckets, user_id)))
+        user_task = asyncio.create_task(_timed_async(
+            timings, "user_update", asyncio.to_thread(
+                send_to_backend, f"user/{user_id}", {"callID": call_id, "response": "delta"}, None, "PUT")))
+        severity_score, severity_source = await _timed_async(
+            timings, "severity_score", score_severity_async(transcript, user_id, config))
+
+        # Check if severity meets threshold for chat trigger (from config: auto_escalate = 0.78)
+        threshold = config.get("thresholds", {}).get("auto_escalate", 0.78)
+        if severity_score / 100.0 >= threshold:
+            await asyncio.to_thread(trigger_chat_after_delay, user_id, call_id, severity_score, 10)
+
+        call_record = {
+            "callID": call_id,
+            "transcripts": transcript,
+            "severityScore": severity_score,
+            "severitySource": severity_source,
+            "date": datetime.now().isoformat(),
+            "userID": user_id
+        }
+
+        # The buckets are read before the call is stored, so its severity is not counted twice
+        try:
+            wellness_scores = compute_wellness_from_buckets(
+                await history_task, [severity_score] if severity_score else [])
+        except Exception as e:
+            logger.error(f"Failed to calculate wellness scores for user {user_id}: {str(e)}")
+            wellness_scores = dict(NEUTRAL_WELLNESS_SCORES)
+
+        # Stage 2: store the call once its severity buckets have been read
+        call_task = asyncio.create_task(_timed_async(
+            timings, "store_call", asyncio.to_thread(send_to_backend, "call", call_record)))
+
+        # The new wellness scores count this call, so they are saved only once its record is
+        try:
+            call_result = await call_task
+        except Exception as e:
+            logger.error(f"Failed to store call {call_id} for user {user_id}: {str(e)}")
+            user_result, = await asyncio.gather(user_task, return_exceptions=True)
+            return _call_store_failure(call_id, severity_score, e, user_result, timings)
+        backend_result = await user_task
+
+        wellness_result = await _timed_async(
+            timings, "wellness_update", asyncio.to_thread(update_user_wellness_scores, user_id, wellness_scores))
+
+        timings["total"] = round((time.perf_counter() - pipeline_start) * 1000, 1)
+        logger.info(f"Analyzed call {call_id} for user {user_id}, stage timings (ms): {timings}")
+
+        return {
+            "status": "success",
+            "call_id": call_id,
+            "severity_score": severity_score,
+            "call_stored": call_result.get("status") == "success",
+            "call_added": backend_result.get("status") == "success",
+            "wellness_updated": wellness_result.get("status") == "success",
+            "new_wellness_scores": wellness_scores,
+            "stage_timings_ms": timings
+        }
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": f"Failed to analyze call: {str(e)}"
+        }
+
+def analyze_calls_and_update_wellness(calls: list) -> dict:
+    """
+    Analyze a batch of emergency calls, store them in bulk and recalculate wellness once per affected user.
+
+    Transcripts are scored with bounded parallelism (sharing the score cache and
+    request coalescing of single-call scoring). Call records are written with one
+    batch insert, user call arrays with one bulk update, and each affected user's
+    wellness scores are recomputed once from their history plus all of their new calls
+    whose records were stored.
+
+    Args:
+        calls: List of {"transcript": str, "call_id": int, "user_id": str}
+
+    Returns:
+        dict: Per-item results in request order plus the new wellness scores per user
+    """
+    try:
+        if not isinstance(calls, list) or not calls:
+            return {
+                "status": "error",
+                "error_message": "calls must be a non-empty list"
+            }
+
+        max_items = config.get("batch", {}).get("max_items", 500)
+        if len(calls) > max_items:
+            return {
+                "status": "error",
+                "error_message": f"Batch of {len(calls)} calls exceeds the limit of {max_items}"
+            }
+
+        timings = {}
+        pipeline_start = time.perf_counter()
+
+        # Validate inputs
+        results = []
+        valid = []
+        for index, call in enumerate(calls):
+            call = call if isinstance(call, dict) else {}
+            transcript, call_id, user_id = call.get("transcript"), call.get("call_id"), call.get("user_id")
+            item = {"index": index, "call_id": call_id, "user_id": user_id}
+            if not transcript or call_id is None or user_id is None:
+                item.update(status="error", error_message="Transcript, call_id, and user_id are required")
+            else:
+                valid.append((item, transcript))
+            results.append(item)
+
+        user_ids = list(dict.fromkeys(item["user_id"] for item, _ in valid))
+
+        # Fetch each affected user's severity buckets while the batch is being scored,
+        # before any new record is stored
+        stage_start = time.perf_counter()
+        history_futures = {
+            user_id: pipeline_executor.submit(fetch_wellness_buckets, user_id) for user_id in user_ids
+        }
+        score_futures = [
+            batch_executor.submit(score_severity, transcript, item["user_id"], config)
+            for item, transcript in valid
+        ]
+
+        threshold = config.get("thresholds", {}).get("auto_escalate", 0.78)
+        call_records = []
+        scored = []
+        for (item, transcript), future in zip(valid, score_futures):
+            try:
+                severity_score, severity_source = future.result()
+            except Exception as e:
+                item.update(status="error", error_message=f"Failed to score call: {str(e)}")
+                continue
+
+            item["severity_score"] = severity_score
+            if severity_score / 100.0 >= threshold:
+                trigger_chat_after_delay(item["user_id"], item["call_id"], severity_score, delay_seconds=10)
+
+            call_records.append({
+                "callID": item["call_id"],
+                "transcripts": transcript,
+                "severityScore": severity_score,
+                "severitySource": severity_source,
+                "date": datetime.now().isoformat(),
+                "userID": item["user_id"]
+            })
+            scored.append(item)
+        timings["severity_score"] = round((time.perf_counter() - stage_start) * 1000, 1)
+
+        if scored:
+            # The severity buckets must be read before any new call is stored, or
+            # its severity would be counted twice
+            wait(history_futures.values())
+
+            # Store all call records in one bulk write; only the stored ones are then
+            # appended to their users' call histories
+            calls_future = pipeline_executor.submit(
+                _timed, timings, "store_calls", send_to_backend, "calls", {"calls": call_records})
+
+            # Wellness counts only the new calls whose records were stored
+            try:
+                stored = calls_future.result().get("results", [])
+            except Exception as e:
+                logger.error(f"Failed to store batch of {len(call_records)} calls: {str(e)}")
+                stored = []
+            for position, item in enumerate(scored):
+                item["call_stored"] = position < len(stored) and stored[position].get("status") == "success"
+
+            stored_records = [record for record, item in zip(call_records, scored) if item["call_stored"]]
+            users_future = None
+            if stored_records:
+                users_future = pipeline_executor.submit(
+                    _timed, timings, "user_update", send_to_backend, "users/calls",
+                    {"updates": [
+                        {"userID": record["userID"], "callID": record["callID"], "date": record["date"]}
+                        for record in stored_records
+                    ]},
+                    None, "PUT")
+
+            # Recalculate wellness once per user with all of their stored new calls counted
+            stage_start = time.perf_counter()
+            new_calls_by_user = {}
+            for item in scored:
+                if item["call_stored"]:
+                    new_calls_by_user.setdefault(item["user_id"], []).append(item["severity_score"])
+
+            wellness_futures = {}
+            new_wellness_scores = {}
+            for user_id, new_calls in new_calls_by_user.items():
+                try:
+                    wellness_scores = compute_wellness_from_buckets(history_futures[user_id].result(), new_calls)
+                except Exception as e:
+                    logger.error(f"Failed to calculate wellness scores for user {user_id}: {str(e)}")
+                    wellness_scores = dict(NEUTRAL_WELLNESS_SCORES)
+                new_wellness_scores[user_id] = wellness_scores
+                wellness_futures[user_id] = pipeline_executor.submit(
+                    update_user_wellness_scores, user_id, wellness_scores)
+
+            wellness_updated = {}
+            for user_id, future in wellness_futures.items():
+                try:
+                    wellness_updated[user_id] = future.result().get("status") == "success"
+                except Exception:
+                    wellness_updated[user_id] = False
+            timings["wellness_update"] = round((time.perf_counter() - stage_start) * 1000, 1)
+
+            users_error = None
+            try:
+                users_result = users_future.result() if users_future else {}
+            except Exception as e:
+                logger.error(f"Failed to add batch of {len(stored_records)} calls to users: {str(e)}")
+                users_result = {}
+                users_error = f"Failed to add call to user: {str(e)}"
+            added_users = users_result.get("users", {})
+
+            for item in scored:
+                item.update(
+                    status="success" if item["call_stored"] else "error",
+                    call_added=str(item["call_id"]) in map(str, added_users.get(item["user_id"], [])),
+                    wellness_updated=item["call_stored"] and wellness_updated.get(item["user_id"], False)
+                )
+                if not item["call_stored"]:
+                    item["error_message"] = "Call record was not stored"
+                elif users_error:
+                    item["error_message"] = users_error
+        else:
+            new_wellness_scores = {}
+
+        timings["total"] = round((time.perf_counter() - pipeline_start) * 1000, 1)
+        logger.info(f"Analyzed batch of {len(calls)} calls for {len(user_ids)} users, stage timings (ms): {timings}")
+
+        succeeded = sum(1 for item in results if item["status"] == "success")
+        return {
+            "status": "success",
+            "processed": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": results,
+            "new_wellness_scores": new_wellness_scores,
+            "stage_timings_ms": timings
+        }
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": f"Failed to analyze calls: {str(e)}"
+        }
+
 def push_notification_based_on_severity(user_id: str, severity_score: int) -> dict:
     """
     Push notification to user based on severity score monitoring.
@@ -187,7 +547,7 @@ def push_notification_based_on_severity(user_id: str, severity_score: int) -> di
             "error_message": f"Failed to push notification: {str(e)}"
         }
 
-# Create the root agent with only these two functions
+# Create the root agent with the call analysis and notification functions
 root_agent = Agent(
     name="first_responder_call_analyzer",
     model="gemini-2.0-flash",
@@ -195,7 +555,7 @@ root_agent = Agent(
     instruction="""
     I am a specialized agent for first responder call analysis and notification management. I have two main functions:
 
-    1. **Call Analysis**: I analyze 911/dispatch call transcripts to calculate severity scores (1-100), store call records, update user call arrays, and recalculate wellness scores for all involved responders.
+    1. **Call Analysis**: I analyze 911/dispatch call transcripts to calculate severity scores (1-100), store call records, update user call arrays, and recalculate wellness scores for all involved responders. For a shift's worth of calls I use the batch tool, which scores them in parallel and updates each responder's wellness once.
 
     2. **Severity Notifications**: I push appropriate notifications to users based on severity score thresholds:
        - Critical (80-100): High-priority notifications encouraging immediate support
@@ -207,6 +567,7 @@ root_agent = Agent(
     """,
     tools=[
         analyze_call_and_update_wellness,
+        analyze_calls_and_update_wellness,
         push_notification_based_on_severity
     ]
 )
\ No newline at end of file
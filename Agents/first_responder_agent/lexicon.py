@@ -0,0 +1,195 @@
+import re
+import threading
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+# A single keyword hit: the lexicon term, the category it belongs to and its span in the text
+LexiconMatch = namedtuple("LexiconMatch", ["term", "category", "start", "end"])
+
+# Boundary modes:
+#   word      - the term must start and end on a word boundary ("fire" matches "fire", not "firefighter")
+#   prefix    - the term must start on a word boundary ("child" matches "children", not "grandchild")
+#   substring - plain substring match anywhere in the text
+MATCH_MODES = ("word", "prefix", "substring")
+
+def _trie_pattern(node: Dict) -> Optional[str]:
+    """
+    Render a character trie as a regex so that every term shares the prefix it
+    has in common with others. Scanning cost then depends on term length rather
+    than on the number of terms, unlike a flat "a|b|c" alternation.
+    """
+    terminal = "" in node
+    children = sorted(char for char in node if char)
+    if not children:
+        return None
+
+    branches = []
+    single_chars = []
+    for char in children:
+        sub_pattern = _trie_pattern(node[char])
+        if sub_pattern is None:
+            single_chars.append(re.escape(char))
+        else:
+            branches.append(re.escape(char) + sub_pattern)
+
+    if single_chars:
+        branches.append(single_chars[0] if len(single_chars) == 1 else f"[{''.join(single_chars)}]")
+
+    pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    if terminal:
+        # Greedy optional group: the longest term wins, shorter ones are found via prefix_terms
+        pattern = f"(?:{pattern})?"
+    return pattern
+
+class Lexicon:
+    """
+    Keyword lexicon compiled once into a single trie-shaped regex.
+
+    scan() makes one pass over the text and returns every category hit with its
+    position, including terms that overlap or are prefixes of one another
+    ("end it" inside "end it all").
+    """
+
+    def __init__(self, categories: Dict[str, List[str]], match_mode: str = "prefix"):
+        if match_mode not in MATCH_MODES:
+            raise ValueError(f"match_mode must be one of {MATCH_MODES}, got {match_mode!r}")
+        self.match_mode = match_mode
+
+        # Lower-cased term -> categories it belongs to
+        self.categories = {}
+        for category, terms in categories.items():
+            for term in terms:
+                term = term.lower().strip()
+                if term:
+                    self.categories.setdefault(term, [])
+                    if category not in self.categories[term]:
+                        self.categories[term].append(category)
+
+        self._trie = {}
+        for term in self.categories:
+            node = self._trie
+            for char in term:
+                node = node.setdefault(char, {})
+            node[""] = True
+
+        # Shorter terms that a longer match also contains at the same start position,
+        # found by walking each term's path through the trie
+        self.prefix_terms = {}
+        for term in self.categories:
+            node = self._trie
+            prefixes = []
+            for length, char in enumerate(term[:-1], 1):
+                node = node[char]
+                if "" in node:
+                    prefixes.append(term[:length])
+            self.prefix_terms[term] = prefixes[::-1]
+
+        self._pattern = self._compile()
+
+    def _compile(self):
+        body = _trie_pattern(self._trie)
+        if body is None:
+            return None
+
+        start = "" if self.match_mode == "substring" else r"(?<!\w)"
+        end = r"(?!\w)" if self.match_mode == "word" else ""
+        # Zero-width lookahead so matches starting inside an earlier match are still found
+        return re.compile(f"(?=({start}{body}{end}))", re.IGNORECASE)
+
+    def _ends_on_boundary(self, text: str, end: int) -> bool:
+        if self.match_mode != "word" or end >= len(text):
+            return True
+        char = text[end]
+        return not (char.isalnum() or char == "_")
+
+    def _resolve(self, matched: str) -> Optional[str]:
+        """
+        The compiled term a case-insensitive hit stands for. re.IGNORECASE also folds
+        characters such as "ſ" to "s", so the hit lower-cased is not always a term;
+        those are resolved by walking the trie one matched character at a time.
+        """
+        term = matched.lower()
+        if term in self.categories:
+            return term
+
+        node = self._trie
+        chars = []
+        for char in matched:
+            key = char.lower() if char.lower() in node else next(
+                (key for key in node if key and re.fullmatch(re.escape(key), char, re.IGNORECASE)), None)
+            if key is None:
+                return None
+            chars.append(key)
+            node = node[key]
+        return "".join(chars) if "" in node else None
+
+    def scan(self, text: str) -> List[LexiconMatch]:
+        """All term hits in text, ordered by position"""
+        if not text or self._pattern is None:
+            return []
+
+        matches = []
+        for hit in self._pattern.finditer(text):
+            start = hit.start(1)
+            term = self._resolve(hit.group(1))
+            if term is None:
+                continue
+            for found in [term] + self.prefix_terms.get(term, []):
+                end = start + len(found)
+                if found is not term and not self._ends_on_boundary(text, end):
+                    continue
+                for category in self.categories.get(found, ()):
+                    matches.append(LexiconMatch(found, category, start, end))
+        return matches
+
+    def find(self, text: str) -> Dict[str, List[str]]:
+        """Distinct matched terms per category, in order of first appearance"""
+        found = {}
+        for match in self.scan(text):
+            terms = found.setdefault(match.category, [])
+            if match.term not in terms:
+                terms.append(match.term)
+        return found
+
+    def __len__(self):
+        return len(self.categories)
+
+def build_severity_lexicon(config: Dict) -> Lexicon:
+    """Lexicon of transcript keywords used by first-tier triage and keyword fallback scoring"""
+    return Lexicon(
+        {
+            "high_risk": config.get("high_risk_keywords", []),
+            "low_risk": config.get("triage", {}).get("low_risk_keywords", [])
+        },
+        match_mode=config.get("lexicon", {}).get("match_mode", "prefix")
+    )
+
+def build_chat_lexicon(config: Dict) -> Lexicon:
+    """Lexicon of chat keyword lists and mental health indicator tiers"""
+    categories = dict(config.get("chat_keywords", {}))
+    for tier, terms in config.get("mental_health_indicators", {}).items():
+        categories[f"indicator_{tier}"] = terms
+    return Lexicon(categories, match_mode=config.get("lexicon", {}).get("match_mode", "prefix"))
+
+_BUILDERS = {
+    "severity": build_severity_lexicon,
+    "chat": build_chat_lexicon
+}
+
+_lexicons = {}
+_lexicons_lock = threading.Lock()
+
+def get_lexicon(name: str, config: Dict) -> Lexicon:
+    """
+    Return the compiled lexicon for name ("severity" or "chat"), compiling it on
+    first use and again only when a different config object is passed (e.g. after
+    the config is reloaded).
+    """
+    cached = _lexicons.get(name)
+    if cached is None or cached[0] is not config:
+        with _lexicons_lock:
+            cached = _lexicons.get(name)
+            if cached is None or cached[0] is not config:
+                cached = (config, _BUILDERS[name](config))
+                _lexicons[name] = cached
+    return cached[1]
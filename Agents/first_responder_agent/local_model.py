@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Local CPU severity model: hashed word n-gram TF-IDF features and a ridge
+# regression fitted to model-assigned severity scores. Used by the keyword
+# fallback when Vertex AI is unavailable; needs nothing but NumPy.
+#
+# A trained model is a directory of
+#   weights-<version>.npy - float32 regression weights, one per hashed feature
+#   idf-<version>.npy     - float32 inverse document frequencies, one per hashed feature
+#   meta.json             - the version's file names, feature settings, intercept
+#                           and training metrics
+# The .npy files are memory-mapped on load, so loading is near-instant and
+# forked workers share the pages. A save never rewrites a file that a running
+# process may have mapped: it writes a new version and then atomically replaces
+# meta.json to point at it.
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+def hashed_ngrams(text: str, n_features: int, ngram_range: Tuple[int, int]) -> List[int]:
+    """Feature indices of the text's word n-grams; crc32 is stable across processes, unlike hash()"""
+    tokens = _TOKEN.findall(text.lower())
+    indices = []
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        for start in range(len(tokens) - n + 1):
+            indices.append(zlib.crc32(" ".join(tokens[start:start + n]).encode("utf-8")) % n_features)
+    return indices
+
+def term_counts(texts: Sequence[str], n_features: int, ngram_range: Tuple[int, int]):
+    """
+    Sparse hashed n-gram counts in CSR form: (indptr, indices, counts), where the
+    features of row i are indices[indptr[i]:indptr[i + 1]], each listed once
+    """
+    indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+    row_indices = []
+    row_counts = []
+    for row, text in enumerate(texts):
+        features, counts = np.unique(np.array(hashed_ngrams(text or "", n_features, ngram_range), dtype=np.int64),
+                                     return_counts=True)
+        row_indices.append(features)
+        row_counts.append(counts)
+        indptr[row + 1] = indptr[row] + len(features)
+    if not texts:
+        return indptr, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+    return indptr, np.concatenate(row_indices), np.concatenate(row_counts).astype(np.float64)
+
+def tfidf_values(indptr: np.ndarray, indices: np.ndarray, counts: np.ndarray, idf: np.ndarray):
+    """Sublinear TF-IDF values for CSR counts, L2-normalized per row. Returns (row of each value, values)."""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    values = (1.0 + np.log(counts)) * idf[indices]
+    norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(indptr) - 1))
+    norms[norms == 0] = 1.0
+    return rows, values / norms[rows]
+
+class LocalSeverityModel:
+    def __init__(self, weights: np.ndarray, idf: np.ndarray, intercept: float,
+                 ngram_range: Tuple[int, int] = (1, 2), meta: Optional[Dict] = None):
+        self.weights = weights
+        self.idf = idf
+        self.intercept = intercept
+        self.ngram_range = tuple(ngram_range)
+        self.meta = meta or {}
+
+    @property
+    def n_features(self) -> int:
+        return len(self.weights)
+
+    def predict(self, transcripts: Sequence[str]) -> np.ndarray:
+        """Raw (unclamped) predicted severities for a batch of transcripts"""
+        indptr, indices, counts = term_counts(transcripts, self.n_features, self.ngram_range)
+        rows, values = tfidf_values(indptr, indices, counts, self.idf)
+        return np.bincount(rows, weights=values * self.weights[indices], minlength=len(transcripts)) + self.intercept
+
+    def score(self, transcripts: Sequence[str]) -> np.ndarray:
+        """Severity scores (1-100 integers) for a batch of transcripts, in one vectorized pass"""
+        return np.clip(np.rint(self.predict(transcripts)), 1, 100).astype(np.int64)
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        files = {"weights_file": f"weights-{version}.npy", "idf_file": f"idf-{version}.npy"}
+        np.save(os.path.join(path, files["weights_file"]), self.weights.astype(np.float32))
+        np.save(os.path.join(path, files["idf_file"]), self.idf.astype(np.float32))
+        meta = {
+            **self.meta,
+            **files,
+            "n_features": self.n_features,
+            "ngram_range": list(self.ngram_range),
+            "intercept": self.intercept
+        }
+        # meta.json is replaced last and atomically; its mtime tells loaders a new model is in place
+        temp_path = os.path.join(path, f".meta-{version}.json")
+        with open(temp_path, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(temp_path, os.path.join(path, "meta.json"))
+
+        # Earlier versions are no longer referenced. Processes that still have them
+        # mapped keep reading them until they reload, since unlinking a mapped file
+        # leaves its pages in place.
+        for name in os.listdir(path):
+            if name.endswith(".npy") and name not in files.values():
+                try:
+                    os.remove(os.path.join(path, name))
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "LocalSeverityModel":
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        return cls(
+            weights=np.load(os.path.join(path, meta.get("weights_file", "weights.npy")), mmap_mode=mode),
+            idf=np.load(os.path.join(path, meta.get("idf_file", "idf.npy")), mmap_mode=mode),
+            intercept=meta["intercept"],
+            ngram_range=tuple(meta["ngram_range"]),
+            meta=meta
+        )
+
+def _ridge_cg(rows, indices, values, n_rows, n_features, target, alpha, max_iter, tol):
+    """
+    Solve (X^T X + alpha I) w = X^T target by conjugate gradients, with X given as
+    (rows, indices, values) triplets. Each iteration is two bincount passes over
+    the non-zeros, so the dense n_features x n_features system is never built.
+    """
+    def matvec(w):
+        projected = np.bincount(rows, weights=values * w[indices], minlength=n_rows)
+        return np.bincount(indices, weights=values * projected[rows], minlength=n_features) + alpha * w
+
+    b = np.bincount(indices, weights=values * target[rows], minlength=n_features)
+    w = np.zeros(n_features)
+    residual = b.copy()
+    direction = residual.copy()
+    rs_old = residual @ residual
+    threshold = tol * tol * max(rs_old, 1e-30)
+    for _ in range(max_iter):
+        if rs_old <= threshold:
+            break
+        step = matvec(direction)
+        a = rs_old / (direction @ step)
+        w += a * direction
+        residual -= a * step
+        rs_new = residual @ residual
+        direction = residual + (rs_new / rs_old) * direction
+        rs_old = rs_new
+    return w
+
+def fit(transcripts: Sequence[str], scores: Sequence[float], n_features: int = 2 ** 18,
+        ngram_range: Tuple[int, int] = (1, 2), alpha: float = 1.0, max_iter: int = 200,
+        tol: float = 1e-6) -> LocalSeverityModel:
+    """Fit a model to transcripts and their (model-assigned) severity scores"""
+    target = np.asarray(scores, dtype=np.float64)
+    indptr, indices, counts = term_counts(transcripts, n_features, ngram_range)
+    n_rows = len(transcripts)
+
+    document_frequency = np.bincount(indices, minlength=n_features)
+    idf = np.log((1.0 + n_rows) / (1.0 + document_frequency)) + 1.0
+    rows, values = tfidf_values(indptr, indices, counts, idf)
+
+    intercept = float(target.mean()) if n_rows else 50.0
+    weights = _ridge_cg(rows, indices, values, n_rows, n_features, target - intercept, alpha, max_iter, tol)
+    return LocalSeverityModel(weights, idf, intercept, ngram_range, meta={
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "samples": n_rows,
+        "alpha": alpha
+    })
+
+def evaluate(model: LocalSeverityModel, transcripts: Sequence[str], scores: Sequence[float]) -> Dict:
+    """Mean absolute error and within-10-points rate of the model against reference scores"""
+    if not transcripts:
+        return {"samples": 0}
+    errors = np.abs(model.score(transcripts) - np.asarray(scores, dtype=np.float64))
+    return {
+        "samples": len(transcripts),
+        "mean_abs_error": round(float(errors.mean()), 2),
+        "within_10": round(float((errors <= 10).mean()), 4)
+    }
+
+def train(transcripts: Sequence[str], scores: Sequence[float], validation_fraction: float = 0.2,
+          seed: int = 0, **settings) -> Tuple[LocalSeverityModel, Dict]:
+    """
+    Fit on a random split, report held-out metrics, then refit on everything.
+    Returns (model fitted on all samples, held-out metrics).
+    """
+    order = np.random.default_rng(seed).permutation(len(transcripts))
+    holdout = int(len(transcripts) * validation_fraction)
+    metrics = {}
+    if holdout:
+        held, kept = order[:holdout], order[holdout:]
+        trial = fit([transcripts[i] for i in kept], [scores[i] for i in kept], **settings)
+        metrics = evaluate(trial, [transcripts[i] for i in held], [scores[i] for i in held])
+
+    model = fit(transcripts, scores, **settings)
+    model.meta["validation"] = metrics
+    return model, metrics
+
+# Worker-process state for score_in_processes
+_worker_model = None
+
+def _load_worker_model(path: str):
+    global _worker_model
+    _worker_model = LocalSeverityModel.load(path)
+
+def _score_chunk(transcripts: List[str]) -> List[int]:
+    return _worker_model.score(transcripts).tolist()
+
+def score_in_processes(transcripts: Sequence[str], path: str, workers: int = 4,
+                       chunk_size: int = 2048) -> List[int]:
+    """
+    Score a large backfill across worker processes. Each worker memory-maps the
+    saved model once; chunks are scored in vectorized batches and returned in order.
+    """
+    chunks = [list(transcripts[start:start + chunk_size]) for start in range(0, len(transcripts), chunk_size)]
+    scores = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_load_worker_model, initargs=(path,)) as executor:
+        for chunk_scores in executor.map(_score_chunk, chunks):
+            scores.extend(chunk_scores)
+    return scores
@@ -0,0 +1,304 @@
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def _utc(dt: datetime) -> datetime:
+    # Mongo hands back naive datetimes that are already UTC
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+class InMemoryJobStore:
+    """
+    Job store used when no persistent store is configured (standalone agent).
+    Jobs do not survive a restart, and are dropped once they are done or have
+    failed so a long-running agent does not accumulate them.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def add(self, job: Dict) -> bool:
+        """Store a new job; returns False if a job with the same id already exists"""
+        with self._lock:
+            if job["_id"] in self._jobs:
+                return False
+            self._jobs[job["_id"]] = dict(job)
+            return True
+
+    def claim(self, job_id: str) -> Optional[Dict]:
+        """Atomically move a pending job to running; returns it, or None if someone else has it"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job["status"] != "pending":
+                return None
+            job.update(status="running", claimed_at=datetime.now(timezone.utc))
+            return dict(job)
+
+    def complete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def retry(self, job_id: str, run_at: datetime, error: str):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(status="pending", run_at=run_at, last_error=error, attempts=job.get("attempts", 0) + 1)
+
+    def fail(self, job_id: str, error: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def pending(self, before: datetime) -> List[Dict]:
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()
+                    if job["status"] == "pending" and _utc(job["run_at"]) <= before]
+
+    def recover(self, stale_after: timedelta) -> int:
+        """Return jobs stuck in running (their worker died) to pending"""
+        cutoff = datetime.now(timezone.utc) - stale_after
+        recovered = 0
+        with self._lock:
+            for job in self._jobs.values():
+                if job["status"] == "running" and _utc(job["claimed_at"]) < cutoff:
+                    job["status"] = "pending"
+                    recovered += 1
+        return recovered
+
+class Scheduler:
+    """
+    Process-wide timer scheduler.
+
+    One thread keeps due times in a heap and hands jobs to a bounded worker pool,
+    replacing a sleeping thread per delayed action. Jobs are written to the job
+    store when scheduled and claimed atomically before running, so a persistent
+    store lets pending jobs survive restarts and keeps several worker processes
+    from firing the same job. The store is also polled periodically for jobs
+    that another process scheduled.
+    """
+
+    def __init__(self, store=None, max_workers: int = 4, poll_interval: float = 30,
+                 max_attempts: int = 3, retry_delay: float = 30, stale_after: float = 600):
+        self.store = store or InMemoryJobStore()
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.stale_after = timedelta(seconds=stale_after)
+
+        self._handlers = {}
+        self._heap = []
+        self._known = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._stopped = False
+
+        self.fired = 0
+        self.failed = 0
+        self.retried = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def configure(self, store=None, **settings):
+        """Swap the job store or change settings; only allowed before start()"""
+        if self.running:
+            raise RuntimeError("Scheduler is already running")
+        if store is not None:
+            self.store = store
+        for name, value in settings.items():
+            if name == "stale_after":
+                value = timedelta(seconds=value)
+            setattr(self, name, value)
+
+    def register(self, kind: str, handler: Callable[[Dict], None]):
+        """Register the handler that runs jobs of this kind, called as handler(payload)"""
+        self._handlers[kind] = handler
+
+    def schedule(self, kind: str, payload: Dict, delay_seconds: float = 0, job_id: Optional[str] = None) -> str:
+        """
+        Schedule a job. A job_id makes scheduling idempotent: scheduling the same id
+        again while it exists in the store is a no-op.
+        """
+        self.start()
+        job = {
+            "_id": job_id or uuid.uuid4().hex,
+            "kind": kind,
+            "payload": payload,
+            "run_at": datetime.now(timezone.utc) + timedelta(seconds=delay_seconds),
+            "status": "pending",
+            "attempts": 0
+        }
+        # Jobs due after the next poll (e.g. day-long follow-ups) stay in the store until then
+        if self.store.add(job) and delay_seconds <= self.poll_interval:
+            self._push(job)
+        return job["_id"]
+
+    def start(self):
+        """Start the timer thread and recover jobs left over from a previous run"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            # Recover before the first poll so interrupted jobs are loaded with the due ones
+            try:
+                recovered = self.store.recover(self.stale_after)
+                if recovered:
+                    logger.info(f"Recovered {recovered} interrupted scheduled jobs")
+            except Exception as e:
+                logger.error(f"Failed to recover scheduled jobs: {str(e)}")
+
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scheduler")
+            self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def shutdown(self, wait: bool = True):
+        """Stop the timer thread. Pending jobs stay in the store for the next start."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def _reset_after_fork(self):
+        # Threads do not survive fork: a forked worker starts its own timer
+        # thread and pool, and reloads its pending jobs from the store
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._stopped = False
+        self._heap = []
+        self._known = set()
+
+    def _push(self, job: Dict):
+        with self._cond:
+            if job["_id"] in self._known:
+                return
+            self._known.add(job["_id"])
+            heapq.heappush(self._heap, (_utc(job["run_at"]).timestamp(), job["_id"], job["kind"]))
+            self._cond.notify_all()
+
+    def _load_due(self):
+        """Pick up pending jobs due before the next poll, including ones restored from the store"""
+        horizon = datetime.now(timezone.utc) + timedelta(seconds=self.poll_interval)
+        try:
+            for job in self.store.pending(horizon):
+                self._push(job)
+        except Exception as e:
+            logger.error(f"Failed to load scheduled jobs: {str(e)}")
+
+    def _run(self):
+        next_poll = 0
+        while True:
+            now = time.time()
+            if now >= next_poll:
+                self._load_due()
+                next_poll = now + self.poll_interval
+
+            with self._cond:
+                if self._stopped:
+                    return
+                if self._heap and self._heap[0][0] <= time.time():
+                    _, job_id, _ = heapq.heappop(self._heap)
+                    self._known.discard(job_id)
+                    self._executor.submit(self._execute, job_id)
+                    continue
+                timeout = next_poll - time.time()
+                if self._heap:
+                    timeout = min(timeout, self._heap[0][0] - time.time())
+                self._cond.wait(max(timeout, 0))
+
+    def _execute(self, job_id: str):
+        job = self.store.claim(job_id)
+        if job is None:
+            return  # already run by another worker or process
+
+        handler = self._handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind {job['kind']}")
+            handler(job["payload"])
+            self.store.complete(job_id)
+            self.fired += 1
+        except Exception as e:
+            attempts = job.get("attempts", 0) + 1
+            if attempts < self.max_attempts and handler is not None:
+                run_at = datetime.now(timezone.utc) + timedelta(seconds=self.retry_delay * attempts)
+                self.store.retry(job_id, run_at, str(e))
+                self._push({**job, "run_at": run_at})
+                self.retried += 1
+                logger.warning(f"Scheduled job {job_id} ({job['kind']}) failed, retrying: {str(e)}")
+            else:
+                self.store.fail(job_id, str(e))
+                self.failed += 1
+                logger.error(f"Scheduled job {job_id} ({job['kind']}) failed: {str(e)}")
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "queued": len(self._heap),
+                "fired": self.fired,
+                "retried": self.retried,
+                "failed": self.failed,
+                "max_workers": self.max_workers
+            }
+
+def scheduler_settings(config: Dict) -> Dict:
+    """Scheduler constructor settings from the config.json "scheduler" section"""
+    section = config.get("scheduler", {})
+    names = {
+        "max_workers": "max_workers",
+        "poll_interval_seconds": "poll_interval",
+        "max_attempts": "max_attempts",
+        "retry_delay_seconds": "retry_delay",
+        "stale_after_seconds": "stale_after"
+    }
+    return {names[key]: value for key, value in section.items() if key in names}
+
+# Process-wide scheduler shared by the agent and the backend
+scheduler = Scheduler()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=scheduler._reset_after_fork)
+
+_RULE = re.compile(r'^\s*if\s+score\s*(>=|<=|>|<|==)\s*([0-9.]+)\s*$')
+_COMPARISONS = {
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    "==": lambda a, b: a == b
+}
+
+def follow_up_delays(follow_ups: Dict, score: float) -> Dict[str, timedelta]:
+    """
+    Evaluate the config.json followUps rules for a call, e.g.
+    {"day1": true, "day3": true, "day7": "if score>0.6"}, where score is the call's
+    severity on the 0-1 threshold scale. Returns {rule name: delay} for the follow-ups to send.
+    """
+    delays = {}
+    for name, rule in follow_ups.items():
+        day = re.match(r'^day(\d+)$', name)
+        if not day:
+            logger.warning(f"Ignoring follow-up rule with unrecognized name: {name}")
+            continue
+
+        if isinstance(rule, bool):
+            applies = rule
+        else:
+            condition = _RULE.match(str(rule))
+            if not condition:
+                logger.warning(f"Ignoring follow-up rule {name} with unrecognized condition: {rule}")
+                continue
+            applies = _COMPARISONS[condition.group(1)](score, float(condition.group(2)))
+
+        if applies:
+            delays[name] = timedelta(days=int(day.group(1)))
+    return delays
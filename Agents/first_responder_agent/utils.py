@@ -1,10 +1,26 @@
+import asyncio
+import fnmatch
+import hashlib
+import heapq
 import json
 import os
+import random
+import re
 import requests
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from .lexicon import get_lexicon
 
 # Load environment variables from the agent's .env file
 agent_dir = os.path.dirname(__file__)
@@ -25,19 +41,53 @@ def load_config() -> Dict:
         logger.error("config.json not found")
         return {}
 
-def send_to_backend(endpoint: str, data: Dict, backend_url: str = None, method: str = "POST") -> Dict:
-    """Send data to backend API endpoint"""
-    try:
-        config = load_config()
-        base_url = backend_url or config.get('backend_url', 'http://localhost:8000')
+_config_cache: Optional[Dict] = None
+_config_lock = threading.Lock()
 
-        # Ensure endpoint starts with /
-        if not endpoint.startswith('/'):
-            endpoint = '/' + endpoint
+def get_config() -> Dict:
+    """Return the process-wide config, reading config.json only on first use"""
+    global _config_cache
+    if _config_cache is None:
+        with _config_lock:
+            if _config_cache is None:
+                _config_cache = load_config()
+    return _config_cache
+
+def reload_config() -> Dict:
+    """Re-read config.json and reset clients that were built from the old values"""
+    global _config_cache, _backend_client
+    with _config_lock:
+        _config_cache = load_config()
+    with _backend_client_lock:
+        if _backend_client is not None:
+            _backend_client.close()
+        _backend_client = None
+    return _config_cache
+
+class BackendClient:
+    """
+    Long-lived HTTP client for the Flask backend.
+
+    Holds a keep-alive connection pool, the resolved base URL and auth headers,
+    per-endpoint timeouts and a retry policy with jittered exponential backoff.
+    One instance is shared by every backend call in the process.
+    """
+
+    # Status codes worth retrying; anything else is returned to the caller as-is
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, config: Optional[Dict] = None, base_url: Optional[str] = None):
+        config = config if config is not None else get_config()
+        client_config = config.get('backend_client', {})
 
-        url = f"{base_url}{endpoint}"
+        self.base_url = (base_url or config.get('backend_url', 'http://localhost:8000')).rstrip('/')
+        self.default_timeout = client_config.get('default_timeout', 30)
+        self.timeouts = client_config.get('timeouts', {})
+        self.max_retries = client_config.get('max_retries', 2)
+        self.backoff_base = client_config.get('backoff_base', 0.2)
+        self.backoff_max = client_config.get('backoff_max', 2.0)
 
-        headers = {
+        self.headers = {
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         }
@@ -45,20 +95,165 @@ def send_to_backend(endpoint: str, data: Dict, backend_url: str = None, method:
         # Add authentication if configured
         auth_token = config.get('auth_token') or os.getenv('API_AUTH_TOKEN')
         if auth_token:
-            headers['Authorization'] = f"Bearer {auth_token}"
+            self.headers['Authorization'] = f"Bearer {auth_token}"
 
-        # Use the appropriate HTTP method
-        if method.upper() == "PUT":
-            response = requests.put(url, json=data, headers=headers, timeout=30)
-        elif method.upper() == "GET":
-            response = requests.get(url, headers=headers, timeout=30)
-        else:  # Default to POST
-            response = requests.post(url, json=data, headers=headers, timeout=30)
+        pool_size = client_config.get('pool_size', 10)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
-        response.raise_for_status()
+    def timeout_for(self, endpoint: str) -> float:
+        """Resolve the timeout for an endpoint from glob patterns such as 'users/*/calls'"""
+        path = endpoint.lstrip('/')
+        for pattern, timeout in self.timeouts.items():
+            if fnmatch.fnmatch(path, pattern.lstrip('/')):
+                return timeout
+        return self.default_timeout
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, endpoint: str, data: Optional[Dict] = None, method: str = "POST",
+                base_url: Optional[str] = None) -> Dict:
+        """Send a request and return the decoded JSON body, retrying transient failures"""
+        # Ensure endpoint starts with /
+        if not endpoint.startswith('/'):
+            endpoint = '/' + endpoint
+
+        url = f"{(base_url or self.base_url).rstrip('/')}{endpoint}"
+        method = method.upper()
+        timeout = self.timeout_for(endpoint)
+
+        # Only GET and PUT are safe to repeat once the server may have seen the request.
+        # Other methods are retried only when no connection was made, since a reset or
+        # disconnect on an open connection can come after the body was sent.
+        idempotent = method in ("GET", "PUT")
+
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    json=None if method == "GET" else data,
+                    timeout=timeout
+                )
+                if (idempotent and response.status_code in self.RETRY_STATUSES
+                        and attempt < self.max_retries):
+                    raise _RetryableStatus(response.status_code)
+                response.raise_for_status()
+                return response.json()
+            except (requests.exceptions.ConnectionError, _RetryableStatus) as e:
+                if attempt >= self.max_retries or not (idempotent or _never_sent(e)):
+                    raise
+                delay = self.backoff_delay(attempt)
+                logger.warning(f"Backend {method} {endpoint} failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def close(self):
+        self.session.close()
+
+class _RetryableStatus(Exception):
+    """Internal marker for responses whose status code should be retried"""
+
+def _never_sent(error: Exception) -> bool:
+    """True when the request failed before a connection was established, so the server never saw it"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+_backend_client: Optional[BackendClient] = None
+_backend_client_lock = threading.Lock()
+
+def get_backend_client() -> BackendClient:
+    """Return the shared BackendClient, creating it on first use"""
+    global _backend_client
+    if _backend_client is None:
+        with _backend_client_lock:
+            if _backend_client is None:
+                _backend_client = BackendClient()
+    return _backend_client
+
+class BackendError(requests.exceptions.HTTPError):
+    """Error response from a backend handler, raised by every transport"""
+
+    def __init__(self, message: str, status_code: int, payload: Optional[Dict] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.payload = payload or {}
+
+class HTTPTransport:
+    """Sends backend calls over HTTP through the shared BackendClient (standalone/ADK mode)"""
+
+    def send(self, endpoint: str, data: Dict, method: str = "POST", base_url: Optional[str] = None) -> Dict:
+        return get_backend_client().request(endpoint, data, method=method, base_url=base_url)
+
+class InProcessTransport:
+    """
+    Dispatches backend calls straight to handler functions registered by the host process.
+
+    Used when the agent runs inside the Flask backend, so a request never waits on
+    another worker of its own server and skips the socket and JSON round trip.
+    Rules use Flask syntax ('/users/<user_id>/calls'); handlers are called as
+    handler(data, **view_args) and return (payload, status_code).
+    """
+
+    def __init__(self):
+        self.routes = []
+
+    def add_route(self, rule: str, method: str, handler):
+        pattern = re.sub(r'<(?:[^:<>]+:)?([^<>]+)>', r'(?P<\1>[^/]+)', rule.rstrip('/') or '/')
+        self.routes.append((method.upper(), re.compile(f'^{pattern}$'), handler))
+
+    def route(self, rule: str, methods: List[str]):
+        """Decorator form of add_route"""
+        def decorator(handler):
+            for method in methods:
+                self.add_route(rule, method, handler)
+            return handler
+        return decorator
+
+    def send(self, endpoint: str, data: Dict, method: str = "POST", base_url: Optional[str] = None) -> Dict:
+        endpoint, _, query = endpoint.partition('?')
+        path = '/' + endpoint.strip('/')
+        method = method.upper()
+        if query:
+            # Query parameters reach handlers the same way request.args.to_dict() would
+            data = {**dict(parse_qsl(query)), **(data or {})}
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match and route_method == method:
+                # Handlers may annotate the document they insert (e.g. Mongo's _id),
+                # so hand them a copy rather than the caller's dict
+                payload, status = handler(dict(data or {}), **match.groupdict())
+                if status >= 400:
+                    raise BackendError(f"{status} error for {method} {path}: {payload}", status, payload)
+                return payload
+        raise BackendError(f"No in-process handler for {method} {path}", 404)
+
+_transport = HTTPTransport()
+
+def get_transport():
+    """Return the transport used by send_to_backend"""
+    return _transport
+
+def set_transport(transport):
+    """Install the transport used by send_to_backend (HTTPTransport or InProcessTransport)"""
+    global _transport
+    _transport = transport
+
+def send_to_backend(endpoint: str, data: Dict, backend_url: str = None, method: str = "POST") -> Dict:
+    """Send data to backend API endpoint"""
+    try:
+        # An explicit backend_url always means a remote server
+        transport = HTTPTransport() if backend_url else get_transport()
+        return transport.send(endpoint, data, method=method, base_url=backend_url)
 
-        return response.json()
-        
     except requests.exceptions.RequestException as e:
         logger.error(f"Backend request failed: {str(e)}")
         raise
@@ -66,36 +261,12 @@ def send_to_backend(endpoint: str, data: Dict, backend_url: str = None, method:
         logger.error(f"Failed to parse backend response: {str(e)}")
         raise
 
-def calculate_severity_score(transcript: str, user_id: str, config: Dict) -> int:
-    """
-    Calculate call severity score (1-100) using AI analysis of transcript
+# Bump whenever SEVERITY_PROMPT or its scoring criteria change; cached scores
+# from older prompt versions are then never served again.
+SEVERITY_PROMPT_VERSION = "1"
 
-    Args:
-        transcript: 911/dispatch audio transcript
-        user_id: String user ID who responded (used for context)
-        config: Configuration (not used for AI scoring)
-
-    Returns:
-        int: Severity score from 1-100
-    """
-    try:
-        import vertexai
-        from vertexai.generative_models import GenerativeModel
-        
-        # Initialize Vertex AI
-        project_id = os.getenv('GOOGLE_CLOUD_PROJECT')
-        location = os.getenv('GOOGLE_CLOUD_LOCATION', 'us-central1')
-
-
-        if not project_id:
-            logger.warning("Google Cloud project not configured, using fallback")
-            raise Exception("No Google Cloud project configured")
-        
-        vertexai.init(project=project_id, location=location)
-        model = GenerativeModel('gemini-2.0-flash-exp')
-        
-        # Create prompt for AI severity assessment
-        prompt = f"""
+# Prompt for AI severity assessment
+SEVERITY_PROMPT = """
         You are an expert emergency response analyst. Analyze this 911/dispatch call transcript and assign a severity score from 1-100.
 
         TRANSCRIPT: "{transcript}"
@@ -120,38 +291,853 @@ def calculate_severity_score(transcript: str, user_id: str, config: Dict) -> int
         
         Respond with ONLY a number from 1-100. No explanation needed.
         """
-        
-        # Get AI response
-        response = model.generate_content(prompt)
-        score_text = response.text.strip()
-        
-        # Extract the score from response
-        import re
-        numbers = re.findall(r'\d+', score_text)
-        
-        if numbers:
-            severity_score = int(numbers[0])
-            severity_score = max(1, min(severity_score, 100))
+
+class SeverityModelClient:
+    """
+    Process-wide Vertex AI model used for severity scoring.
+
+    vertexai.init and GenerativeModel construction happen once and are only
+    repeated when the project, location or model name changes. Construction is
+    guarded by a lock so concurrent first callers build a single model.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._model = None
+        self._settings = None
+
+    @staticmethod
+    def settings(config: Optional[Dict] = None) -> tuple:
+        """(project, location, model name, API endpoint override) the model should currently be built with"""
+        config = config if config is not None else get_config()
+        model_name = config.get('severity_model', {}).get('model', 'gemini-2.0-flash-exp')
+        project_id = os.getenv('GOOGLE_CLOUD_PROJECT')
+        location = os.getenv('GOOGLE_CLOUD_LOCATION', 'us-central1')
+        return project_id, location, model_name, os.getenv('VERTEX_API_ENDPOINT')
+
+    def get_model(self, config: Optional[Dict] = None):
+        settings = self.settings(config)
+        if settings != self._settings:
+            with self._lock:
+                if settings != self._settings:
+                    self._model = self._build(*settings)
+                    self._settings = settings
+        return self._model
+
+    def _build(self, project_id: str, location: str, model_name: str, api_endpoint: Optional[str] = None):
+        if not project_id:
+            logger.warning("Google Cloud project not configured, using fallback")
+            raise Exception("No Google Cloud project configured")
+
+        import vertexai
+        from vertexai.generative_models import GenerativeModel
+
+        endpoint_settings = {}
+        if api_endpoint:
+            # A local stand-in such as fake_gemini.py: plain REST and no Google credentials.
+            # The async (ASGI) path over REST also needs google-cloud-aiplatform[async_rest].
+            from google.auth.credentials import AnonymousCredentials
+            endpoint_settings = {"api_endpoint": api_endpoint, "api_transport": "rest",
+                                 "credentials": AnonymousCredentials()}
+
+        # Initialize Vertex AI
+        vertexai.init(project=project_id, location=location, **endpoint_settings)
+        logger.info(f"Initialized severity model {model_name} ({project_id}/{location})")
+        return GenerativeModel(model_name)
+
+    def generate(self, prompt: str, config: Optional[Dict] = None) -> str:
+        response = self.get_model(config).generate_content(prompt)
+        return response.text.strip()
+
+    async def generate_async(self, prompt: str, config: Optional[Dict] = None) -> str:
+        """Non-blocking generate for the async serving mode; the model must already be built (see warm)"""
+        response = await self.get_model(config).generate_content_async(prompt)
+        return response.text.strip()
+
+    def warm(self, config: Optional[Dict] = None, probe: Optional[bool] = None) -> bool:
+        """
+        Build the model ahead of the first transcript, optionally sending a probe
+        request so the first real call does not pay for connection setup.
+        Returns False (and logs) instead of raising when Vertex is unavailable.
+        """
+        config = config if config is not None else get_config()
+        if probe is None:
+            probe = config.get('severity_model', {}).get('warmup_probe', False)
+        try:
+            self.get_model(config)
+            if probe:
+                self.generate("Respond with the number 1.", config)
+            return True
+        except Exception as e:
+            logger.warning(f"Severity model warm-up failed: {str(e)}")
+            return False
+
+severity_model_client = SeverityModelClient()
+
+class SeverityScoreCache:
+    """
+    Bounded LRU cache of AI severity scores with a per-entry TTL.
+
+    Keys hash the normalized transcript together with the model name and
+    SEVERITY_PROMPT_VERSION, so replays of the same dispatch (one per responder,
+    duplicate CAD entries) are scored by the model only once. The responding user
+    ID in the prompt does not affect the scoring criteria and is left out of the key.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(transcript: str) -> str:
+        return re.sub(r'\s+', ' ', transcript.lower()).strip()
+
+    def key(self, transcript: str, model_name: str) -> str:
+        raw = f"{model_name}|{SEVERITY_PROMPT_VERSION}|{self.normalize(transcript)}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                score, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return score
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, score: int):
+        with self._lock:
+            self._entries[key] = (score, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, transcript: Optional[str] = None, model_name: Optional[str] = None) -> int:
+        """Drop one transcript's entry, or everything when no transcript is given. Returns entries removed."""
+        with self._lock:
+            if transcript is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            model_name = model_name or SeverityModelClient.settings()[2]
+            return 1 if self._entries.pop(self.key(transcript, model_name), None) else 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "prompt_version": SEVERITY_PROMPT_VERSION
+            }
+
+_cache_config = get_config().get('severity_cache', {})
+severity_score_cache = SeverityScoreCache(
+    max_entries=_cache_config.get('max_entries', 2048),
+    ttl_seconds=_cache_config.get('ttl_seconds', 3600)
+)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is in
+    flight wait for the same result, and an exception is re-raised to all of them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: str, func):
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._in_flight),
+                "executions": self.executions,
+                "coalesced": self.coalesced
+            }
+
+severity_flight = SingleFlight()
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight: concurrent coroutines on one event loop
+    that share a key await a single task. Each waiter is shielded, so a cancelled
+    request does not cancel the work the others are waiting on.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, coroutine_func):
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coroutine_func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "executions": self.executions,
+            "coalesced": self.coalesced
+        }
+
+severity_async_flight = AsyncSingleFlight()
+
+class AdmissionRejected(Exception):
+    """Raised when the severity model queue sheds a request; callers fall back to keyword scoring"""
+
+class _AdmissionWaiter:
+    def __init__(self, priority: int, notify):
+        self.priority = priority
+        self.notify = notify
+        self.state = "waiting"  # -> granted, shed or abandoned
+        self.reason = None
+
+class SeverityAdmissionQueue:
+    """
+    Admission control for severity model requests.
+
+    A request is sent to the model only while fewer than max_in_flight are
+    outstanding and the token bucket (requests_per_second, refilled up to burst)
+    has a token, so a burst of calls stays inside the Vertex quota instead of
+    failing through to the fallback. Waiting requests are admitted highest
+    priority first, then oldest first; the priority is the number of high-risk
+    keywords the lexicon pre-scan finds.
+
+    Load is shed predictably: when max_queue requests are waiting, the lowest
+    priority (newest on a tie) of them and the new one is rejected, and a request
+    still waiting after max_wait_seconds is rejected. A rejected request is scored
+    by the keyword fallback.
+    """
+
+    def __init__(self, max_in_flight: int = 8, requests_per_second: float = 5, burst: int = 10,
+                 max_queue: int = 64, max_wait_seconds: float = 5):
+        self.max_in_flight = max_in_flight
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+
+        self._lock = threading.Lock()
+        self._heap = []
+        self._sequence = 0
+        self._waiting = 0
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._timer = None
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.requests_per_second:
+            self._tokens = min(float(self.burst), self._tokens + (now - self._refilled_at) * self.requests_per_second)
+        else:
+            self._tokens = float(self.burst)
+        self._refilled_at = now
+
+    def _enqueue(self, priority: int, notify) -> _AdmissionWaiter:
+        """Admit now if possible, otherwise queue a waiter (shedding if the queue is full). Call with _lock held."""
+        waiter = _AdmissionWaiter(priority, notify)
+        if self._waiting >= self.max_queue:
+            # Shed the lowest-priority, newest request: a queued one, or this one
+            live = [entry for entry in self._heap if entry[2].state == "waiting"]
+            victim_entry = max(live, key=lambda entry: entry[:2]) if live else None
+            if victim_entry is None or (-priority, self._sequence) > victim_entry[:2]:
+                self.shed_queue_full += 1
+                raise AdmissionRejected("severity model queue is full")
+            self._reject(victim_entry[2], "severity model queue is full")
+            self.shed_queue_full += 1
+
+        if len(self._heap) > 2 * self.max_queue:
+            # Drop entries of shed and abandoned waiters that have not reached the top yet
+            self._heap = [entry for entry in self._heap if entry[2].state == "waiting"]
+            heapq.heapify(self._heap)
+        heapq.heappush(self._heap, (-priority, self._sequence, waiter))
+        self._sequence += 1
+        self._waiting += 1
+        self._dispatch()
+        return waiter
+
+    def _reject(self, waiter: _AdmissionWaiter, reason: str):
+        waiter.state = "shed"
+        waiter.reason = reason
+        self._waiting -= 1
+        waiter.notify()
+
+    def _dispatch(self):
+        """Grant waiting requests while capacity and tokens allow. Call with _lock held."""
+        self._refill()
+        while self._heap and self.in_flight < self.max_in_flight:
+            waiter = self._heap[0][2]
+            if waiter.state != "waiting":
+                heapq.heappop(self._heap)
+                continue
+            if self._tokens < 1:
+                # Wake up when the next token is due
+                if self._timer is None:
+                    delay = (1 - self._tokens) / self.requests_per_second
+                    self._timer = threading.Timer(delay, self._on_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            heapq.heappop(self._heap)
+            self._tokens -= 1
+            self._waiting -= 1
+            self.in_flight += 1
+            self.admitted += 1
+            waiter.state = "granted"
+            waiter.notify()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def _abandon(self, waiter: _AdmissionWaiter) -> bool:
+        """Give up on a wait; returns True if the slot was granted in the meantime and is now held"""
+        with self._lock:
+            if waiter.state == "granted":
+                return True
+            if waiter.state == "waiting":
+                waiter.state = "abandoned"
+                self._waiting -= 1
+                self.shed_timeout += 1
+            return False
+
+    def acquire(self, priority: int = 0):
+        """Block until a model request may be sent; raises AdmissionRejected if it is shed"""
+        event = threading.Event()
+        with self._lock:
+            waiter = self._enqueue(priority, event.set)
+        if not event.wait(self.max_wait_seconds) and not self._abandon(waiter):
+            raise AdmissionRejected(f"waited more than {self.max_wait_seconds}s for the severity model")
+        if waiter.state == "shed":
+            raise AdmissionRejected(waiter.reason)
+
+    async def acquire_async(self, priority: int = 0):
+        """acquire() for the async serving mode; waiting holds no thread"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        with self._lock:
+            waiter = self._enqueue(priority, notify)
+        try:
+            await asyncio.wait_for(granted, self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if not self._abandon(waiter):
+                raise AdmissionRejected(f"waited more than {self.max_wait_seconds}s for the severity model")
+        except asyncio.CancelledError:
+            if self._abandon(waiter):
+                self.release()
+            raise
+        if waiter.state == "shed":
+            raise AdmissionRejected(waiter.reason)
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._dispatch()
+
+    @contextmanager
+    def admit(self, priority: int = 0):
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def admit_async(self, priority: int = 0):
+        await self.acquire_async(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refill()
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "queued": self._waiting,
+                "max_queue": self.max_queue,
+                "tokens": round(self._tokens, 2),
+                "requests_per_second": self.requests_per_second,
+                "admitted": self.admitted,
+                "shed_queue_full": self.shed_queue_full,
+                "shed_timeout": self.shed_timeout
+            }
+
+_admission_config = get_config().get('severity_admission', {})
+severity_admission = SeverityAdmissionQueue(
+    max_in_flight=_admission_config.get('max_in_flight', 8),
+    requests_per_second=_admission_config.get('requests_per_second', 5),
+    burst=_admission_config.get('burst', 10),
+    max_queue=_admission_config.get('max_queue', 64),
+    max_wait_seconds=_admission_config.get('max_wait_seconds', 5)
+)
+
+def severity_priority(transcript: str, config: Dict) -> int:
+    """Admission priority of a transcript: how many high-risk keywords the lexicon pre-scan finds"""
+    return len(get_lexicon("severity", config).find(transcript).get("high_risk", []))
+
+def parse_severity_score(score_text: str) -> Optional[int]:
+    """First number in the model's reply, clamped to 1-100"""
+    numbers = re.findall(r'\d+', score_text)
+    if not numbers:
+        return None
+    return max(1, min(int(numbers[0]), 100))
+
+def fallback_severity_score(transcript: str, config: Dict) -> int:
+    """Keyword-count score, one pass over the transcript; the last resort when no local model is trained"""
+    keywords_found = get_lexicon("severity", config).find(transcript).get("high_risk", [])
+
+    # Simple fallback scoring based on keywords found
+    severity_score = 1 + min(len(keywords_found) * 20, 99)
+    severity_score = max(1, min(severity_score, 100))
+
+    logger.info(f"Fallback Severity Score: {severity_score}/100")
+    return severity_score
+
+_local_model = None
+_local_model_version = None
+_local_model_lock = threading.Lock()
+
+def local_model_path(config: Dict) -> str:
+    path = config.get('local_model', {}).get('path', 'models/severity')
+    return path if os.path.isabs(path) else os.path.join(os.path.dirname(__file__), path)
+
+def get_local_model(config: Dict):
+    """
+    The trained local severity model (see local_model.py), memory-mapped on first
+    use and reloaded when a newer one is saved. None when it is disabled, not
+    trained yet or NumPy is not installed.
+    """
+    global _local_model, _local_model_version
+    if not config.get('local_model', {}).get('enabled', True):
+        return None
+    path = local_model_path(config)
+    try:
+        version = (path, os.path.getmtime(os.path.join(path, 'meta.json')))
+    except OSError:
+        return None
+
+    if version != _local_model_version:
+        with _local_model_lock:
+            if version != _local_model_version:
+                try:
+                    from .local_model import LocalSeverityModel
+                    _local_model = LocalSeverityModel.load(path)
+                    logger.info(f"Loaded local severity model from {path} "
+                                f"(trained {_local_model.meta.get('trained_at')} on {_local_model.meta.get('samples')} calls)")
+                except Exception as e:
+                    logger.warning(f"Local severity model unavailable: {str(e)}")
+                    _local_model = None
+                _local_model_version = version
+    return _local_model
+
+def fallback_severity(transcript: str, config: Dict) -> Tuple[int, str]:
+    """
+    Score used when the model is unavailable or sheds the request: the local
+    model if one is trained, otherwise the keyword count. Returns (score, source).
+    """
+    model = get_local_model(config)
+    if model is not None:
+        try:
+            severity_score = int(model.score([transcript])[0])
+            logger.info(f"Local Model Severity Score: {severity_score}/100")
+            return severity_score, "local_model"
+        except Exception as e:
+            logger.warning(f"Local severity model failed: {str(e)}, using keyword score")
+    return fallback_severity_score(transcript, config), "keyword"
+
+class SeverityTriageStats:
+    """
+    How often each scoring tier decides a transcript, and how often sampled
+    first-tier decisions agree with the model.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.decisions = {"low": 0, "high": 0, "model": 0}
+        self.audits = {tier: {"checked": 0, "agreed": 0, "abs_error": 0} for tier in ("low", "high")}
+        self.pending_audits = 0
+
+    def record(self, tier: str):
+        with self._lock:
+            self.decisions[tier] += 1
+
+    def begin_audit(self, max_pending: int) -> bool:
+        """Reserve a slot for a shadow model check; False when max_pending are already queued"""
+        with self._lock:
+            if self.pending_audits >= max_pending:
+                return False
+            self.pending_audits += 1
+            return True
+
+    def end_audit(self):
+        with self._lock:
+            self.pending_audits -= 1
+
+    def record_audit(self, tier: str, first_tier_score: int, model_score: int, agreed: bool):
+        with self._lock:
+            audit = self.audits[tier]
+            audit["checked"] += 1
+            audit["agreed"] += int(agreed)
+            audit["abs_error"] += abs(first_tier_score - model_score)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = sum(self.decisions.values())
+            return {
+                "decisions": dict(self.decisions),
+                "hit_rates": {tier: round(count / total, 4) if total else 0.0
+                              for tier, count in self.decisions.items()},
+                "agreement": {
+                    tier: {
+                        "checked": audit["checked"],
+                        "agreement_rate": round(audit["agreed"] / audit["checked"], 4) if audit["checked"] else None,
+                        "mean_abs_error": round(audit["abs_error"] / audit["checked"], 1) if audit["checked"] else None
+                    }
+                    for tier, audit in self.audits.items()
+                },
+                "pending_audits": self.pending_audits
+            }
+
+severity_triage_stats = SeverityTriageStats()
+
+# Shadow model requests that check a sample of first-tier decisions
+_audit_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="triage-audit")
+
+def first_tier_severity(transcript: str, config: Dict) -> Optional[Tuple[str, int]]:
+    """
+    Local first scoring tier: ("low" | "high", score) when the lexicon makes the
+    outcome clear-cut, or None when the transcript is ambiguous and needs the model.
+
+    Low: no high-risk keywords and at least low_min_keywords low-risk ones (fender
+    benders, lift assists). High: at least high_min_keywords high-risk keywords.
+    The fixed scores sit on the same side of notify_checkin / auto_escalate that
+    the model would put those calls.
+    """
+    triage = config.get('triage', {})
+    if not triage.get('enabled', True):
+        return None
+
+    found = get_lexicon("severity", config).find(transcript)
+    high_risk = len(found.get("high_risk", []))
+    low_risk = len(found.get("low_risk", []))
+    if high_risk >= triage.get('high_min_keywords', 3):
+        return "high", triage.get('high_score', 85)
+    if high_risk == 0 and low_risk >= triage.get('low_min_keywords', 1):
+        return "low", triage.get('low_score', 10)
+    return None
+
+def _audit_first_tier(tier: str, score: int, transcript: str, user_id: str, config: Dict):
+    try:
+        prompt = SEVERITY_PROMPT.format(transcript=transcript, user_id=user_id)
+        if config.get('severity_admission', {}).get('enabled', True):
+            # Lowest priority, so audits never hold up real scoring and are shed first
+            with severity_admission.admit(-1):
+                model_score = parse_severity_score(severity_model_client.generate(prompt, config))
+        else:
+            model_score = parse_severity_score(severity_model_client.generate(prompt, config))
+        if model_score is None:
+            return
+        thresholds = config.get('thresholds', {})
+        if tier == "low":
+            agreed = model_score < thresholds.get('notify_checkin', 0.55) * 100
+        else:
+            agreed = model_score >= thresholds.get('auto_escalate', 0.78) * 100
+        severity_triage_stats.record_audit(tier, score, model_score, agreed)
+    except Exception as e:
+        logger.debug(f"First-tier audit skipped: {str(e)}")
+    finally:
+        severity_triage_stats.end_audit()
+
+def triage_severity(transcript: str, user_id: str, config: Dict) -> Optional[int]:
+    """
+    Score a transcript with the first tier if it is clear-cut, recording the
+    decision and sampling it for a shadow model check. None means use the model,
+    which is also the answer if the first tier itself fails.
+    """
+    try:
+        decision = first_tier_severity(transcript, config)
+    except Exception as e:
+        logger.warning(f"First-tier severity check failed: {str(e)}, using the model")
+        return None
+    if decision is None:
+        if config.get('triage', {}).get('enabled', True):
+            severity_triage_stats.record("model")
+        return None
+
+    tier, score = decision
+    severity_triage_stats.record(tier)
+    triage = config.get('triage', {})
+    if (random.random() < triage.get('audit_sample_rate', 0.05)
+            and severity_triage_stats.begin_audit(triage.get('max_pending_audits', 16))):
+        _audit_executor.submit(_audit_first_tier, tier, score, transcript, user_id, config)
+
+    logger.info(f"First-tier Severity Score ({tier}): {score}/100")
+    return score
+
+def calculate_severity_score(transcript: str, user_id: str, config: Dict) -> int:
+    """
+    Calculate call severity score (1-100) using AI analysis of transcript
+
+    Args:
+        transcript: 911/dispatch audio transcript
+        user_id: String user ID who responded (used for context)
+        config: Configuration (model settings and fallback keywords)
+
+    Returns:
+        int: Severity score from 1-100
+    """
+    return score_severity(transcript, user_id, config)[0]
+
+def score_severity(transcript: str, user_id: str, config: Dict) -> Tuple[int, str]:
+    """
+    calculate_severity_score, also returning where the score came from: "triage"
+    (first tier), "model" (Vertex AI, possibly cached), "local_model" or "keyword".
+    Call records keep the source so the local model is trained on model scores only.
+    """
+    # Clear-cut transcripts are scored locally without a model request
+    first_tier_score = triage_severity(transcript, user_id, config)
+    if first_tier_score is not None:
+        return first_tier_score, "triage"
+
+    try:
+        use_cache = config.get('severity_cache', {}).get('enabled', True)
+        use_admission = config.get('severity_admission', {}).get('enabled', True)
+        cache_key = severity_score_cache.key(transcript, SeverityModelClient.settings(config)[2])
+        if use_cache:
+            cached_score = severity_score_cache.get(cache_key)
+            if cached_score is not None:
+                logger.info(f"AI Severity Score (cached): {cached_score}/100")
+                return cached_score, "model"
+
+        def score_with_model() -> Optional[int]:
+            prompt = SEVERITY_PROMPT.format(transcript=transcript, user_id=user_id)
+
+            # Get AI response and extract the score from it, once admitted by the rate limiter
+            if use_admission:
+                with severity_admission.admit(severity_priority(transcript, config)):
+                    score_text = severity_model_client.generate(prompt, config)
+            else:
+                score_text = severity_model_client.generate(prompt, config)
+            score = parse_severity_score(score_text)
+            if score is None:
+                return None
+
+            # Cache before the in-flight entry is released so late arrivals hit the cache
+            if use_cache:
+                severity_score_cache.set(cache_key, score)
+            return score
+
+        # Concurrent callers with the same transcript share one model request
+        severity_score = severity_flight.do(cache_key, score_with_model)
+
+        if severity_score is not None:
             logger.info(f"AI Severity Score: {severity_score}/100")
-            return severity_score
-        
+            return severity_score, "model"
+        logger.warning("AI severity response contained no score, using fallback")
+
     except Exception as e:
         logger.warning(f"AI severity calculation failed: {str(e)}, using fallback")
-        
-        # Fallback to keyword-based scoring
-        high_risk_keywords = config.get("high_risk_keywords", [])
-        keywords_found = []
-        
-        for keyword in high_risk_keywords:
-            if keyword.lower() in transcript.lower():
-                keywords_found.append(keyword)
-        
-        # Simple fallback scoring based on keywords found
-        severity_score = 1 + min(len(keywords_found) * 20, 99)
-        severity_score = max(1, min(severity_score, 100))
-        
-        logger.info(f"Fallback Severity Score: {severity_score}/100")
-        return severity_score
+    return fallback_severity(transcript, config)
+
+async def calculate_severity_score_async(transcript: str, user_id: str, config: Dict) -> int:
+    """
+    calculate_severity_score for the async serving mode: the model request is
+    awaited instead of holding a thread, and it shares the same score cache
+    """
+    return (await score_severity_async(transcript, user_id, config))[0]
+
+async def score_severity_async(transcript: str, user_id: str, config: Dict) -> Tuple[int, str]:
+    """score_severity for the async serving mode"""
+    # Clear-cut transcripts are scored locally without a model request
+    first_tier_score = triage_severity(transcript, user_id, config)
+    if first_tier_score is not None:
+        return first_tier_score, "triage"
+
+    try:
+        use_cache = config.get('severity_cache', {}).get('enabled', True)
+        use_admission = config.get('severity_admission', {}).get('enabled', True)
+        cache_key = severity_score_cache.key(transcript, SeverityModelClient.settings(config)[2])
+        if use_cache:
+            cached_score = severity_score_cache.get(cache_key)
+            if cached_score is not None:
+                logger.info(f"AI Severity Score (cached): {cached_score}/100")
+                return cached_score, "model"
+
+        async def score_with_model() -> Optional[int]:
+            prompt = SEVERITY_PROMPT.format(transcript=transcript, user_id=user_id)
+            if use_admission:
+                async with severity_admission.admit_async(severity_priority(transcript, config)):
+                    score_text = await severity_model_client.generate_async(prompt, config)
+            else:
+                score_text = await severity_model_client.generate_async(prompt, config)
+            score = parse_severity_score(score_text)
+            if score is not None and use_cache:
+                severity_score_cache.set(cache_key, score)
+            return score
+
+        # Concurrent requests with the same transcript share one model request
+        severity_score = await severity_async_flight.do(cache_key, score_with_model)
+
+        if severity_score is not None:
+            logger.info(f"AI Severity Score: {severity_score}/100")
+            return severity_score, "model"
+        logger.warning("AI severity response contained no score, using fallback")
+
+    except Exception as e:
+        logger.warning(f"AI severity calculation failed: {str(e)}, using fallback")
+    return fallback_severity(transcript, config)
+
+# Longest window wellness is computed over; the month window is today minus 30 days, inclusive
+WELLNESS_WINDOW_DAYS = 30
+
+def fetch_wellness_buckets(user_id: str) -> List[Dict]:
+    """Fetch the per-day severity sum/count buckets covering the wellness windows (at most 31)"""
+    since = (datetime.now().date() - timedelta(days=WELLNESS_WINDOW_DAYS)).isoformat()
+    data = send_to_backend(f"/users/{user_id}/wellness-aggregates?{urlencode({'since': since})}", {}, method="GET")
+    return data.get('buckets', [])
+
+def compute_wellness_from_buckets(buckets: List[Dict], new_call_severities: List[int] = ()) -> Dict[str, int]:
+    """
+    Calculate day/week/month wellness scores from per-day severity buckets
+
+    Args:
+        buckets: Entries with "day" (ISO date), "severity_sum" and "call_count"
+        new_call_severities: Severities of calls not yet reflected in the buckets
+
+    Returns:
+        Dict containing wellness_score_day, wellness_score_week, wellness_score_month
+    """
+    today = datetime.now().date()
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=WELLNESS_WINDOW_DAYS)
+
+    # [severity sum, call count] per time period
+    daily = [0, 0]
+    weekly = [0, 0]
+    monthly = [0, 0]
+
+    for bucket in buckets:
+        bucket_date = datetime.fromisoformat(bucket["day"]).date()
+        totals = (bucket["severity_sum"], bucket["call_count"])
+
+        for period, included in ((daily, bucket_date == today),
+                                 (weekly, bucket_date >= week_ago),
+                                 (monthly, bucket_date >= month_ago)):
+            if included:
+                period[0] += totals[0]
+                period[1] += totals[1]
+
+    # New calls happen today, so they count towards every period
+    for severity in new_call_severities:
+        for period in (daily, weekly, monthly):
+            period[0] += severity
+            period[1] += 1
+
+    # Calculate wellness scores (inverse of severity - higher severity = lower wellness)
+    def calculate_wellness_from_severity(severity_sum: float, call_count: int) -> int:
+        if not call_count:
+            return 50  # Neutral wellness if no calls
+
+        avg_severity = severity_sum / call_count
+        # Invert the scale: wellness = 101 - severity
+        wellness = 101 - avg_severity
+        return max(1, min(wellness, 100))
+
+    return {
+        "wellness_score_day": int(calculate_wellness_from_severity(*daily)),
+        "wellness_score_week": int(calculate_wellness_from_severity(*weekly)),
+        "wellness_score_month": int(calculate_wellness_from_severity(*monthly))
+    }
+
+def compute_wellness_scores(calls: List[Dict], new_call_severity: int = None) -> Dict[str, int]:
+    """
+    Calculate day/week/month wellness scores from a full call history
+
+    Args:
+        calls: Call history entries with "day" (ISO date) and "severity_score"
+        new_call_severity: Optional new call severity to include in calculation
+
+    Returns:
+        Dict containing wellness_score_day, wellness_score_week, wellness_score_month
+    """
+    buckets = {}
+    for call in calls:
+        day = datetime.fromisoformat(call["day"]).date().isoformat()
+        bucket = buckets.setdefault(day, {"day": day, "severity_sum": 0, "call_count": 0})
+        bucket["severity_sum"] += call["severity_score"]
+        bucket["call_count"] += 1
+
+    return compute_wellness_from_buckets(list(buckets.values()), [new_call_severity] if new_call_severity else [])
+
+NEUTRAL_WELLNESS_SCORES = {
+    "wellness_score_day": 50,
+    "wellness_score_week": 50,
+    "wellness_score_month": 50
+}
 
 def calculate_wellness_scores(user_id: str, new_call_severity: int = None) -> Dict[str, int]:
     """
@@ -165,67 +1151,17 @@ def calculate_wellness_scores(user_id: str, new_call_severity: int = None) -> Di
         Dict containing wellness_score_day, wellness_score_week, wellness_score_month
     """
     try:
-        # Fetch user's call history from backend
-        calls_data = send_to_backend(f'/users/{user_id}/calls', {}, method="GET")
-        calls = calls_data.get('calls', [])
-        
-        today = datetime.now().date()
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-        
-        # Filter calls by time periods
-        daily_calls = []
-        weekly_calls = []
-        monthly_calls = []
-        
-        for call in calls:
-            call_date = datetime.fromisoformat(call["day"]).date()
-            severity = call["severity_score"]
-            
-            if call_date == today:
-                daily_calls.append(severity)
-            if call_date >= week_ago:
-                weekly_calls.append(severity)
-            if call_date >= month_ago:
-                monthly_calls.append(severity)
-        
-        # Include new call severity if provided
-        if new_call_severity:
-            daily_calls.append(new_call_severity)
-            weekly_calls.append(new_call_severity)
-            monthly_calls.append(new_call_severity)
-        
-        # Calculate wellness scores (inverse of severity - higher severity = lower wellness)
-        def calculate_wellness_from_severity(severities: List[int]) -> int:
-            if not severities:
-                return 50  # Neutral wellness if no calls
-            
-            avg_severity = sum(severities) / len(severities)
-            # Invert the scale: wellness = 101 - severity
-            wellness = 101 - avg_severity
-            return max(1, min(wellness, 100))
-        
-        wellness_day = calculate_wellness_from_severity(daily_calls)
-        wellness_week = calculate_wellness_from_severity(weekly_calls)
-        wellness_month = calculate_wellness_from_severity(monthly_calls)
-        
-        result = {
-            "wellness_score_day": int(wellness_day),
-            "wellness_score_week": int(wellness_week),
-            "wellness_score_month": int(wellness_month)
-        }
-        
+        # Fetch user's rolling severity buckets from backend
+        buckets = fetch_wellness_buckets(user_id)
+        result = compute_wellness_from_buckets(buckets, [new_call_severity] if new_call_severity else [])
+
         logger.info(f"Calculated wellness scores for user {user_id}: {result}")
         return result
         
     except Exception as e:
         logger.error(f"Failed to calculate wellness scores for user {user_id}: {str(e)}")
         # Return neutral scores on error
-        return {
-            "wellness_score_day": 50,
-            "wellness_score_week": 50,
-            "wellness_score_month": 50
-        }
+        return dict(NEUTRAL_WELLNESS_SCORES)
 
 def update_user_wellness_scores(user_id: str, wellness_scores: Dict) -> Dict:
     """
@@ -1,52 +1,63 @@
-from flask import Flask, request, jsonify
-from pymongo import MongoClient
+from flask import Blueprint, Flask, Response, request, jsonify, stream_with_context
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne, DESCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
-import certifi
+import atexit
+import base64
+import importlib
 import json
 import os
 import sys
 import threading
 import time
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
 
 # Add parent directory to path for importing Agents
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, parent_dir)
 
-# Import agent functions
-from Agents.first_responder_agent.agent import analyze_call_and_update_wellness, push_notification_based_on_severity
+from Agents.first_responder_agent.utils import (
+    InProcessTransport,
+    set_transport,
+    get_config,
+    severity_model_client,
+    severity_score_cache,
+    severity_flight,
+    severity_admission,
+    severity_triage_stats
+)
+from Agents.first_responder_agent.lexicon import get_lexicon
+from Agents.first_responder_agent.scheduler import scheduler, scheduler_settings, follow_up_delays
+from indexes import INDEX_MANIFEST, ensure_indexes
+from job_store import MongoJobStore
+from mongo import get_client, get_db, warm_pool
+from chat_events import (
+    ChatTriggerBroker,
+    ChangeStreamFeed,
+    parse_event_id,
+    pending_triggers,
+    serialize_trigger
+)
+from write_behind import WriteBehindBuffer
+import history
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-
-# Connect to MongoDB Atlas
-MONGO_URI = os.getenv('MONGO_URI')
-if not MONGO_URI:
-    raise ValueError("MONGO_URI environment variable is not set")
-
-# Enhanced MongoDB connection with better SSL configuration
-try:
-    client = MongoClient(
-        MONGO_URI,
-        tlsCAFile=certifi.where(),
-        serverSelectionTimeoutMS=5000,
-        connectTimeoutMS=5000,
-        socketTimeoutMS=5000,
-        retryWrites=True,
-        w='majority'
-    )
-    # Test the connection
-    client.admin.command('ping')
-    print("MongoDB connection successful")
-except Exception as e:
-    print(f"MongoDB connection failed: {e}")
-    print("Check your MONGO_URI and network connection")
+def agent_module():
+    """
+    The agent pipeline module. It pulls in google.adk and Vertex AI, which take
+    seconds to import, so it is loaded on first use (or by the warm-up thread)
+    instead of when this module is imported.
+    """
+    return importlib.import_module("Agents.first_responder_agent.agent")
 
-db = client["development"]
-collection = db["call_records"]
+# Routes are registered on a blueprint so create_app() can build the app
+# without touching MongoDB or starting threads at import time
+api = Blueprint('api', __name__)
 
 # Load threshold configuration
 def load_threshold_config():
@@ -60,45 +71,235 @@ def load_threshold_config():
         return 0.78  # Default threshold
 
 CHAT_TRIGGER_THRESHOLD = load_threshold_config()
+FOLLOW_UP_THRESHOLD = get_config().get("thresholds", {}).get("notify_checkin", 0.55)
+
+# Write-behind buffers for insert-only collections. Each collection sets its
+# batch size, flush delay and write concern; each endpoint decides whether its
+# response waits for the flush (write_behind.wait in config.json).
+WRITE_BEHIND_CONFIG = get_config().get("write_behind", {})
+
+# Chat triggers are pushed to open streams and long-polls through an in-process
+# broker. With feed "changestream" a change stream on chat_triggers feeds it, so
+# every process sees triggers written by any other; otherwise the write-behind
+# buffer publishes each batch once it is written.
+CHAT_EVENTS_CONFIG = get_config().get("chat_events", {})
+
+# -----------------------------
+# Per-process state
+# -----------------------------
+class WorkerState:
+    """
+    Everything one process owns: its write-behind buffers, chat trigger broker and
+    readiness. Background threads do not survive a fork, so a pre-fork server's
+    workers each build their own state instead of inheriting the master's.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.lock = threading.RLock()
+        self.started = False
+        # warmed is set when a warm-up attempt finishes, ready only if it succeeded
+        self.warmed = threading.Event()
+        self.ready = threading.Event()
+        self.error = None
+        self.write_buffers = {}
+        self.chat_trigger_broker = ChatTriggerBroker(max_queue=CHAT_EVENTS_CONFIG.get("max_queue", 100))
+
+_worker_state = None
+_worker_state_lock = threading.Lock()
+
+def worker_state():
+    """This process's WorkerState, created on first use"""
+    global _worker_state
+    if _worker_state is None or _worker_state.pid != os.getpid():
+        with _worker_state_lock:
+            if _worker_state is None or _worker_state.pid != os.getpid():
+                _worker_state = WorkerState()
+    return _worker_state
+
+def get_write_buffer(name):
+    """This process's write-behind buffer for a collection, created on first use"""
+    state = worker_state()
+    buffer = state.write_buffers.get(name)
+    if buffer is None:
+        with state.lock:
+            buffer = state.write_buffers.get(name)
+            if buffer is None:
+                on_flush = None
+                if name == "call_records":
+                    on_flush = record_wellness_buckets
+                elif name == "chat_triggers" and CHAT_EVENTS_CONFIG.get("feed", "memory") != "changestream":
+                    on_flush = state.chat_trigger_broker.publish_many
+                buffer = WriteBehindBuffer(
+                    get_db()[name],
+                    on_flush=on_flush,
+                    **WRITE_BEHIND_CONFIG.get("collections", {}).get(name, {})
+                )
+                state.write_buffers[name] = buffer
+    return buffer
+
+def waits_for_write(endpoint):
+    return WRITE_BEHIND_CONFIG.get("wait", {}).get(endpoint, True)
+
+def start_worker():
+    """
+    Start warming this process in the background: open the connection pool,
+    apply indexes and start the change stream feed and scheduler. Runs once per
+    process (again only after a failed attempt). Called by the readiness gate on
+    the first request; a pre-fork server can call it from its post_fork hook so
+    workers warm up before they are sent traffic.
+    """
+    state = worker_state()
+    with state.lock:
+        if state.started:
+            return state
+        state.started = True
+        state.warmed.clear()
+    threading.Thread(target=_warm_up, args=(state,), name="warm-up", daemon=True).start()
+    return state
+
+def _warm_up(state):
+    try:
+        warm_pool()
+        print("MongoDB connection successful")
+
+        # Apply the index manifest; create_index is a no-op for indexes that already exist
+        if os.getenv('ENSURE_INDEXES_ON_START', 'true').lower() == 'true':
+            try:
+                ensure_indexes(get_db())
+                print("MongoDB indexes verified")
+            except Exception as e:
+                print(f"Failed to apply MongoDB indexes: {e}")
+
+        if CHAT_EVENTS_CONFIG.get("feed", "memory") == "changestream":
+            ChangeStreamFeed(get_db()["chat_triggers"], state.chat_trigger_broker)
+
+        # One scheduler per process fires delayed chat triggers and follow-ups. Jobs are
+        # persisted in scheduled_jobs, so pending ones survive a restart and are picked
+        # up again when the scheduler starts.
+        scheduler.configure(store=MongoJobStore(get_db()["scheduled_jobs"]), **scheduler_settings(get_config()))
+        scheduler.start()
+        atexit.register(stop_worker)
+
+        # Load the agent and build the Vertex AI severity model off the request path,
+        # so the first /analyze-call does not pay for the imports, vertexai.init and
+        # model construction
+        threading.Thread(target=_warm_agent, name="agent-warm-up", daemon=True).start()
+
+        state.ready.set()
+    except Exception as e:
+        state.error = str(e)
+        print(f"MongoDB connection failed: {e}")
+        print("Check your MONGO_URI and network connection")
+        with state.lock:
+            state.started = False  # the next request retries
+    finally:
+        state.warmed.set()
+
+def _warm_agent():
+    try:
+        if os.getenv('PRELOAD_AGENT_ON_START', 'true').lower() == 'true':
+            agent_module()
+        if get_config().get("severity_model", {}).get("warmup_on_start", True):
+            severity_model_client.warm()
+    except Exception as e:
+        print(f"Failed to warm up the agent: {e}")
+
+def stop_worker():
+    state = worker_state()
+    # Stop the scheduler first: running jobs may still submit to the buffers
+    scheduler.shutdown(wait=True)
+    for buffer in state.write_buffers.values():
+        buffer.close(timeout=10)
+
+READINESS_TIMEOUT = get_config().get("mongo", {}).get("readiness_timeout_seconds", 10)
+
+def readiness_gate():
+    """
+    Hold requests until this worker's pool is warm, up to READINESS_TIMEOUT
+    seconds, then answer 503 so a load balancer retries elsewhere
+    """
+    if request.endpoint in ('api.health_live', 'api.health_ready'):
+        return None
+    state = start_worker()
+    if not state.ready.is_set():
+        state.warmed.wait(READINESS_TIMEOUT)
+    if not state.ready.is_set():
+        return jsonify({
+            "status": "error",
+            "error_message": f"Service is not ready: {state.error or 'warming up'}"
+        }), 503, {"Retry-After": "1"}
+    return None
+
+@api.route('/health/live', methods=['GET'])
+def health_live():
+    """Liveness: the process is up"""
+    return jsonify({"status": "success"}), 200
+
+@api.route('/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness: this worker's MongoDB pool is warm and its background work is running"""
+    state = start_worker()
+    if state.ready.is_set():
+        return jsonify({"status": "success", "ready": True}), 200
+    return jsonify({"status": "error", "ready": False, "error_message": state.error}), 503
+
+def write_chat_trigger(payload):
+    """Scheduled job: store a chat trigger event in the database for the frontend to check"""
+    chat_trigger_payload = {**payload, "timestamp": datetime.now().isoformat()}
+    get_write_buffer("chat_triggers").submit(chat_trigger_payload, wait=waits_for_write("chat_trigger"))
+    print(f"Chat {payload['action']} for user {payload['user_id']} (call {payload['call_id']}, severity {payload['severity_score']})")
 
 def trigger_chat_after_delay(user_id, call_id, severity_score, delay_seconds=10):
     """
     Trigger chat in frontend after specified delay if severity meets threshold
     """
-    def delayed_trigger():
-        time.sleep(delay_seconds)
-        try:
-            # Create notification payload for chat trigger
-            chat_trigger_payload = {
-                "user_id": user_id,
-                "call_id": call_id,
-                "severity_score": severity_score,
-                "action": "trigger_chat",
-                "timestamp": datetime.now().isoformat()
-            }
+    scheduler.schedule(
+        "chat_trigger",
+        {"user_id": user_id, "call_id": call_id, "severity_score": severity_score, "action": "trigger_chat"},
+        delay_seconds=delay_seconds,
+        job_id=f"chat_trigger:{user_id}:{call_id}"
+    )
 
-            # Store the chat trigger event in database for frontend to check
-            chat_collection = db["chat_triggers"]
-            chat_collection.insert_one(chat_trigger_payload)
+def schedule_follow_ups(user_id, call_id, severity_score):
+    """
+    Schedule the followUps check-ins from config.json for a call at or above the
+    notify_checkin threshold. Returns the names of the follow-ups scheduled.
+    """
+    score = severity_score / 100.0
+    if score < FOLLOW_UP_THRESHOLD:
+        return []
 
-            print(f"Chat triggered for user {user_id} after {delay_seconds} seconds due to severity {severity_score}")
+    delays = follow_up_delays(get_config().get("followUps", {}), score)
+    for name, delay in delays.items():
+        scheduler.schedule(
+            "chat_trigger",
+            {"user_id": user_id, "call_id": call_id, "severity_score": severity_score,
+             "action": "follow_up", "follow_up": name},
+            delay_seconds=delay.total_seconds(),
+            job_id=f"follow_up:{name}:{user_id}:{call_id}"
+        )
+    return list(delays)
 
-        except Exception as e:
-            print(f"Failed to trigger chat for user {user_id}: {e}")
+def send_chat_notification(payload):
+    """
+    Scheduled job the agent pipeline queues for high-severity calls. Registered
+    here too so a pending one is not failed for want of a handler when the
+    scheduler starts before the agent module has been loaded.
+    """
+    agent_module().send_chat_notification(payload)
 
-    # Start the delayed trigger in a separate thread
-    trigger_thread = threading.Thread(target=delayed_trigger)
-    trigger_thread.daemon = True
-    trigger_thread.start()
+scheduler.register("chat_trigger", write_chat_trigger)
+scheduler.register("chat_notification", send_chat_notification)
 
 # -----------------------------
 # Home route
 # -----------------------------
-@app.route('/')
+@api.route('/')
 def home():
     try:
-        print("Databases:", client.list_database_names())
-        print("Collections:", db.list_collection_names())
+        print("Databases:", get_client().list_database_names())
+        print("Collections:", get_db().list_collection_names())
         return "Flask server is running! MongoDB connected successfully."
     except Exception as e:
         print(f"Database error: {e}")
@@ -123,90 +324,319 @@ def home():
 
 #     return jsonify(calls)
 
-@app.route('/call', methods=['POST'])
-def add_call():
-    data = request.json
-
+def build_call_document(data):
+    """Validate a call payload and build its document. Returns (document, error)."""
     # Validate required fields
     required_fields = ["callID", "userID", "transcripts", "severityScore", "date"]
     for field in required_fields:
         if field not in data:
-            return jsonify({"error": f"Missing field: {field}"}), 400
+            return None, f"Missing field: {field}"
 
     # Convert date string to datetime object (optional)
     try:
         call_date = datetime.fromisoformat(data["date"])
-    except ValueError:
-        return jsonify({"error": "Invalid date format. Use ISO format (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)"}), 400
+    except (ValueError, TypeError):
+        return None, "Invalid date format. Use ISO format (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)"
 
     # Prepare new call document
-    new_call = {
+    call = {
         "callID": data["callID"],
         "userID": data["userID"],
         "transcripts": data["transcripts"],
         "severityScore": data["severityScore"],
         "date": call_date
     }
+    # Where the score came from ("model", "triage", ...); the local severity model trains on "model" scores
+    if "severitySource" in data:
+        call["severitySource"] = data["severitySource"]
+    return call, None
 
-    # Insert into MongoDB
-    result = collection.insert_one(new_call)
+def wellness_bucket_update(call):
+    """$inc update adding one call to its user's day bucket in wellness_aggregates"""
+    return UpdateOne(
+        {"userID": call["userID"], "day": call["date"].date().isoformat()},
+        {"$inc": {"severitySum": call["severityScore"], "callCount": 1}},
+        upsert=True
+    )
 
-    return jsonify({
+def record_wellness_buckets(calls):
+    """
+    Add stored calls to the per-user, per-day severity sum/count buckets that
+    wellness scores are computed from, so no caller has to rescan call history.
+    """
+    operations = wellness_bucket_updates(calls)
+    if operations:
+        get_db()["wellness_aggregates"].bulk_write(operations, ordered=False)
+
+def wellness_bucket_updates(calls):
+    """Bucket updates for the calls that have a numeric severity score"""
+    return [
+        wellness_bucket_update(call) for call in calls
+        if isinstance(call["severityScore"], (int, float)) and not isinstance(call["severityScore"], bool)
+    ]
+
+def last_call_record_id(db):
+    """_id of the most recently inserted call record, or None if there are none"""
+    last = db["call_records"].find_one({}, {"_id": 1}, sort=[("_id", DESCENDING)])
+    return last["_id"] if last else None
+
+# Scratch collection rebuild_wellness_aggregates() builds into before swapping it in
+WELLNESS_REBUILD_COLLECTION = "wellness_aggregates_rebuild"
+
+def rebuild_wellness_aggregates(db=None):
+    """
+    Recompute wellness_aggregates from call_records, e.g. to backfill existing history.
+
+    The buckets are built into a scratch collection with $out and renamed over the
+    live one, so readers never see it empty or half built. Calls stored while the
+    rebuild runs add to the collection being replaced, so they are re-applied to
+    the new one after the swap. String dates from older records are converted;
+    records whose date cannot be parsed are skipped. Returns the number of buckets.
+    """
+    db = db if db is not None else get_db()
+    cutoff = last_call_record_id(db)
+    if cutoff is None:
+        return 0
+    db["call_records"].aggregate([
+        {"$match": {"_id": {"$lte": cutoff}, "severityScore": {"$type": "number"}}},
+        {"$project": {
+            "userID": 1,
+            "severityScore": 1,
+            "date": {"$convert": {"input": "$date", "to": "date", "onError": None, "onNull": None}}
+        }},
+        {"$match": {"date": {"$ne": None}}},
+        {"$group": {
+            "_id": {
+                "userID": "$userID",
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}}
+            },
+            "severitySum": {"$sum": "$severityScore"},
+            "callCount": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": 0,
+            "userID": "$_id.userID",
+            "day": "$_id.day",
+            "severitySum": 1,
+            "callCount": 1
+        }},
+        {"$out": WELLNESS_REBUILD_COLLECTION}
+    ])
+
+    rebuilt = db[WELLNESS_REBUILD_COLLECTION]
+    for keys, options in INDEX_MANIFEST["wellness_aggregates"]:
+        rebuilt.create_index(keys, **options)
+    buckets = rebuilt.count_documents({})
+    rebuilt.rename("wellness_aggregates", dropTarget=True)
+    swapped = last_call_record_id(db)
+
+    # Calls stored between the cutoff and the swap were counted into the old collection only
+    late_calls = db["call_records"].find({"_id": {"$gt": cutoff, "$lte": swapped}, "date": {"$type": "date"}},
+                                         {"userID": 1, "date": 1, "severityScore": 1})
+    operations = wellness_bucket_updates(list(late_calls))
+    if operations:
+        db["wellness_aggregates"].bulk_write(operations, ordered=False)
+    return buckets
+
+def store_call(data):
+    """Validate and insert a call record. Returns (payload, status_code)."""
+    new_call, error = build_call_document(data)
+    if error:
+        return {"error": error}, 400
+
+    # Insert into MongoDB through the write-behind buffer; wellness buckets are
+    # counted per flushed batch, once the records are actually stored
+    future = get_write_buffer("call_records").submit(new_call)
+
+    if not waits_for_write("call"):
+        return {
+            "status": "success",
+            "message": "Call accepted",
+            "call_id": str(new_call["_id"])
+        }, 202
+
+    try:
+        future.result()
+    except DuplicateKeyError:
+        return {"error": f"Call {new_call['callID']} already exists"}, 409
+
+    return {
+        "status": "success",
         "message": "Call added successfully",
-        "call_id": str(result.inserted_id)
-    }), 201
+        "call_id": str(new_call["_id"])
+    }, 201
+
+@api.route('/call', methods=['POST'])
+def add_call():
+    payload, status = store_call(request.json)
+    return jsonify(payload), status
 
 
-@app.route('/user/<userID>', methods=['PUT'])
-def put_call(userID):
-    data = request.json
-    collection = db["users"]
-    
+def store_calls(data):
+    """
+    Validate and insert a batch of call records with a single insert_many.
+    Returns (payload, status_code) with a per-item result in request order.
+    """
+    calls = (data or {}).get("calls")
+    if not isinstance(calls, list) or not calls:
+        return {"error": "calls must be a non-empty list"}, 400
+
+    results = [None] * len(calls)
+    documents = []
+    document_indexes = []
+    for index, call in enumerate(calls):
+        document, error = build_call_document(call if isinstance(call, dict) else {})
+        if error:
+            results[index] = {"index": index, "status": "error", "error": error}
+        else:
+            documents.append(document)
+            document_indexes.append(index)
+
+    failed = {}
+    if documents:
+        try:
+            # Unordered so one bad document does not stop the rest of the batch
+            get_db()["call_records"].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                failed[write_error["index"]] = write_error.get("errmsg", "Write failed")
+
+    stored = []
+    for position, (index, document) in enumerate(zip(document_indexes, documents)):
+        if position in failed:
+            results[index] = {"index": index, "status": "error", "error": failed[position]}
+        else:
+            results[index] = {"index": index, "status": "success", "call_id": str(document["_id"])}
+            stored.append(document)
+
+    # The records are already stored, so a failed bucket update must not fail the batch
+    try:
+        record_wellness_buckets(stored)
+    except Exception as e:
+        print(f"Wellness bucket update for {len(stored)} stored calls failed: {e}")
+
+    return {
+        "status": "success",
+        "inserted": sum(1 for result in results if result["status"] == "success"),
+        "results": results
+    }, 200
+
+def add_call_to_user(data, userID):
+    """
+    Add a callID to the user's bucketed call history, creating the user if needed.
+    Returns (payload, status_code).
+
+    By default the user document is echoed back. With "response": "delta" (in the
+    body or query string) only the change is returned, which needs no extra read.
+    """
     # Validate request data
     if not data or 'callID' not in data:
-        return jsonify({"error": "callID is required in request body"}), 400
-    
+        return {"error": "callID is required in request body"}, 400
+
     try:
         callID = int(data['callID'])
     except (ValueError, TypeError):
-        return jsonify({"error": "callID must be a valid integer"}), 400
-    
-    # Find the user document by userID
-    user = collection.find_one({"userID": userID})
-
-    if not user:
-        # Auto-create user if they don't exist
-        new_user = {
-            "userID": userID,
-            "calls": []
-        }
-        collection.insert_one(new_user)
-        print(f"Created new user: {userID}")  # Debug print
-    
-    # Append the callID to the calls array
-    result = collection.update_one(
-        {"userID": userID},
-        {"$push": {"calls": callID}}
-    )
-    
-    if result.modified_count == 0:
-        return jsonify({"error": "Failed to update user"}), 500
-    
-    # Get the updated user document
-    updated_user = collection.find_one({"userID": userID}, {"_id": 0})
-    
-    print("Updated user document:", updated_user)  # Debug print
-    
-    return jsonify({
+        return {"error": "callID must be a valid integer"}, 400
+
+    try:
+        call_date = datetime.fromisoformat(data["date"]) if data.get("date") else datetime.now()
+    except (ValueError, TypeError):
+        return {"error": "Invalid date format. Use ISO format (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)"}, 400
+
+    # Calls are recorded in month buckets instead of an ever-growing users.calls
+    # array; a callID already in the user's history is not added twice
+    added, user_created = history.append_call(get_db(), userID, callID, call_date)
+
+    if data.get("response") == "delta":
+        return {
+            "status": "success",
+            "message": f"Successfully added callID {callID} to user {userID}",
+            "delta": {
+                "userID": userID,
+                "callID": callID,
+                "month": history.month_of(call_date),
+                "user_created": user_created,
+                "added": added
+            }
+        }, 200
+
+    return {
+        "status": "success",
         "message": f"Successfully added callID {callID} to user {userID}",
-        "user": updated_user
-    }), 200
+        "user": get_db()["users"].find_one({"userID": userID}, {"_id": 0})
+    }, 200
+
+@api.route('/user/<userID>', methods=['PUT'])
+def put_call(userID):
+    payload, status = add_call_to_user({**request.args.to_dict(), **(request.json or {})}, userID)
+    return jsonify(payload), status
+
+
+def add_calls_to_users(data):
+    """
+    Append callIDs to many users' bucketed call histories with bulk writes,
+    creating users that do not exist yet. Returns (payload, status_code).
+    """
+    updates = (data or {}).get("updates")
+    if not isinstance(updates, list) or not updates:
+        return {"error": "updates must be a non-empty list"}, 400
+
+    # Group calls per user, keeping request order within each user
+    calls_by_user = {}
+    errors = []
+    for index, update in enumerate(updates):
+        try:
+            userID = update["userID"]
+            callID = int(update["callID"])
+            call_date = datetime.fromisoformat(update["date"]) if update.get("date") else datetime.now()
+        except (KeyError, ValueError, TypeError):
+            errors.append({"index": index, "error": "userID and integer callID are required, date must be ISO format"})
+            continue
+        calls_by_user.setdefault(userID, []).append((callID, call_date))
+
+    added, failed = history.append_calls(get_db(), calls_by_user) if calls_by_user else ({}, set())
+    for userID in failed:
+        errors.append({"userID": userID, "error": "Failed to update call history"})
+
+    # Only callIDs that were appended; ones already in a user's history are left out
+    return {
+        "status": "success",
+        "users": added,
+        "errors": errors
+    }, 200
+
+@api.route('/calls', methods=['POST'])
+def add_calls():
+    payload, status = store_calls(request.json)
+    return jsonify(payload), status
+
+
+@api.route('/users/calls', methods=['PUT'])
+def put_calls():
+    payload, status = add_calls_to_users(request.json)
+    return jsonify(payload), status
 
 
 # -----------------------------
 # Agent endpoints
 # -----------------------------
-@app.route('/analyze-call', methods=['POST'])
+def schedule_chat_triggers(result, user_id, call_id):
+    """
+    Schedule the delayed chat trigger (if the score meets the threshold) and the
+    follow-ups for a scored call, recording what was scheduled on its result
+    """
+    severity_score = result["severity_score"] / 100.0  # Convert to 0-1 scale to match threshold
+    if severity_score >= CHAT_TRIGGER_THRESHOLD:
+        # Trigger chat after 10 seconds
+        trigger_chat_after_delay(user_id=user_id, call_id=call_id, severity_score=result["severity_score"])
+        result["chat_trigger_scheduled"] = True
+        result["threshold_met"] = True
+    else:
+        result["chat_trigger_scheduled"] = False
+        result["threshold_met"] = False
+    result["follow_ups_scheduled"] = schedule_follow_ups(user_id, call_id, result["severity_score"])
+
+@api.route('/analyze-call', methods=['POST'])
 def analyze_call():
     """Analyze emergency call transcript and update wellness scores"""
     data = request.json
@@ -218,7 +648,7 @@ def analyze_call():
             return jsonify({"error": f"Missing field: {field}"}), 400
 
     try:
-        result = analyze_call_and_update_wellness(
+        result = agent_module().analyze_call_and_update_wellness(
             transcript=data["transcript"],
             call_id=data["call_id"],
             user_id=data["user_id"]
@@ -226,19 +656,7 @@ def analyze_call():
 
         # Check if severity score meets threshold for chat trigger
         if result["status"] == "success" and "severity_score" in result:
-            severity_score = result["severity_score"] / 100.0  # Convert to 0-1 scale to match threshold
-            if severity_score >= CHAT_TRIGGER_THRESHOLD:
-                # Trigger chat after 10 seconds
-                trigger_chat_after_delay(
-                    user_id=data["user_id"],
-                    call_id=data["call_id"],
-                    severity_score=result["severity_score"]
-                )
-                result["chat_trigger_scheduled"] = True
-                result["threshold_met"] = True
-            else:
-                result["chat_trigger_scheduled"] = False
-                result["threshold_met"] = False
+            schedule_chat_triggers(result, data["user_id"], data["call_id"])
 
         return jsonify(result), 200 if result["status"] == "success" else 500
 
@@ -249,7 +667,33 @@ def analyze_call():
         }), 500
 
 
-@app.route('/push-notification', methods=['POST'])
+@api.route('/analyze-calls', methods=['POST'])
+def analyze_calls():
+    """Analyze a batch of emergency call transcripts and update wellness once per user"""
+    data = request.json
+
+    calls = (data or {}).get("calls")
+    if not isinstance(calls, list) or not calls:
+        return jsonify({"error": "calls must be a non-empty list"}), 400
+
+    try:
+        result = agent_module().analyze_calls_and_update_wellness(calls)
+
+        # Check each scored call against the chat trigger threshold
+        for item in result.get("results", []):
+            if item["status"] == "success" and "severity_score" in item:
+                schedule_chat_triggers(item, item["user_id"], item["call_id"])
+
+        return jsonify(result), 200 if result["status"] == "success" else 500
+
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "error_message": f"Failed to analyze calls: {str(e)}"
+        }), 500
+
+
+@api.route('/push-notification', methods=['POST'])
 def push_notification():
     """Push severity-based notification to user"""
     data = request.json
@@ -261,7 +705,7 @@ def push_notification():
             return jsonify({"error": f"Missing field: {field}"}), 400
 
     try:
-        result = push_notification_based_on_severity(
+        result = agent_module().push_notification_based_on_severity(
             user_id=data["user_id"],
             severity_score=data["severity_score"]
         )
@@ -275,92 +719,522 @@ def push_notification():
 
 
 # -----------------------------
-# Additional endpoints for agent functionality
+# Severity scoring endpoints
 # -----------------------------
-@app.route('/users/<user_id>/calls', methods=['GET'])
-def get_user_calls_for_agent(user_id):
-    """Get user's call history for wellness calculations"""
-    # For now, return empty array - would implement proper user call tracking later
+@api.route('/scoring/stats', methods=['GET'])
+def scoring_stats():
+    """Report severity scoring tier, cache, coalescing and admission queue statistics"""
     return jsonify({
-        "calls": [],
-        "status": "success"
+        "status": "success",
+        "triage": severity_triage_stats.stats(),
+        "cache": severity_score_cache.stats(),
+        "coalescing": severity_flight.stats(),
+        "admission": severity_admission.stats()
     }), 200
 
 
-@app.route('/users/<user_id>/wellness', methods=['POST'])
-def update_user_wellness_scores(user_id):
-    """Update user's wellness scores"""
-    data = request.json
+@api.route('/storage/stats', methods=['GET'])
+def storage_stats():
+    """Report write-behind queue depth and flush latency per collection"""
+    return jsonify({
+        "status": "success",
+        "write_behind": {name: buffer.stats() for name, buffer in worker_state().write_buffers.items()},
+        "chat_trigger_subscriptions": worker_state().chat_trigger_broker.stats()
+    }), 200
 
-    # For now, just return success - would implement wellness tracking later
+
+@api.route('/scheduler/stats', methods=['GET'])
+def scheduler_stats():
+    """Report scheduled job counts for this process"""
     return jsonify({
         "status": "success",
-        "message": f"Wellness scores updated for user {user_id}"
+        "scheduler": scheduler.stats()
     }), 200
 
 
-@app.route('/notifications', methods=['POST'])
-def send_notification_endpoint():
-    """Send notification to user"""
-    data = request.json
+@api.route('/scoring/cache', methods=['DELETE'])
+def invalidate_scoring_cache():
+    """Invalidate cached severity scores, e.g. after the prompt or scoring criteria change"""
+    data = request.get_json(silent=True) or {}
+    removed = severity_score_cache.invalidate(data.get("transcript"))
+    return jsonify({
+        "status": "success",
+        "invalidated": removed
+    }), 200
+
 
+# -----------------------------
+# Additional endpoints for agent functionality
+# -----------------------------
+# Fields returned by /users/<user_id>/calls unless ?fields= asks for others.
+# Transcripts are the bulk of each record and are left out by default.
+CALL_HISTORY_FIELDS = ["callID", "userID", "severityScore", "date"]
+CALL_HISTORY_DEFAULT_LIMIT = 50
+CALL_HISTORY_MAX_LIMIT = 500
+
+def encode_call_cursor(call):
+    """Opaque keyset cursor for the (date, _id) position of a call record"""
+    raw = json.dumps([call["date"].isoformat(), str(call["_id"])])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_call_cursor(cursor):
+    date_text, object_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.fromisoformat(date_text), ObjectId(object_id)
+
+def serialize_call(call):
+    call = dict(call)
+    call["_id"] = str(call["_id"])
+    if isinstance(call.get("date"), datetime):
+        call["date"] = call["date"].isoformat()
+    return call
+
+def is_date_only(value):
+    """True for an ISO date without a time part (YYYY-MM-DD)"""
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+def user_calls_query(data, user_id):
+    """
+    Build the newest-first call_records query for a user.
+
+    Supported parameters: from / to (ISO dates or datetimes, inclusive; a date-only
+    to covers that whole day), fields (comma separated,
+    default CALL_HISTORY_FIELDS), limit and cursor (next_cursor of the previous page).
+    Pages are keyset-paginated on (date, _id), so each page is an index range scan
+    rather than a growing skip. Returns (query, projection, sort, limit, error).
+    """
+    query = {"userID": user_id}
+    try:
+        date_range = {}
+        if data.get("from"):
+            date_range["$gte"] = datetime.fromisoformat(data["from"])
+        if data.get("to"):
+            if is_date_only(data["to"]):
+                date_range["$lt"] = datetime.fromisoformat(data["to"]) + timedelta(days=1)
+            else:
+                date_range["$lte"] = datetime.fromisoformat(data["to"])
+        if date_range:
+            query["date"] = date_range
+    except ValueError:
+        return None, None, None, None, "Invalid date format. Use ISO format (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)"
+
+    if data.get("cursor"):
+        try:
+            cursor_date, cursor_id = decode_call_cursor(data["cursor"])
+        except (ValueError, TypeError, InvalidId):
+            return None, None, None, None, "Invalid cursor"
+        query = {"$and": [query, {"$or": [
+            {"date": {"$lt": cursor_date}},
+            {"date": cursor_date, "_id": {"$lt": cursor_id}}
+        ]}]}
+
+    try:
+        limit = int(data.get("limit", CALL_HISTORY_DEFAULT_LIMIT))
+    except (ValueError, TypeError):
+        return None, None, None, None, "limit must be an integer"
+    limit = max(1, min(limit, CALL_HISTORY_MAX_LIMIT))
+
+    fields = [field for field in data.get("fields", "").split(",") if field] or CALL_HISTORY_FIELDS
+    # date and _id are always returned since the cursor is built from them
+    projection = {field: 1 for field in fields + ["date", "_id"]}
+
+    return query, projection, [("date", DESCENDING), ("_id", DESCENDING)], limit, None
+
+def query_user_calls(data, user_id):
+    """Run user_calls_query. Returns (cursor, limit, error)."""
+    query, projection, sort, limit, error = user_calls_query(data, user_id)
+    if error:
+        return None, None, error
+    # One extra record tells us whether there is a next page
+    return get_db()["call_records"].find(query, projection).sort(sort).limit(limit + 1), limit, None
+
+def fetch_user_calls(data, user_id):
+    """Get one page of a user's call history. Returns (payload, status_code)."""
+    cursor, limit, error = query_user_calls(data, user_id)
+    if error:
+        return {"error": error}, 400
+
+    calls = list(cursor)
+    next_cursor = encode_call_cursor(calls[limit - 1]) if len(calls) > limit else None
+    return {
+        "calls": [serialize_call(call) for call in calls[:limit]],
+        "next_cursor": next_cursor,
+        "status": "success"
+    }, 200
+
+@api.route('/users/<user_id>/calls', methods=['GET'])
+def get_user_calls_for_agent(user_id):
+    """Get one page of a user's call history, streamed record by record"""
+    cursor, limit, error = query_user_calls(request.args.to_dict(), user_id)
+    if error:
+        return jsonify({"error": error}), 400
+
+    def generate():
+        yield '{"status": "success", "calls": ['
+        last_call = None
+        for count, call in enumerate(cursor):
+            if count == limit:
+                # Extra record fetched only to detect a next page
+                yield f'], "next_cursor": {json.dumps(encode_call_cursor(last_call))}}}'
+                return
+            yield ("," if count else "") + json.dumps(serialize_call(call))
+            last_call = call
+        yield '], "next_cursor": null}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def fetch_call_history_buckets(data, user_id):
+    """
+    Get a user's monthly call history buckets, optionally limited to
+    from_month / to_month (YYYY-MM). Returns (payload, status_code).
+    """
+    buckets = history.fetch_buckets(get_db(), user_id, data.get("from_month"), data.get("to_month"))
+    return {
+        "status": "success",
+        "buckets": [
+            {**bucket, "calls": [
+                {**call, "date": call["date"].isoformat() if isinstance(call.get("date"), datetime) else call.get("date")}
+                for call in bucket.get("calls", [])
+            ]}
+            for bucket in buckets
+        ]
+    }, 200
+
+@api.route('/users/<user_id>/call-history', methods=['GET'])
+def get_user_call_history(user_id):
+    """Get user's call history buckets for the requested months"""
+    payload, status = fetch_call_history_buckets(request.args.to_dict(), user_id)
+    return jsonify(payload), status
+
+
+def store_wellness_scores(data, user_id):
+    """Update user's wellness scores. Returns (payload, status_code)."""
+    # For now, just return success - would implement wellness tracking later
+    return {
+        "status": "success",
+        "message": f"Wellness scores updated for user {user_id}"
+    }, 200
+
+def fetch_wellness_aggregates(data, user_id):
+    """
+    Get a user's per-day severity buckets, optionally only days on or after
+    data["since"] (YYYY-MM-DD). Returns (payload, status_code).
+    """
+    buckets = get_db()["wellness_aggregates"].find(wellness_buckets_query(data, user_id), WELLNESS_BUCKET_PROJECTION)
+    return wellness_buckets_payload(buckets), 200
+
+WELLNESS_BUCKET_PROJECTION = {"_id": 0, "day": 1, "severitySum": 1, "callCount": 1}
+
+def wellness_buckets_query(data, user_id):
+    query = {"userID": user_id}
+    if data.get("since"):
+        query["day"] = {"$gte": data["since"]}
+    return query
+
+def wellness_buckets_payload(buckets):
+    return {
+        "status": "success",
+        "buckets": [
+            {"day": bucket["day"], "severity_sum": bucket["severitySum"], "call_count": bucket["callCount"]}
+            for bucket in buckets
+        ]
+    }
+
+@api.route('/users/<user_id>/wellness-aggregates', methods=['GET'])
+def get_user_wellness_aggregates(user_id):
+    """Get user's per-day severity buckets for wellness calculations"""
+    payload, status = fetch_wellness_aggregates(request.args.to_dict(), user_id)
+    return jsonify(payload), status
+
+
+# -----------------------------
+# Chat trigger delivery
+# -----------------------------
+# Clients either hold a long-poll (GET /users/<user_id>/chat-triggers?after=<id>&wait=25)
+# or an event stream (GET /users/<user_id>/chat-triggers/stream) instead of polling
+# for new calls. Both resume from the last trigger id the client saw.
+def fetch_chat_triggers(data, user_id):
+    """
+    Unacknowledged chat triggers newer than the "after" id, waiting up to "wait"
+    seconds for one to arrive if there are none yet. Returns (payload, status_code).
+    """
+    after = parse_event_id(data.get("after"))
+    if data.get("after") and after is None:
+        return {"error": "after must be a chat trigger id"}, 400
+    try:
+        wait = min(float(data.get("wait", 0)), CHAT_EVENTS_CONFIG.get("long_poll_timeout_seconds", 25))
+    except ValueError:
+        return {"error": "wait must be a number of seconds"}, 400
+
+    replay_limit = CHAT_EVENTS_CONFIG.get("replay_limit", 50)
+    # Subscribe before reading so a trigger written in between is not missed
+    broker = worker_state().chat_trigger_broker
+    subscription = broker.subscribe(user_id)
+    try:
+        triggers = pending_triggers(get_db()["chat_triggers"], user_id, after, replay_limit)
+        deadline = time.monotonic() + wait
+        while not triggers and time.monotonic() < deadline:
+            trigger = subscription.get(deadline - time.monotonic())
+            if trigger is not None and (after is None or trigger["_id"] > after):
+                triggers = pending_triggers(get_db()["chat_triggers"], user_id, after, replay_limit)
+    finally:
+        broker.unsubscribe(subscription)
+
+    return {
+        "status": "success",
+        "triggers": [serialize_trigger(trigger) for trigger in triggers],
+        "last_event_id": str(triggers[-1]["_id"]) if triggers else data.get("after")
+    }, 200
+
+@api.route('/users/<user_id>/chat-triggers', methods=['GET'])
+def get_chat_triggers(user_id):
+    """Long-poll for a user's new chat triggers"""
+    payload, status = fetch_chat_triggers(request.args, user_id)
+    return jsonify(payload), status
+
+
+def format_chat_event(trigger):
+    return f"id: {trigger['_id']}\nevent: chat_trigger\ndata: {json.dumps(serialize_trigger(trigger))}\n\n"
+
+@api.route('/users/<user_id>/chat-triggers/stream', methods=['GET'])
+def stream_chat_triggers(user_id):
+    """
+    Server-sent events for a user's chat triggers. Replays unacknowledged triggers
+    after Last-Event-ID (header, or last_event_id query parameter for the first
+    connect), then pushes new ones as they are written, with heartbeat comments
+    in between to keep proxies from closing the connection.
+    """
+    last_id = parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    heartbeat = CHAT_EVENTS_CONFIG.get("heartbeat_seconds", 15)
+    broker = worker_state().chat_trigger_broker
+
+    def generate():
+        nonlocal last_id
+        # Subscribed on the first read, so a response that is never iterated holds
+        # no subscription; still before the replay, so no trigger falls in between
+        subscription = broker.subscribe(user_id)
+        try:
+            yield f"retry: {CHAT_EVENTS_CONFIG.get('retry_ms', 3000)}\n\n"
+            for trigger in pending_triggers(get_db()["chat_triggers"], user_id, last_id,
+                                            CHAT_EVENTS_CONFIG.get("replay_limit", 50)):
+                last_id = trigger["_id"]
+                yield format_chat_event(trigger)
+
+            while True:
+                trigger = subscription.get(heartbeat)
+                if subscription.overflowed:
+                    # Fell behind; end the stream so the client reconnects and replays from Last-Event-ID
+                    return
+                if trigger is None:
+                    yield ": heartbeat\n\n"
+                elif last_id is None or trigger["_id"] > last_id:
+                    last_id = trigger["_id"]
+                    yield format_chat_event(trigger)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def acknowledge_chat_trigger(data, user_id, trigger_id):
+    """Mark a chat trigger as seen so it is not delivered again. Returns (payload, status_code)."""
+    trigger_object_id = parse_event_id(trigger_id)
+    if trigger_object_id is None:
+        return {"error": "Invalid chat trigger id"}, 400
+
+    result = get_db()["chat_triggers"].update_one(
+        {"_id": trigger_object_id, "user_id": user_id},
+        {"$set": {"acknowledged": True, "acknowledged_at": datetime.utcnow()}}
+    )
+    if not result.matched_count:
+        return {"error": "Chat trigger not found"}, 404
+    return {"status": "success", "trigger_id": trigger_id}, 200
+
+@api.route('/users/<user_id>/chat-triggers/<trigger_id>/acknowledge', methods=['POST'])
+def post_chat_trigger_acknowledgement(user_id, trigger_id):
+    """Acknowledge a chat trigger"""
+    payload, status = acknowledge_chat_trigger(request.get_json(silent=True) or {}, user_id, trigger_id)
+    return jsonify(payload), status
+
+
+@api.route('/users/<user_id>/wellness', methods=['POST'])
+def update_user_wellness_scores(user_id):
+    """Update user's wellness scores"""
+    payload, status = store_wellness_scores(request.json, user_id)
+    return jsonify(payload), status
+
+
+def store_notification(data):
+    """Send notification to user. Returns (payload, status_code)."""
     # For now, just return success - would implement notification system later
-    return jsonify({
+    return {
         "status": "success",
         "message": "Notification sent successfully"
-    }), 200
+    }, 200
+
+@api.route('/notifications', methods=['POST'])
+def send_notification_endpoint():
+    """Send notification to user"""
+    payload, status = store_notification(request.json)
+    return jsonify(payload), status
+
+
+# -----------------------------
+# In-process transport for the agent
+# -----------------------------
+# The agent normally reaches these endpoints over HTTP. Inside this process that
+# would be a loopback request that holds a worker while it waits on another one,
+# so route the agent's backend calls straight to the data-access functions.
+# Set AGENT_BACKEND_TRANSPORT=http to keep the loopback behaviour.
+backend_transport = InProcessTransport()
+backend_transport.add_route('/call', 'POST', store_call)
+backend_transport.add_route('/calls', 'POST', store_calls)
+backend_transport.add_route('/users/calls', 'PUT', add_calls_to_users)
+backend_transport.add_route('/user/<userID>', 'PUT', add_call_to_user)
+backend_transport.add_route('/users/<user_id>/calls', 'GET', fetch_user_calls)
+backend_transport.add_route('/users/<user_id>/call-history', 'GET', fetch_call_history_buckets)
+backend_transport.add_route('/users/<user_id>/wellness-aggregates', 'GET', fetch_wellness_aggregates)
+backend_transport.add_route('/users/<user_id>/wellness', 'POST', store_wellness_scores)
+backend_transport.add_route('/notifications', 'POST', store_notification)
+
 
+# -----------------------------
+# Chat
+# -----------------------------
+CHAT_PROMPT = """You are a peer support companion for a first responder who has just come off a difficult call.
+Respond warmly and briefly (at most four sentences). Do not diagnose. If they mention wanting to hurt
+themselves, encourage them to contact a crisis line or someone they trust right away.
+
+Call context: {context}
+
+Responder: {message}"""
+
+CANNED_CHAT_RESPONSES = {
+    "concern": "I can hear that you're going through a tough time right now. It's completely understandable to feel this way after a difficult call. You're not alone in this. Would you like me to connect you with someone who can provide additional support?",
+    "positive": "I'm glad to hear you're doing okay. It's important to check in with yourself regularly after these kinds of calls. Is there anything specific about the call that's on your mind?",
+    "default": "Thank you for sharing that with me. It takes courage to talk about these experiences. How are you feeling physically right now? Are you getting enough rest?"
+}
 
+def canned_chat_response(matched):
+    if matched.get("concern"):
+        return CANNED_CHAT_RESPONSES["concern"]
+    if matched.get("positive"):
+        return CANNED_CHAT_RESPONSES["positive"]
+    return CANNED_CHAT_RESPONSES["default"]
+
+def chat_reply_chunks(user_message, context, matched):
+    """
+    Yield the reply in chunks as they are produced. With chat_model.enabled the
+    reply is streamed from Gemini; otherwise (or if Gemini fails before its
+    first token) the canned response for the matched keywords is yielded word
+    by word, so streaming clients behave the same either way.
+    """
+    config = get_config()
+    if config.get("chat_model", {}).get("enabled", False):
+        started = False
+        try:
+            model = severity_model_client.get_model(config)
+            for chunk in model.generate_content(CHAT_PROMPT.format(context=context, message=user_message), stream=True):
+                if chunk.text:
+                    started = True
+                    yield chunk.text
+            return
+        except Exception as e:
+            if started:
+                raise
+            print(f"Gemini chat generation failed, using canned response: {e}")
 
-@app.route('/chat-with-gemini', methods=['POST'])
+    words = canned_chat_response(matched).split(" ")
+    for index, word in enumerate(words):
+        yield word if index == len(words) - 1 else word + " "
+
+def store_chat_conversation(incident_id, user_message, response, context, completed=True):
+    conversation = {
+        "incident_id": incident_id,
+        "user_message": user_message,
+        "ai_response": response,
+        "timestamp": datetime.utcnow(),
+        "context": context
+    }
+    if not completed:
+        # Client went away mid-stream; keep what it was sent
+        conversation["interrupted"] = True
+    get_write_buffer("chat_conversations").submit(conversation, wait=waits_for_write("chat"))
+
+def wants_chat_stream(data):
+    return (str(request.args.get('stream', data.get('stream', ''))).lower() == 'true'
+            or 'text/event-stream' in request.headers.get('Accept', ''))
+
+def format_sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@api.route('/chat-with-gemini', methods=['POST'])
 def chat_with_gemini():
-    """Chat with Gemini AI for mental health support"""
+    """
+    Chat with Gemini AI for mental health support.
+
+    With ?stream=true (or "stream": true, or Accept: text/event-stream) the reply
+    is sent as server-sent events: "token" events carrying each chunk as it is
+    generated, then a "done" event with the full response. Crisis detection runs
+    on the incoming message before any generation starts, and the conversation is
+    stored once the stream has finished.
+    """
     try:
         data = request.json
         user_message = data.get('message', '')
         context = data.get('context', '')
         incident_id = data.get('incidentId', '')
         
-        # For demo purposes, use a simple response system
-        # In production, this would integrate with actual Gemini API
-        lower_message = user_message.lower()
-        
-        # Crisis detection keywords
-        crisis_keywords = [
-            'not good', 'terrible', 'awful', 'horrible', 'can\'t cope', 
-            'overwhelmed', 'depressed', 'suicidal', 'want to die', 
-            'end it all', 'kill myself', 'harm myself'
-        ]
-        
-        if any(keyword in lower_message for keyword in crisis_keywords):
-            return jsonify({
-                "status": "success",
-                "response": "CRISIS_DETECTED",
-                "severity": "high"
-            }), 200
-        
-        # Mental health concerns
-        concern_keywords = [
-            'struggling', 'hard time', 'difficult', 'stress', 'anxiety', 
-            'worried', 'scared', 'afraid', 'trouble', 'problem'
-        ]
-        
-        if any(keyword in lower_message for keyword in concern_keywords):
-            response = "I can hear that you're going through a tough time right now. It's completely understandable to feel this way after a difficult call. You're not alone in this. Would you like me to connect you with someone who can provide additional support?"
-        elif any(word in lower_message for word in ['okay', 'fine', 'alright', 'good']):
-            response = "I'm glad to hear you're doing okay. It's important to check in with yourself regularly after these kinds of calls. Is there anything specific about the call that's on your mind?"
-        else:
-            response = "Thank you for sharing that with me. It takes courage to talk about these experiences. How are you feeling physically right now? Are you getting enough rest?"
+        # Crisis, concern and positive keywords are matched in a single pass
+        matched = get_lexicon("chat", get_config()).find(user_message)
+
+        crisis = {
+            "status": "success",
+            "response": "CRISIS_DETECTED",
+            "severity": "high"
+        }
+
+        if wants_chat_stream(data):
+            def generate():
+                if matched.get("crisis"):
+                    yield format_sse("crisis", crisis)
+                    return
+
+                chunks = []
+                completed = False
+                try:
+                    for chunk in chat_reply_chunks(user_message, context, matched):
+                        chunks.append(chunk)
+                        yield format_sse("token", {"text": chunk})
+                    completed = True
+                    yield format_sse("done", {"status": "success", "response": "".join(chunks), "severity": "normal"})
+                except Exception as e:
+                    yield format_sse("error", {"status": "error", "message": str(e)})
+                finally:
+                    if chunks:
+                        store_chat_conversation(incident_id, user_message, "".join(chunks), context, completed)
+
+            return Response(
+                stream_with_context(generate()),
+                mimetype='text/event-stream',
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+
+        if matched.get("crisis"):
+            return jsonify(crisis), 200
+
+        response = "".join(chat_reply_chunks(user_message, context, matched))
         
         # Store the conversation in database
-        conversation_collection = db["chat_conversations"]
-        conversation_collection.insert_one({
-            "incident_id": incident_id,
-            "user_message": user_message,
-            "ai_response": response,
-            "timestamp": datetime.utcnow(),
-            "context": context
-        })
+        store_chat_conversation(incident_id, user_message, response, context)
         
         return jsonify({
             "status": "success",
@@ -375,6 +1249,26 @@ def chat_with_gemini():
         }), 500
 
 
+def create_app():
+    """
+    Build the Flask app. Safe to call in a pre-fork master: no MongoDB client,
+    connection or background thread is created here. Each worker process builds
+    its own client and state, and warms up on its first request, or earlier if
+    start_worker() is called (e.g. from gunicorn's post_fork hook). Until warm-up
+    finishes, the readiness gate holds requests and /health/ready returns 503.
+    """
+    app = Flask(__name__)
+    app.register_blueprint(api)
+    app.before_request(readiness_gate)
+
+    if os.getenv('AGENT_BACKEND_TRANSPORT', 'inprocess').lower() != 'http':
+        set_transport(backend_transport)
+    return app
+
+# For `python app.py`, `flask --app app run` and `gunicorn app:app`
+app = create_app()
+
 if __name__ == "__main__":
+    start_worker()
     debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
-    app.run(debug=debug_mode, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=debug_mode, host='0.0.0.0', port=5000)
@@ -0,0 +1,273 @@
+"""
+Async (ASGI) serving mode for the backend:
+
+    uvicorn asgi:app --workers 4
+
+Routes whose requests spend their time waiting are served on the event loop:
+/analyze-call waits on the severity model, /call and the call/wellness reads
+wait on MongoDB, and chat trigger long-polls and streams are held open. A request
+in flight there costs a coroutine, not a thread. These routes use pymongo's
+AsyncMongoClient and async Vertex AI calls. Every other route falls through to
+the Flask app (run on a thread pool by a2wsgi), so routes, status codes and
+JSON shapes are the same as in the WSGI mode.
+"""
+
+import asyncio
+import json
+import time
+
+from a2wsgi import WSGIMiddleware
+from pymongo.errors import DuplicateKeyError
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as backend
+from Agents.first_responder_agent.utils import get_config
+from chat_events import parse_event_id, pending_triggers_async, serialize_trigger
+from mongo import get_async_client, get_async_db
+
+ASGI_CONFIG = get_config().get("asgi", {})
+
+# Tasks for 202 (write-behind style) call inserts; referenced so they are not garbage collected
+_background_tasks = set()
+
+async def not_ready_response():
+    """None once this worker is warm; otherwise a 503 after waiting up to READINESS_TIMEOUT"""
+    state = backend.start_worker()
+    deadline = time.monotonic() + backend.READINESS_TIMEOUT
+    while not state.ready.is_set() and not state.warmed.is_set() and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    if state.ready.is_set():
+        return None
+    return JSONResponse({
+        "status": "error",
+        "error_message": f"Service is not ready: {state.error or 'warming up'}"
+    }, status_code=503, headers={"Retry-After": "1"})
+
+def gated(handler):
+    """Apply the readiness gate to a native route, as the Flask app does for its own"""
+    async def gated_handler(request):
+        return await not_ready_response() or await handler(request)
+    return gated_handler
+
+async def request_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+# -----------------------------
+# Agent endpoints
+# -----------------------------
+async def analyze_call(request):
+    """Analyze emergency call transcript and update wellness scores"""
+    data = await request_json(request) or {}
+
+    # Validate required fields
+    for field in ["transcript", "call_id", "user_id"]:
+        if field not in data:
+            return JSONResponse({"error": f"Missing field: {field}"}, status_code=400)
+
+    try:
+        # The first call may still be importing the agent; keep that off the event loop
+        agent = await run_in_threadpool(backend.agent_module)
+        result = await agent.analyze_call_and_update_wellness_async(
+            transcript=data["transcript"],
+            call_id=data["call_id"],
+            user_id=data["user_id"]
+        )
+
+        # Check if severity score meets threshold for chat trigger
+        if result["status"] == "success" and "severity_score" in result:
+            await run_in_threadpool(backend.schedule_chat_triggers, result, data["user_id"], data["call_id"])
+
+        return JSONResponse(result, status_code=200 if result["status"] == "success" else 500)
+
+    except Exception as e:
+        return JSONResponse({
+            "status": "error",
+            "error_message": f"Failed to analyze call: {str(e)}"
+        }, status_code=500)
+
+# -----------------------------
+# Calls
+# -----------------------------
+async def insert_call(call):
+    """Insert a call record and count it in its user's wellness bucket"""
+    db = get_async_db()
+    await db["call_records"].insert_one(call)
+    operations = backend.wellness_bucket_updates([call])
+    if operations:
+        await db["wellness_aggregates"].bulk_write(operations, ordered=False)
+
+def _report_background_failure(task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background call insert failed: {task.exception()}")
+
+async def add_call(request):
+    new_call, error = backend.build_call_document(await request_json(request) or {})
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+
+    if not backend.waits_for_write("call"):
+        task = asyncio.create_task(insert_call(new_call))
+        _background_tasks.add(task)
+        task.add_done_callback(_report_background_failure)
+        return JSONResponse({
+            "status": "success",
+            "message": "Call accepted",
+            "call_id": str(new_call["_id"])
+        }, status_code=202)
+
+    try:
+        await insert_call(new_call)
+    except DuplicateKeyError:
+        return JSONResponse({"error": f"Call {new_call['callID']} already exists"}, status_code=409)
+
+    return JSONResponse({
+        "status": "success",
+        "message": "Call added successfully",
+        "call_id": str(new_call["_id"])
+    }, status_code=201)
+
+async def get_user_calls(request):
+    """Get one page of a user's call history, streamed record by record"""
+    query, projection, sort, limit, error = backend.user_calls_query(
+        dict(request.query_params), request.path_params["user_id"])
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+
+    # One extra record tells us whether there is a next page
+    cursor = get_async_db()["call_records"].find(query, projection).sort(sort).limit(limit + 1)
+
+    async def generate():
+        yield '{"status": "success", "calls": ['
+        last_call = None
+        count = 0
+        async for call in cursor:
+            if count == limit:
+                # Extra record fetched only to detect a next page
+                yield f'], "next_cursor": {json.dumps(backend.encode_call_cursor(last_call))}}}'
+                return
+            yield ("," if count else "") + json.dumps(backend.serialize_call(call))
+            last_call = call
+            count += 1
+        yield '], "next_cursor": null}'
+
+    return StreamingResponse(generate(), media_type="application/json")
+
+async def get_user_wellness_aggregates(request):
+    """Get a user's per-day severity buckets"""
+    query = backend.wellness_buckets_query(dict(request.query_params), request.path_params["user_id"])
+    buckets = await get_async_db()["wellness_aggregates"].find(query, backend.WELLNESS_BUCKET_PROJECTION).to_list()
+    return JSONResponse(backend.wellness_buckets_payload(buckets))
+
+# -----------------------------
+# Chat trigger delivery
+# -----------------------------
+async def get_chat_triggers(request):
+    """Long-poll for a user's new chat triggers; see app.fetch_chat_triggers"""
+    user_id = request.path_params["user_id"]
+    data = request.query_params
+    after = parse_event_id(data.get("after"))
+    if data.get("after") and after is None:
+        return JSONResponse({"error": "after must be a chat trigger id"}, status_code=400)
+    try:
+        wait = min(float(data.get("wait", 0)), backend.CHAT_EVENTS_CONFIG.get("long_poll_timeout_seconds", 25))
+    except ValueError:
+        return JSONResponse({"error": "wait must be a number of seconds"}, status_code=400)
+
+    collection = get_async_db()["chat_triggers"]
+    replay_limit = backend.CHAT_EVENTS_CONFIG.get("replay_limit", 50)
+    # Subscribe before reading so a trigger written in between is not missed
+    broker = backend.worker_state().chat_trigger_broker
+    subscription = broker.subscribe(user_id, loop=asyncio.get_running_loop())
+    try:
+        triggers = await pending_triggers_async(collection, user_id, after, replay_limit)
+        deadline = time.monotonic() + wait
+        while not triggers and time.monotonic() < deadline:
+            trigger = await subscription.get(deadline - time.monotonic())
+            if trigger is not None and (after is None or trigger["_id"] > after):
+                triggers = await pending_triggers_async(collection, user_id, after, replay_limit)
+    finally:
+        broker.unsubscribe(subscription)
+
+    return JSONResponse({
+        "status": "success",
+        "triggers": [serialize_trigger(trigger) for trigger in triggers],
+        "last_event_id": str(triggers[-1]["_id"]) if triggers else data.get("after")
+    })
+
+async def stream_chat_triggers(request):
+    """Server-sent events for a user's chat triggers; see app.stream_chat_triggers"""
+    user_id = request.path_params["user_id"]
+    last_id = parse_event_id(request.headers.get("Last-Event-ID") or request.query_params.get("last_event_id"))
+    heartbeat = backend.CHAT_EVENTS_CONFIG.get("heartbeat_seconds", 15)
+    broker = backend.worker_state().chat_trigger_broker
+
+    async def generate():
+        nonlocal last_id
+        # As in app.stream_chat_triggers, subscribe only once the stream is read
+        subscription = broker.subscribe(user_id, loop=asyncio.get_running_loop())
+        try:
+            yield f"retry: {backend.CHAT_EVENTS_CONFIG.get('retry_ms', 3000)}\n\n"
+            for trigger in await pending_triggers_async(get_async_db()["chat_triggers"], user_id, last_id,
+                                                        backend.CHAT_EVENTS_CONFIG.get("replay_limit", 50)):
+                last_id = trigger["_id"]
+                yield backend.format_chat_event(trigger)
+
+            while True:
+                trigger = await subscription.get(heartbeat)
+                if subscription.overflowed:
+                    # Fell behind; end the stream so the client reconnects and replays from Last-Event-ID
+                    return
+                if trigger is None:
+                    yield ": heartbeat\n\n"
+                elif last_id is None or trigger["_id"] > last_id:
+                    last_id = trigger["_id"]
+                    yield backend.format_chat_event(trigger)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# -----------------------------
+# App
+# -----------------------------
+async def lifespan(app):
+    # Warm the sync side (pool, indexes, scheduler, severity model) and the async pool
+    backend.start_worker()
+    try:
+        await get_async_client().admin.command("ping")
+    except Exception as e:
+        print(f"Async MongoDB connection failed: {e}")
+    yield
+    await get_async_client().close()
+
+def create_asgi_app():
+    """
+    Build the ASGI app: native async routes first, then the Flask app for the rest.
+    Like create_app(), nothing here connects to MongoDB; each worker warms up in its lifespan.
+    """
+    flask_app = backend.create_app()
+    return Starlette(
+        routes=[
+            Route("/analyze-call", gated(analyze_call), methods=["POST"]),
+            Route("/call", gated(add_call), methods=["POST"]),
+            Route("/users/{user_id}/calls", gated(get_user_calls), methods=["GET"]),
+            Route("/users/{user_id}/wellness-aggregates", gated(get_user_wellness_aggregates), methods=["GET"]),
+            Route("/users/{user_id}/chat-triggers", gated(get_chat_triggers), methods=["GET"]),
+            Route("/users/{user_id}/chat-triggers/stream", gated(stream_chat_triggers), methods=["GET"]),
+            Mount("/", app=WSGIMiddleware(flask_app, workers=ASGI_CONFIG.get("wsgi_workers", 32)))
+        ],
+        lifespan=lifespan
+    )
+
+app = create_asgi_app()
@@ -0,0 +1,175 @@
+"""
+Push delivery of chat triggers.
+
+ChatTriggerBroker is an in-process pub/sub keyed by userID. Each open stream
+or long-poll request subscribes to its user and gets a bounded queue of new
+chat_triggers documents. The broker is fed in one of two ways:
+
+  memory       - the chat_triggers write-behind buffer publishes each batch
+                 after it is written (single-process deployments)
+  changestream - a ChangeStreamFeed thread watches chat_triggers inserts, so
+                 triggers written by any process reach every process's
+                 subscribers (needs a replica set)
+
+Events are identified by the trigger's ObjectId. A client that reconnects with
+the last id it saw is first sent anything newer from the collection, then
+live events.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+class Subscription:
+    def __init__(self, user_id, max_queue):
+        self.user_id = user_id
+        self.events = queue.Queue(maxsize=max_queue)
+        # Set when events were dropped because the consumer fell behind; the
+        # consumer should resume from the collection instead
+        self.overflowed = False
+
+    def deliver(self, trigger):
+        try:
+            self.events.put_nowait(trigger)
+        except queue.Full:
+            self.overflowed = True
+            return False
+        return True
+
+    def get(self, timeout):
+        """Next event, or None if none arrived within timeout seconds"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class AsyncSubscription(Subscription):
+    """
+    Subscription consumed from an event loop (the ASGI app). Publishers run on
+    write-behind or change stream threads, so events are handed to the loop
+    thread-safely and waiting costs no thread.
+    """
+
+    def __init__(self, user_id, max_queue, loop):
+        super().__init__(user_id, max_queue)
+        self.loop = loop
+        self.events = asyncio.Queue()
+        self.max_queue = max_queue
+
+    def deliver(self, trigger):
+        if self.events.qsize() >= self.max_queue:
+            self.overflowed = True
+            return False
+        self.loop.call_soon_threadsafe(self.events.put_nowait, trigger)
+        return True
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.events.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class ChatTriggerBroker:
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id, loop=None):
+        """Subscribe to a user's triggers; pass the running event loop to get an AsyncSubscription"""
+        if loop is None:
+            subscription = Subscription(user_id, self.max_queue)
+        else:
+            subscription = AsyncSubscription(user_id, self.max_queue, loop)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, trigger):
+        """Deliver a chat_triggers document to every subscriber of its user"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(trigger.get("user_id"), ()))
+        for subscription in subscribers:
+            if not subscription.deliver(trigger):
+                self.dropped += 1
+        self.published += 1
+
+    def publish_many(self, triggers):
+        for trigger in triggers:
+            self.publish(trigger)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._subscribers),
+                "subscriptions": sum(len(subscribers) for subscribers in self._subscribers.values()),
+                "published": self.published,
+                "dropped": self.dropped
+            }
+
+class ChangeStreamFeed:
+    """Publish chat_triggers inserts from a Mongo change stream into a broker"""
+
+    def __init__(self, collection, broker, retry_delay=5):
+        self.collection = collection
+        self.broker = broker
+        self.retry_delay = retry_delay
+        self._thread = threading.Thread(target=self._run, name="chat-trigger-feed", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        resume_token = None
+        while True:
+            try:
+                with self.collection.watch([{"$match": {"operationType": "insert"}}],
+                                           resume_after=resume_token) as stream:
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        self.broker.publish(change["fullDocument"])
+            except Exception as e:
+                print(f"Chat trigger change stream failed, retrying: {e}")
+                time.sleep(self.retry_delay)
+
+def parse_event_id(event_id):
+    """ObjectId from a Last-Event-ID value, or None if it is missing or invalid"""
+    if not event_id:
+        return None
+    try:
+        return ObjectId(event_id)
+    except (InvalidId, TypeError):
+        return None
+
+def serialize_trigger(trigger):
+    trigger = dict(trigger)
+    trigger["id"] = str(trigger.pop("_id"))
+    if trigger.get("acknowledged_at"):
+        trigger["acknowledged_at"] = trigger["acknowledged_at"].isoformat()
+    return trigger
+
+def pending_triggers_query(user_id, after=None):
+    query = {"user_id": user_id, "acknowledged": {"$ne": True}}
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    return query
+
+def pending_triggers(collection, user_id, after=None, limit=50):
+    """Unacknowledged triggers for a user, oldest first, newer than the event id after"""
+    return list(collection.find(pending_triggers_query(user_id, after)).sort("_id", 1).limit(limit))
+
+async def pending_triggers_async(collection, user_id, after=None, limit=50):
+    """pending_triggers on an async (AsyncMongoClient) collection"""
+    return await collection.find(pending_triggers_query(user_id, after)).sort("_id", 1).limit(limit).to_list()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Fake Vertex AI Gemini server for load tests.
+
+Answers the REST generateContent and streamGenerateContent calls the backend
+makes through the Vertex AI SDK. Latency and error rate are configurable, so
+load tests measure the backend rather than the real model or its quota. Point
+the backend at it with:
+
+    VERTEX_API_ENDPOINT=http://127.0.0.1:8090 GOOGLE_CLOUD_PROJECT=load-test python app.py
+
+Severity prompts get a score derived from the transcript, so repeated runs
+score the same transcript the same way. Other prompts (chat) get a short
+canned reply, streamed word by word when streaming is requested.
+
+Usage:
+    python fake_gemini.py --port 8090 --latency-ms 800 --jitter-ms 200 --error-rate 0.02
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHAT_REPLY = ("That sounds like a heavy call. It makes sense to feel shaken after something like that. "
+              "Would it help to talk through what has stayed with you most?")
+
+_SCORE_KEYWORDS = ("trapped", "shooter", "shots", "fire", "casualt", "unconscious", "not breathing", "child")
+
+def severity_reply(prompt):
+    """A stable 1-100 score: higher for transcripts with more high-severity words"""
+    transcript = re.search(r'TRANSCRIPT: "(.*?)"', prompt, re.DOTALL)
+    text = (transcript.group(1) if transcript else prompt).lower()
+    hits = sum(keyword in text for keyword in _SCORE_KEYWORDS)
+    return str(min(100, 10 + 18 * hits + zlib.crc32(text.encode("utf-8")) % 10))
+
+class FakeGemini:
+    def __init__(self, latency_ms=500, jitter_ms=0, error_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def plan(self):
+        """(delay in seconds, whether to fail) for the next request"""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return delay, fail
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors}
+
+def _candidate(text):
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]}
+
+def _handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            prompt = " ".join(part.get("text", "")
+                              for content in body.get("contents", []) for part in content.get("parts", []))
+            delay, fail = fake.plan()
+            time.sleep(delay)
+
+            if fail:
+                self._send(503, {"error": {"code": 503, "message": "Fake Gemini: injected error", "status": "UNAVAILABLE"}})
+            elif "streamGenerateContent" in self.path:
+                words = re.findall(r"\S+\s*", CHAT_REPLY)
+                self._send(200, [_candidate(word) for word in words])
+            elif "Respond with ONLY a number" in prompt or "Respond with the number" in prompt:
+                self._send(200, _candidate(severity_reply(prompt)))
+            else:
+                self._send(200, _candidate(CHAT_REPLY))
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def start_fake_gemini(host="127.0.0.1", port=0, **settings):
+    """Serve a FakeGemini on a background thread. Returns (server, fake, base URL)."""
+    fake = FakeGemini(**settings)
+    server = ThreadingHTTPServer((host, port), _handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-gemini", daemon=True).start()
+    return server, fake, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Vertex AI Gemini server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server, fake, url = start_fake_gemini(args.host, args.port, latency_ms=args.latency_ms,
+                                          jitter_ms=args.jitter_ms, error_rate=args.error_rate, seed=args.seed)
+    print(f"[OK] Fake Gemini listening on {url} (latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, "
+          f"error rate {args.error_rate:.1%})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"Served {fake.stats()}")
+        server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
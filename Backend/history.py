@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Bucketed per-user call history.
+
+Each document in call_history holds up to BUCKET_CAPACITY calls of one user in
+one month:
+
+    {"userID": "...", "month": "2025-10", "seq": 0, "count": 3,
+     "calls": [{"callID": 1001, "date": datetime(...)}, ...]}
+
+seq numbers a month's buckets from 0, and (userID, month, seq) is unique, so
+two appends racing to open the same bucket cannot both create it.
+
+This replaces the unbounded users.calls array. A user document stays the same
+size however many calls the user has. An append rewrites one small bucket, and
+readers fetch only the months they ask for.
+
+Usage:
+    python history.py --migrate    # move existing users.calls arrays into buckets
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+
+BUCKET_CAPACITY = 200
+UNDATED_MONTH = "undated"
+# Conditional upserts retried after losing a race for a bucket to another append
+APPEND_ATTEMPTS = 5
+DUPLICATE_KEY_ERROR = 11000
+
+def month_of(date):
+    return date.strftime("%Y-%m") if date else UNDATED_MONTH
+
+def _bucket_entry(call_id, date):
+    return {"callID": call_id, "date": date}
+
+def _open_bucket_seq(history, user_id, month):
+    """seq of the bucket the next call of the month goes into"""
+    latest = history.find_one(
+        {"userID": user_id, "month": month, "seq": {"$exists": True}},
+        {"_id": 0, "seq": 1, "count": 1},
+        sort=[("seq", DESCENDING)]
+    )
+    if latest is None:
+        return 0
+    return latest["seq"] + 1 if latest["count"] >= BUCKET_CAPACITY else latest["seq"]
+
+def append_call(db, user_id, call_id, date=None):
+    """
+    Append one call to the user's bucket for its month. Returns (added, user_created).
+
+    The append is a single conditional upsert of the open bucket: its filter
+    carries the size guard and the callID, so a full bucket or a callID already
+    in it never gets the push. The upsert then tries to insert a second bucket
+    with the same (userID, month, seq) and fails on the unique index, after
+    which the append either reports the duplicate or retries on the next bucket.
+    """
+    date = date or datetime.now()
+    month = month_of(date)
+    history = db["call_history"]
+    update = {"$push": {"calls": _bucket_entry(call_id, date)}, "$inc": {"count": 1}}
+
+    # The upsert filter only sees the open bucket, so look for the callID in the
+    # user's other buckets first; a concurrent append of the same call races for
+    # the same open bucket, where the filter turns it away
+    if history.find_one({"userID": user_id, "calls.callID": call_id}, {"_id": 1}):
+        return False, False
+
+    for attempt in range(APPEND_ATTEMPTS):
+        seq = _open_bucket_seq(history, user_id, month)
+        try:
+            result = history.update_one(
+                {"userID": user_id, "month": month, "seq": seq,
+                 "count": {"$lt": BUCKET_CAPACITY}, "calls.callID": {"$ne": call_id}},
+                update,
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The bucket exists but is full or already holds the call, or a
+            # concurrent append created it first
+            if history.find_one({"userID": user_id, "month": month, "seq": seq, "calls.callID": call_id}, {"_id": 1}):
+                return False, False
+            if attempt == APPEND_ATTEMPTS - 1:
+                raise
+            continue
+        break
+
+    user_created = False
+    if result.upserted_id is not None:
+        # A new bucket is the only time the user may not exist yet
+        user_created = db["users"].update_one(
+            {"userID": user_id}, {"$setOnInsert": {"userID": user_id}}, upsert=True
+        ).upserted_id is not None
+    return True, user_created
+
+def append_calls(db, calls_by_user):
+    """
+    Append many calls with one bulk_write per collection.
+
+    calls_by_user maps userID -> list of (callID, date); a date of None files the
+    call under the "undated" bucket. CallIDs already in a user's history are
+    dropped up front. Each (user, month) group is pushed in chunks that fit a
+    bucket, each a conditional upsert like append_call's: it applies only to a
+    bucket with room for the whole chunk and none of its callIDs. A chunk whose
+    upsert hits the unique bucket index (a concurrent append got there first)
+    falls back to append_call for each of its calls.
+
+    Returns (added, failed): userID -> callIDs actually appended, and the set of
+    userIDs whose history write failed.
+    """
+    history = db["call_history"]
+    user_ids = list(calls_by_user)
+    call_ids = [call_id for calls in calls_by_user.values() for call_id, _ in calls]
+    recorded = set()
+    for bucket in history.find({"userID": {"$in": user_ids}, "calls.callID": {"$in": call_ids}},
+                               {"_id": 0, "userID": 1, "calls.callID": 1}):
+        recorded.update((bucket["userID"], call["callID"]) for call in bucket["calls"])
+
+    latest = {}
+    for bucket in history.find({"userID": {"$in": user_ids}, "seq": {"$exists": True}},
+                               {"_id": 0, "userID": 1, "month": 1, "seq": 1, "count": 1}):
+        key = (bucket["userID"], bucket["month"])
+        if key not in latest or bucket["seq"] > latest[key]["seq"]:
+            latest[key] = bucket
+
+    operations = []
+    chunks = []
+    for user_id, calls in calls_by_user.items():
+        by_month = {}
+        seen = set()
+        for call_id, date in calls:
+            if call_id in seen or (user_id, call_id) in recorded:
+                continue
+            seen.add(call_id)
+            by_month.setdefault(month_of(date), []).append(_bucket_entry(call_id, date))
+
+        for month, entries in by_month.items():
+            bucket = latest.get((user_id, month))
+            seq, count = (bucket["seq"], bucket["count"]) if bucket else (0, 0)
+            for start in range(0, len(entries), BUCKET_CAPACITY):
+                chunk = entries[start:start + BUCKET_CAPACITY]
+                # A chunk that does not fit the open bucket starts the next one
+                if count + len(chunk) > BUCKET_CAPACITY:
+                    seq, count = seq + 1, 0
+                operations.append(UpdateOne(
+                    {"userID": user_id, "month": month, "seq": seq,
+                     "count": {"$lte": BUCKET_CAPACITY - len(chunk)},
+                     "calls.callID": {"$nin": [entry["callID"] for entry in chunk]}},
+                    {"$push": {"calls": {"$each": chunk}}, "$inc": {"count": len(chunk)}},
+                    upsert=True
+                ))
+                chunks.append((user_id, chunk))
+                count += len(chunk)
+
+    added = {user_id: [] for user_id in calls_by_user}
+    failed = set()
+    if operations:
+        write_errors = {}
+        try:
+            history.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            write_errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+        for index, (user_id, chunk) in enumerate(chunks):
+            error = write_errors.get(index)
+            if error is None:
+                added[user_id].extend(entry["callID"] for entry in chunk)
+            elif error.get("code") == DUPLICATE_KEY_ERROR:
+                for entry in chunk:
+                    try:
+                        if append_call(db, user_id, entry["callID"], entry["date"])[0]:
+                            added[user_id].append(entry["callID"])
+                    except PyMongoError:
+                        failed.add(user_id)
+            else:
+                failed.add(user_id)
+        user_operations = [
+            UpdateOne({"userID": user_id}, {"$setOnInsert": {"userID": user_id}}, upsert=True)
+            for user_id in calls_by_user if user_id not in failed
+        ]
+        if user_operations:
+            db["users"].bulk_write(user_operations, ordered=False)
+    return {user_id: call_ids for user_id, call_ids in added.items() if user_id not in failed}, failed
+
+def fetch_buckets(db, user_id, from_month=None, to_month=None):
+    """History buckets for a user, oldest month first, optionally limited to a YYYY-MM range"""
+    query = {"userID": user_id}
+    month_range = {}
+    if from_month:
+        month_range["$gte"] = from_month
+    if to_month:
+        month_range["$lte"] = to_month
+    if month_range:
+        query["month"] = month_range
+    return db["call_history"].find(query, {"_id": 0}).sort([("month", ASCENDING), ("_id", ASCENDING)])
+
+def migrate_user_calls(db):
+    """
+    Move every users.calls array into history buckets, dating each call from its
+    call_records entry (calls without a record go into the "undated" bucket), then
+    drop the array. Safe to re-run: users without a calls array are skipped.
+    Returns the number of users migrated.
+    """
+    migrated = 0
+    for user in db["users"].find({"calls": {"$exists": True}}, {"userID": 1, "calls": 1}):
+        call_ids = list(dict.fromkeys(user.get("calls") or []))
+        dates = {
+            record["callID"]: record.get("date")
+            for record in db["call_records"].find({"callID": {"$in": call_ids}}, {"callID": 1, "date": 1})
+        }
+        if call_ids and append_calls(db, {user["userID"]: [(call_id, dates.get(call_id)) for call_id in call_ids]})[1]:
+            print(f"[X] Failed to migrate calls for user {user['userID']}, keeping the array")
+            continue
+        db["users"].update_one({"_id": user["_id"]}, {"$unset": {"calls": ""}})
+        migrated += 1
+    return migrated
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain bucketed call history")
+    parser.add_argument("--migrate", action="store_true", help="convert users.calls arrays into history buckets")
+    parser.add_argument("--database", default="development")
+    args = parser.parse_args()
+
+    if not args.migrate:
+        parser.print_help()
+        return 0
+
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    import certifi
+
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise ValueError("MONGO_URI environment variable is not set")
+
+    db = MongoClient(mongo_uri, tlsCAFile=certifi.where(), serverSelectionTimeoutMS=5000)[args.database]
+    print(f"[OK] Migrated call arrays for {migrate_user_calls(db)} users")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Startup import benchmark.
+
+Imports each entry point in a fresh interpreter under `python -X importtime`
+and reports how long its slowest modules took to import (cumulative, including
+their own imports). The agent pipeline (google.adk, Vertex AI) is loaded lazily
+by app.agent_module(), so it must not show up here; a change that imports it
+at module level again fails the check.
+
+Usage:
+    python import_benchmark.py                      # report app and asgi
+    python import_benchmark.py --check              # also fail on the budget or a deferred module
+    python import_benchmark.py --module app --top 30 --runs 5
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that should only be imported on first use or by the warm-up thread
+DEFERRED_MODULES = [
+    "google.adk",
+    "vertexai",
+    "google.cloud.aiplatform",
+    "Agents.first_responder_agent.agent"
+]
+
+# "import time:       433 |    5368295 |               google.adk.agents"
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+def measure_imports(module):
+    """
+    Import module in a fresh interpreter and return {module name: (self ms,
+    cumulative ms, depth)} for everything it imported, plus the entry point's cumulative ms
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            # Each nesting level is indented by two spaces after the separator
+            depth = (len(indent) - 1) // 2
+            modules[name] = (int(self_us) / 1000, int(cumulative_us) / 1000, depth)
+    total = modules[module][1] if module in modules else 0.0
+    return modules, total
+
+def best_of(module, runs):
+    """Fastest of several runs per module, so one slow run (cold disk cache) does not skew the report"""
+    best, best_total = {}, None
+    for _ in range(runs):
+        modules, total = measure_imports(module)
+        for name, timing in modules.items():
+            if name not in best or timing[1] < best[name][1]:
+                best[name] = timing
+        best_total = total if best_total is None else min(best_total, total)
+    return best, best_total
+
+def deferred_imports(modules):
+    """Which of DEFERRED_MODULES (or any of their submodules) were imported"""
+    return [deferred for deferred in DEFERRED_MODULES
+            if any(name == deferred or name.startswith(deferred + ".") for name in modules)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Report per-module import time for the backend entry points")
+    parser.add_argument("--module", action="append", help="entry point to import (default: app and asgi)")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest modules to list")
+    parser.add_argument("--runs", type=int, default=3, help="imports per entry point; the fastest is reported")
+    parser.add_argument("--budget-ms", type=float, default=2000, help="maximum import time per entry point")
+    parser.add_argument("--check", action="store_true", help="fail if over budget or a deferred module is imported")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = {}
+    failed = False
+    for module in args.module or ["app", "asgi"]:
+        modules, total = best_of(module, args.runs)
+        slowest = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)
+        deferred = deferred_imports(modules)
+        over_budget = total > args.budget_ms
+        failed = failed or over_budget or bool(deferred)
+        report[module] = {
+            "total_ms": round(total, 1),
+            "budget_ms": args.budget_ms,
+            "deferred_imported": deferred,
+            "slowest": [
+                {"module": name, "cumulative_ms": round(cumulative, 1), "self_ms": round(own, 1), "depth": depth}
+                for name, (own, cumulative, depth) in slowest[:args.top]
+            ]
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for module, result in report.items():
+            status = "X" if result["total_ms"] > args.budget_ms or result["deferred_imported"] else "OK"
+            print(f"[{status}] import {module}: {result['total_ms']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+            print(f"    {'cumulative':>10}  {'self':>8}  module")
+            for entry in result["slowest"]:
+                print(f"    {entry['cumulative_ms']:>8.1f}ms  {entry['self_ms']:>6.1f}ms  "
+                      f"{'  ' * entry['depth']}{entry['module']}")
+            for name in result["deferred_imported"]:
+                print(f"[X] {name} is imported at startup; it should load on first use")
+
+    if args.check and failed:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
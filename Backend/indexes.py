@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Index manifest for the backend collections.
+
+ensure_indexes() applies the manifest idempotently (create_index is a no-op for
+an index that already exists with the same spec) and runs at app startup.
+check_query_plans() explains every hot query and reports any that fall back to
+a collection scan.
+
+Usage:
+    python indexes.py            # apply the manifest
+    python indexes.py --check    # apply, then fail if any hot query plans a COLLSCAN
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+# How long done and failed scheduled jobs are kept (for inspection) before MongoDB removes them
+FINISHED_JOB_TTL_SECONDS = 7 * 24 * 3600
+
+# collection -> list of (keys, options)
+INDEX_MANIFEST = {
+    "users": [
+        ([("userID", ASCENDING)], {"name": "userID_unique", "unique": True}),
+    ],
+    "call_records": [
+        # _id completes the (date, _id) keyset used by /users/<user_id>/calls,
+        # so its newest-first pages need neither a scan nor an in-memory sort
+        ([("userID", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], {"name": "userID_date"}),
+        ([("callID", ASCENDING)], {"name": "callID_unique", "unique": True}),
+    ],
+    "chat_triggers": [
+        ([("user_id", ASCENDING), ("timestamp", DESCENDING)], {"name": "user_id_timestamp"}),
+        # Resume order for chat trigger streams and long-polls
+        ([("user_id", ASCENDING), ("_id", ASCENDING)], {"name": "user_id_id"}),
+    ],
+    "call_history": [
+        ([("userID", ASCENDING), ("month", ASCENDING)], {"name": "userID_month"}),
+        # One bucket per (userID, month, seq), so racing appends cannot both open
+        # a bucket; partial because buckets written before seq existed lack it
+        ([("userID", ASCENDING), ("month", ASCENDING), ("seq", ASCENDING)],
+         {"name": "userID_month_seq_unique", "unique": True, "partialFilterExpression": {"seq": {"$exists": True}}}),
+    ],
+    "wellness_aggregates": [
+        ([("userID", ASCENDING), ("day", ASCENDING)], {"name": "userID_day_unique", "unique": True}),
+    ],
+    "scheduled_jobs": [
+        ([("status", ASCENDING), ("run_at", ASCENDING)], {"name": "status_run_at"}),
+        # Only done and failed jobs have finishedAt, so pending ones never expire
+        ([("finishedAt", ASCENDING)], {"name": "finishedAt_ttl", "expireAfterSeconds": FINISHED_JOB_TTL_SECONDS}),
+    ],
+}
+
+# Queries the request path depends on: (name, collection, filter, sort)
+HOT_QUERIES = [
+    ("user by userID", "users", {"userID": "__probe__"}, None),
+    ("user call history page", "call_records", {"userID": "__probe__"},
+     [("date", DESCENDING), ("_id", DESCENDING)]),
+    ("call history date range", "call_records",
+     {"userID": "__probe__", "date": {"$gte": datetime(2000, 1, 1)}}, [("date", DESCENDING), ("_id", DESCENDING)]),
+    ("call by callID", "call_records", {"callID": -1}, None),
+    ("chat triggers by user", "chat_triggers", {"user_id": "__probe__"}, [("timestamp", DESCENDING)]),
+    ("chat triggers after event id", "chat_triggers",
+     {"user_id": "__probe__", "acknowledged": {"$ne": True}, "_id": {"$gt": ObjectId("0" * 24)}},
+     [("_id", ASCENDING)]),
+    ("call history buckets by user", "call_history",
+     {"userID": "__probe__", "month": {"$gte": "2000-01"}}, [("month", ASCENDING)]),
+    ("open call history bucket", "call_history",
+     {"userID": "__probe__", "month": "2000-01", "seq": {"$exists": True}}, [("seq", DESCENDING)]),
+    ("call already in history", "call_history", {"userID": "__probe__", "calls.callID": -1}, None),
+    ("wellness buckets by user", "wellness_aggregates",
+     {"userID": "__probe__", "day": {"$gte": "2000-01-01"}}, None),
+    ("due scheduled jobs", "scheduled_jobs",
+     {"status": "pending", "run_at": {"$lte": datetime(2000, 1, 1)}}, None),
+]
+
+def ensure_indexes(db):
+    """Create every index in INDEX_MANIFEST that does not exist yet. Returns the index names."""
+    created = []
+    for collection_name, indexes in INDEX_MANIFEST.items():
+        for keys, options in indexes:
+            created.append(f"{collection_name}.{db[collection_name].create_index(keys, **options)}")
+    return created
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() plan tree"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+def check_query_plans(db):
+    """
+    Explain each hot query and return a list of (name, stages, ok) where ok is
+    False if the winning plan contains a COLLSCAN.
+    """
+    results = []
+    for name, collection_name, query, sort in HOT_QUERIES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        stages = list(_plan_stages(winning_plan))
+        results.append((name, stages, "COLLSCAN" not in stages))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply backend indexes and verify hot query plans")
+    parser.add_argument("--check", action="store_true", help="fail if any hot query uses a COLLSCAN")
+    parser.add_argument("--database", default="development")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    import certifi
+
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise ValueError("MONGO_URI environment variable is not set")
+
+    db = MongoClient(mongo_uri, tlsCAFile=certifi.where(), serverSelectionTimeoutMS=5000)[args.database]
+
+    for index_name in ensure_indexes(db):
+        print(f"[OK] {index_name}")
+
+    if args.check:
+        failed = False
+        for name, stages, ok in check_query_plans(db):
+            print(f"[{'OK' if ok else 'X'}] {name}: {' > '.join(stages)}")
+            failed = failed or not ok
+        if failed:
+            print("One or more hot queries fall back to a collection scan")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
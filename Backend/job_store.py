@@ -0,0 +1,67 @@
+"""
+Mongo-backed job store for the process-wide scheduler.
+
+Each scheduled job is one document in scheduled_jobs:
+
+    {"_id": "chat_trigger:<user_id>:<call_id>", "kind": "chat_trigger",
+     "payload": {...}, "run_at": datetime(...), "status": "pending", "attempts": 0}
+
+Jobs move pending -> running -> done (or failed once retries run out), and
+finished ones are removed by the finishedAt TTL index in indexes.py. A worker
+claims a job with a conditional update before running it. Only one process wins
+the claim, even when several app workers hold the same job in their timer heap.
+"""
+
+from datetime import datetime, timezone
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+class MongoJobStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def add(self, job):
+        """Store a new job; returns False if a job with the same _id already exists"""
+        try:
+            self.collection.insert_one(dict(job))
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def claim(self, job_id):
+        return self.collection.find_one_and_update(
+            {"_id": job_id, "status": "pending"},
+            {"$set": {"status": "running", "claimed_at": datetime.now(timezone.utc)}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def complete(self, job_id):
+        self.collection.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "done", "finishedAt": datetime.now(timezone.utc)}}
+        )
+
+    def retry(self, job_id, run_at, error):
+        self.collection.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "pending", "run_at": run_at, "last_error": error}, "$inc": {"attempts": 1}}
+        )
+
+    def fail(self, job_id, error):
+        self.collection.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "failed", "last_error": error, "finishedAt": datetime.now(timezone.utc)},
+             "$inc": {"attempts": 1}}
+        )
+
+    def pending(self, before):
+        return list(self.collection.find({"status": "pending", "run_at": {"$lte": before}}))
+
+    def recover(self, stale_after):
+        """Return jobs whose worker died mid-run (claimed longer than stale_after ago) to pending"""
+        cutoff = datetime.now(timezone.utc) - stale_after
+        return self.collection.update_many(
+            {"status": "running", "claimed_at": {"$lt": cutoff}},
+            {"$set": {"status": "pending"}}
+        ).modified_count
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Load test for the backend endpoints.
+
+Replays a transcript corpus (JSONL, or demo_driver's SAMPLE_CALLS) against each
+endpoint in turn, at a fixed concurrency and, optionally, a fixed arrival rate.
+It reports p50/p95/p99 latency and throughput per endpoint. With a rate set,
+requests are sent on schedule whether or not earlier ones have finished, and
+latency is measured from the scheduled time, so queueing inside a saturated
+server shows up in the percentiles.
+
+--local runs the backend in this process against stand-ins: an in-memory
+MongoDB (mongomock) or a local mongod, and fake_gemini.py with configurable
+latency and error rate. Results are written as JSON so runs can be compared
+across commits.
+
+Usage:
+    python load_test.py --local
+    python load_test.py --local --mongo-uri "mongodb://localhost:27017/?tls=false" --gemini-latency-ms 1500
+    python load_test.py --base-url http://127.0.0.1:5000 --corpus calls.jsonl --concurrency 32 --rate 50
+    python load_test.py --local --endpoints analyze-call,call --compare load_results/previous.json
+
+Corpus records carry "transcript" (or "transcripts") and optionally "user_id",
+"severity_score" and "message" (used by the chat endpoints).
+"""
+
+import argparse
+import inspect
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from demo_driver import BASE_URL, HEADERS, SAMPLE_CALLS
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CHAT_MESSAGES = [
+    "Rough shift, that last call is still on my mind",
+    "I'm doing okay, just tired",
+    "Honestly I'm struggling to sleep after the fire",
+    "Feeling pretty good today"
+]
+
+class RequestFactory:
+    """Builds requests from corpus records, with unique call IDs so inserts never collide"""
+
+    def __init__(self, corpus, users=50, batch_size=10, seed=0):
+        self.corpus = corpus
+        self.users = users
+        self.batch_size = batch_size
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_call_id = int(time.time()) * 1000
+
+    def next(self):
+        """(corpus record, new call ID, user ID) for the next request"""
+        with self._lock:
+            record = self._random.choice(self.corpus)
+            call_id = self._next_call_id
+            self._next_call_id += 1
+        return record, call_id, record.get("user_id") or f"load_user_{call_id % self.users}"
+
+def _analyze_call(factory):
+    record, call_id, user_id = factory.next()
+    return "POST", "/analyze-call", {"transcript": record["transcript"], "call_id": call_id, "user_id": user_id}
+
+def _analyze_calls(factory):
+    calls = []
+    for _ in range(factory.batch_size):
+        record, call_id, user_id = factory.next()
+        calls.append({"transcript": record["transcript"], "call_id": call_id, "user_id": user_id})
+    return "POST", "/analyze-calls", {"calls": calls}
+
+def _call(factory):
+    record, call_id, user_id = factory.next()
+    return "POST", "/call", {
+        "callID": call_id,
+        "userID": user_id,
+        "transcripts": record["transcript"],
+        "severityScore": record.get("severity_score", 50),
+        "date": datetime.now().isoformat()
+    }
+
+def _user_update(factory):
+    _, call_id, user_id = factory.next()
+    return "PUT", f"/user/{user_id}", {"callID": call_id, "response": "delta"}
+
+def _push_notification(factory):
+    record, _, user_id = factory.next()
+    return "POST", "/push-notification", {"user_id": user_id, "severity_score": record.get("severity_score", 65)}
+
+def _user_calls(factory):
+    _, _, user_id = factory.next()
+    return "GET", f"/users/{user_id}/calls?limit=20", None
+
+def _call_history(factory):
+    _, _, user_id = factory.next()
+    return "GET", f"/users/{user_id}/call-history", None
+
+def _wellness_aggregates(factory):
+    _, _, user_id = factory.next()
+    return "GET", f"/users/{user_id}/wellness-aggregates", None
+
+def _chat_triggers(factory):
+    _, _, user_id = factory.next()
+    return "GET", f"/users/{user_id}/chat-triggers", None
+
+def _chat(factory, stream=False):
+    record, call_id, _ = factory.next()
+    body = {
+        "message": record.get("message") or CHAT_MESSAGES[call_id % len(CHAT_MESSAGES)],
+        "context": record["transcript"][:200],
+        "incidentId": str(call_id)
+    }
+    if stream:
+        body["stream"] = True
+    return "POST", "/chat-with-gemini", body
+
+ENDPOINTS = {
+    "analyze-call": _analyze_call,
+    "analyze-calls": _analyze_calls,
+    "call": _call,
+    "user-update": _user_update,
+    "push-notification": _push_notification,
+    "user-calls": _user_calls,
+    "call-history": _call_history,
+    "wellness-aggregates": _wellness_aggregates,
+    "chat-triggers": _chat_triggers,
+    "chat": _chat,
+    "chat-stream": lambda factory: _chat(factory, stream=True)
+}
+
+def load_corpus(path):
+    if not path:
+        return [dict(call) for call in SAMPLE_CALLS]
+    corpus = []
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                record["transcript"] = record.get("transcript") or record.get("transcripts") or ""
+                if record["transcript"]:
+                    corpus.append(record)
+    if not corpus:
+        raise ValueError(f"No transcripts in {path}")
+    return corpus
+
+def arrival_offsets(count, rate, arrival, rng):
+    """Scheduled send time of each request, in seconds from the start of the phase"""
+    if arrival == "poisson":
+        offsets, elapsed = [], 0.0
+        for _ in range(count):
+            offsets.append(elapsed)
+            elapsed += rng.expovariate(rate)
+        return offsets
+    return [index / rate for index in range(count)]
+
+class Runner:
+    def __init__(self, base_url, concurrency, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self._local.session = session
+        return session
+
+    def send(self, method, path, body, scheduled):
+        """One request; returns (scheduled, started, finished, status or None, error)"""
+        started = time.perf_counter()
+        status, error = None, None
+        try:
+            response = self.session().request(method, self.base_url + path, json=body, timeout=self.timeout)
+            response.content  # read the whole body, including streamed responses
+            status = response.status_code
+        except requests.exceptions.RequestException as e:
+            error = type(e).__name__
+        return scheduled, started, time.perf_counter(), status, error
+
+    def run_phase(self, build, count, rate=0.0, arrival="uniform", seed=0):
+        """
+        Send count requests made by build() with at most self.concurrency in flight.
+        With a rate, request i is due at its arrival offset and its latency counts
+        from then, including any wait for a free slot; without one, each request
+        is sent as soon as a slot frees up.
+        """
+        slots = threading.Semaphore(self.concurrency)
+        samples = []
+
+        def send_and_release(request, scheduled):
+            try:
+                samples.append(self.send(*request, scheduled))
+            finally:
+                slots.release()
+
+        offsets = arrival_offsets(count, rate, arrival, random.Random(seed)) if rate else None
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            start = time.perf_counter()
+            for index in range(count):
+                request = build()
+                if offsets:
+                    scheduled = start + offsets[index]
+                    time.sleep(max(0.0, scheduled - time.perf_counter()))
+                    slots.acquire()
+                else:
+                    slots.acquire()
+                    scheduled = time.perf_counter()
+                executor.submit(send_and_release, request, scheduled)
+        return samples
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+def summarize(samples):
+    latencies = sorted((finished - scheduled) * 1000 for scheduled, _, finished, _, _ in samples)
+    service = sorted((finished - started) * 1000 for _, started, finished, _, _ in samples)
+    ok = sum(1 for *_, status, _ in samples if status is not None and status < 400)
+    wall = (max(s[2] for s in samples) - min(s[0] for s in samples)) if samples else 0.0
+    statuses = Counter(str(status) if status is not None else error for *_, status, error in samples)
+
+    def distribution(values):
+        return {
+            "p50": round(percentile(values, 50), 1),
+            "p95": round(percentile(values, 95), 1),
+            "p99": round(percentile(values, 99), 1),
+            "max": round(values[-1], 1),
+            "mean": round(sum(values) / len(values), 1)
+        } if values else {}
+
+    return {
+        "requests": len(samples),
+        "ok": ok,
+        "errors": len(samples) - ok,
+        "error_rate": round((len(samples) - ok) / len(samples), 4) if samples else 0.0,
+        "status_codes": dict(sorted(statuses.items())),
+        "latency_ms": distribution(latencies),
+        "service_ms": distribution(service),
+        "throughput_rps": round(ok / wall, 2) if wall else 0.0,
+        "wall_seconds": round(wall, 2)
+    }
+
+def use_in_memory_mongo():
+    """Point the backend at mongomock instead of a MongoDB server"""
+    try:
+        import mongomock
+        from mongomock.collection import BulkOperationBuilder
+    except ImportError:
+        raise SystemExit("[X] The in-memory MongoDB needs mongomock (pip install mongomock); or pass --mongo-uri")
+    import pymongo
+
+    add_update = BulkOperationBuilder.add_update
+    if "sort" not in inspect.signature(add_update).parameters:
+        # pymongo's UpdateOne passes a sort argument that older mongomock releases do not accept
+        def add_update_without_sort(self, *args, sort=None, **kwargs):
+            return add_update(self, *args, **kwargs)
+        BulkOperationBuilder.add_update = add_update_without_sort
+
+    pymongo.MongoClient = mongomock.MongoClient
+    os.environ["MONGO_URI"] = "mongodb://in-memory"
+
+def start_local_backend(args):
+    """
+    Serve the Flask backend from this process against the stand-ins. Returns
+    (base URL, fake Gemini). The environment is set up before app is imported.
+    """
+    from fake_gemini import start_fake_gemini
+
+    _, fake, gemini_url = start_fake_gemini(latency_ms=args.gemini_latency_ms, jitter_ms=args.gemini_jitter_ms,
+                                            error_rate=args.gemini_error_rate, seed=args.seed)
+    os.environ["VERTEX_API_ENDPOINT"] = gemini_url
+    os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "load-test")
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+    else:
+        use_in_memory_mongo()
+
+    import app as backend
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="load-test-backend", daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    # Wait for the worker to warm up (pool, indexes, scheduler) before measuring
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/health/ready", timeout=5).status_code == 200:
+                break
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    else:
+        raise SystemExit("[X] Local backend did not become ready")
+    # The agent pipeline is loaded lazily; load it now so the first phase does not pay for it
+    backend.agent_module()
+    return base_url, fake
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_comparison(report, baseline):
+    print(f"\nCompared with {baseline.get('run', {}).get('commit') or 'baseline'}:")
+    for name, current in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before or not before.get("latency_ms") or not current.get("latency_ms"):
+            continue
+        p95_before, p95_now = before["latency_ms"]["p95"], current["latency_ms"]["p95"]
+        rps_before, rps_now = before["throughput_rps"], current["throughput_rps"]
+        p95_change = (p95_now - p95_before) / p95_before if p95_before else 0.0
+        rps_change = (rps_now - rps_before) / rps_before if rps_before else 0.0
+        print(f"  {name:<20} p95 {p95_before:>8.1f} -> {p95_now:>8.1f} ms ({p95_change:+.0%})   "
+              f"throughput {rps_before:>7.1f} -> {rps_now:>7.1f} req/s ({rps_change:+.0%})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend endpoints")
+    parser.add_argument("--base-url", default=BASE_URL, help="server to test (ignored with --local)")
+    parser.add_argument("--local", action="store_true", help="run the backend in-process against local stand-ins")
+    parser.add_argument("--mongo-uri", help="with --local: a local MongoDB instead of the in-memory one")
+    parser.add_argument("--gemini-latency-ms", type=float, default=500)
+    parser.add_argument("--gemini-jitter-ms", type=float, default=100)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--corpus", help="JSONL transcripts to replay (default: demo_driver.SAMPLE_CALLS)")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help=f"comma-separated subset of: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="arrivals per second per endpoint (0: send as fast as concurrency allows)")
+    parser.add_argument("--arrival", choices=["uniform", "poisson"], default="poisson")
+    parser.add_argument("--users", type=int, default=50, help="user IDs to spread requests over")
+    parser.add_argument("--batch-size", type=int, default=10, help="calls per /analyze-calls request")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default: load_results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare p95 and throughput with")
+    args = parser.parse_args()
+
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+
+    fake = None
+    base_url = args.base_url
+    if args.local:
+        base_url, fake = start_local_backend(args)
+        print(f"[OK] Local backend on {base_url} (MongoDB: {args.mongo_uri or 'in-memory'}, fake Gemini "
+              f"{args.gemini_latency_ms:.0f}±{args.gemini_jitter_ms:.0f} ms, {args.gemini_error_rate:.1%} errors)")
+
+    corpus = load_corpus(args.corpus)
+    factory = RequestFactory(corpus, users=args.users, batch_size=args.batch_size, seed=args.seed)
+    runner = Runner(base_url, args.concurrency, args.timeout)
+
+    report = {
+        "run": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "base_url": base_url,
+            "local": args.local,
+            "mongo": (args.mongo_uri or "in-memory") if args.local else None,
+            "gemini": {"latency_ms": args.gemini_latency_ms, "jitter_ms": args.gemini_jitter_ms,
+                       "error_rate": args.gemini_error_rate} if args.local else None,
+            "corpus": args.corpus or "demo_driver.SAMPLE_CALLS",
+            "corpus_size": len(corpus),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "arrival": args.arrival if args.rate else "closed",
+            "python": sys.version.split()[0]
+        },
+        "endpoints": {}
+    }
+
+    for name in endpoints:
+        build = lambda: ENDPOINTS[name](factory)
+        if args.warmup:
+            runner.run_phase(build, args.warmup)
+        result = summarize(runner.run_phase(build, args.requests, args.rate, args.arrival, args.seed))
+        report["endpoints"][name] = result
+        latency = result["latency_ms"]
+        print(f"[{'OK' if not result['errors'] else 'X'}] {name:<20} "
+              f"p50 {latency.get('p50', 0):>8.1f}  p95 {latency.get('p95', 0):>8.1f}  p99 {latency.get('p99', 0):>8.1f} ms  "
+              f"{result['throughput_rps']:>7.1f} req/s  errors {result['errors']}/{result['requests']}")
+
+    if fake is not None:
+        report["run"]["gemini_requests"] = fake.stats()
+
+    output = args.output or os.path.join(
+        BACKEND_DIR, "load_results",
+        f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{report['run']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            print_comparison(report, json.load(f))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Per-process MongoDB client.
+
+pymongo clients are not fork-safe, so no client is created at import time. The
+first get_client() call in each process builds one (with connect=False, so
+nothing blocks until the first operation), and a process forked after that,
+e.g. a gunicorn worker from a preloaded master, gets its own client instead of
+inheriting its parent's.
+
+get_async_client() is the asyncio counterpart used by the ASGI app (asgi.py).
+
+Pool sizing comes from the "mongo" section of config.json:
+
+    {"database": "development", "max_pool_size": 50, "min_pool_size": 5,
+     "max_idle_time_ms": 300000, ...}
+"""
+
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import certifi
+from pymongo import MongoClient
+
+from Agents.first_responder_agent.utils import get_config
+
+_client = None
+_client_pid = None
+_async_client = None
+_async_client_pid = None
+_lock = threading.Lock()
+
+def mongo_settings():
+    return get_config().get("mongo", {})
+
+def client_options(settings):
+    """MongoClient keyword arguments for the configured pool and timeouts"""
+    return {
+        "maxPoolSize": settings.get("max_pool_size", 50),
+        "minPoolSize": settings.get("min_pool_size", 0),
+        "maxIdleTimeMS": settings.get("max_idle_time_ms"),
+        "serverSelectionTimeoutMS": settings.get("server_selection_timeout_ms", 5000),
+        "connectTimeoutMS": settings.get("connect_timeout_ms", 5000),
+        "socketTimeoutMS": settings.get("socket_timeout_ms", 5000),
+        "retryWrites": True,
+        "w": "majority"
+    }
+
+def tls_options(mongo_uri):
+    """certifi's CA bundle for TLS connections; nothing for a URI that turns TLS off (a local mongod)"""
+    if re.search(r'[?&](tls|ssl)=false', mongo_uri, re.IGNORECASE):
+        return {}
+    return {"tlsCAFile": certifi.where()}
+
+def get_client():
+    """This process's MongoClient, created on first use"""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _lock:
+            if _client is None or _client_pid != os.getpid():
+                mongo_uri = os.getenv('MONGO_URI')
+                if not mongo_uri:
+                    raise ValueError("MONGO_URI environment variable is not set")
+                # The parent's client (if any) is abandoned, not closed: closing it
+                # from a forked child would touch sockets the parent still owns
+                _client = MongoClient(
+                    mongo_uri,
+                    connect=False,
+                    **tls_options(mongo_uri),
+                    **client_options(mongo_settings())
+                )
+                _client_pid = os.getpid()
+    return _client
+
+def get_db():
+    return get_client()[mongo_settings().get("database", "development")]
+
+def get_async_client():
+    """
+    This process's AsyncMongoClient (pymongo's native asyncio driver), for the
+    ASGI serving mode. Like get_client() it is created on first use, after any
+    fork, and uses the same pool settings.
+    """
+    global _async_client, _async_client_pid
+    if _async_client is None or _async_client_pid != os.getpid():
+        from pymongo import AsyncMongoClient
+
+        mongo_uri = os.getenv('MONGO_URI')
+        if not mongo_uri:
+            raise ValueError("MONGO_URI environment variable is not set")
+        _async_client = AsyncMongoClient(
+            mongo_uri,
+            connect=False,
+            **tls_options(mongo_uri),
+            **client_options(mongo_settings())
+        )
+        _async_client_pid = os.getpid()
+    return _async_client
+
+def get_async_db():
+    return get_async_client()[mongo_settings().get("database", "development")]
+
+def warm_pool():
+    """
+    Ping the server and open min_pool_size connections up front, so the first
+    requests a worker serves do not wait on TCP/TLS handshakes.
+    """
+    client = get_client()
+    client.admin.command('ping')
+    connections = mongo_settings().get("min_pool_size", 0)
+    if connections > 1:
+        # Concurrent pings each check out their own connection
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            list(executor.map(lambda _: client.admin.command('ping'), range(connections)))
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Rebuild the per-day wellness buckets (wellness_aggregates) from call_records.
+
+Backfills history stored before the buckets existed, or repairs buckets that
+have drifted. The new buckets are swapped in with a rename, so the backend can
+keep serving while this runs.
+
+Usage:
+    python rebuild_wellness.py
+"""
+
+import argparse
+import sys
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild wellness_aggregates from call_records")
+    parser.parse_args()
+
+    from app import rebuild_wellness_aggregates
+
+    start = time.perf_counter()
+    buckets = rebuild_wellness_aggregates()
+    print(f"[OK] Rebuilt {buckets} wellness buckets in {time.perf_counter() - start:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
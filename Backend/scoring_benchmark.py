@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Offline micro-benchmarks for the per-call CPU work of scoring.
+
+Times code that runs on every call with no model, network or database in the
+way: the severity fallback (taken whenever Vertex AI is unavailable or sheds a
+request), the first scoring tier, wellness scores over a user's history and the
+chat keyword classifier. Inputs come from synthetic_corpus.py, generated from a
+seed or read from a corpus file, so runs are comparable across commits.
+
+Each benchmark calls its function once per input in every round, after
+unmeasured warm-up rounds, and reports the per-call min/max/mean/stddev/median
+and operations per second, as pytest-benchmark does.
+
+Usage:
+    python scoring_benchmark.py
+    python scoring_benchmark.py --transcripts 50000 --rounds 20 --only severity-fallback,chat-classifier
+    python scoring_benchmark.py --corpus transcripts.jsonl --output bench.json --compare previous.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+# Add parent directory to path for importing Agents
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agents.first_responder_agent.lexicon import get_lexicon
+from Agents.first_responder_agent.utils import (
+    InProcessTransport,
+    calculate_severity_score,
+    calculate_wellness_scores,
+    compute_wellness_from_buckets,
+    compute_wellness_scores,
+    fallback_severity,
+    fallback_severity_score,
+    first_tier_severity,
+    get_config,
+    get_local_model,
+    set_transport
+)
+from load_test import git_commit, load_corpus
+from synthetic_corpus import TranscriptGenerator, parse_mix
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def with_section(config, section, **settings):
+    return {**config, section: {**config.get(section, {}), **settings}}
+
+class Inputs:
+    """Benchmark inputs shared by every benchmark of a run"""
+
+    def __init__(self, args, config):
+        generator = TranscriptGenerator(seed=args.seed, mix=parse_mix(args.mix),
+                                        keyword_density=args.keyword_density, config=config)
+        if args.corpus:
+            records = load_corpus(args.corpus)[:args.transcripts]
+        else:
+            records = list(generator.transcripts(args.transcripts))
+        self.transcripts = [record["transcript"] for record in records]
+        self.messages = [record.get("message") or generator.chat_message()[1] for record in records]
+
+        # Per-user call histories (as the call-history endpoint returns them) and
+        # the per-day buckets the wellness-aggregates endpoint would compute from them
+        self.histories = defaultdict(list)
+        for call in generator.call_history(args.users, 31, args.calls_per_day):
+            self.histories[call["userID"]].append({"day": call["date"][:10], "severity_score": call["severityScore"]})
+        self.buckets = {}
+        for user_id, calls in self.histories.items():
+            days = {}
+            for call in calls:
+                bucket = days.setdefault(call["day"], {"day": call["day"], "severity_sum": 0, "call_count": 0})
+                bucket["severity_sum"] += call["severity_score"]
+                bucket["call_count"] += 1
+            self.buckets[user_id] = list(days.values())
+        self.users = sorted(self.histories)
+
+def severity_fallback(inputs, config):
+    """
+    calculate_severity_score end to end with no Google Cloud project, so every
+    call fails over to the keyword score. Triage is off so no transcript is
+    answered early, and admission is off so the rate limiter never waits.
+    """
+    os.environ.pop("GOOGLE_CLOUD_PROJECT", None)
+    config = with_section(config, "triage", enabled=False)
+    config = with_section(config, "severity_admission", enabled=False)
+    config = with_section(config, "local_model", enabled=False)
+    return lambda transcript: calculate_severity_score(transcript, "bench_user", config), inputs.transcripts
+
+def keyword_score(inputs, config):
+    return lambda transcript: fallback_severity_score(transcript, config), inputs.transcripts
+
+def local_model_score(inputs, config):
+    """The trained local model's single-transcript score, as the fallback takes it"""
+    if get_local_model(config) is None:
+        return None
+    return lambda transcript: fallback_severity(transcript, config), inputs.transcripts
+
+def first_tier(inputs, config):
+    return lambda transcript: first_tier_severity(transcript, config), inputs.transcripts
+
+def wellness_from_history(inputs, config):
+    """compute_wellness_scores over a user's full 31-day call history"""
+    return lambda user_id: compute_wellness_scores(inputs.histories[user_id], 50), inputs.users
+
+def wellness_from_buckets(inputs, config):
+    return lambda user_id: compute_wellness_from_buckets(inputs.buckets[user_id], [50]), inputs.users
+
+def wellness_in_process(inputs, config):
+    """
+    calculate_wellness_scores as it runs inside the backend: buckets are fetched
+    through the in-process transport, here served from memory instead of MongoDB
+    """
+    transport = InProcessTransport()
+    transport.add_route('/users/<user_id>/wellness-aggregates', 'GET',
+                        lambda data, user_id: ({"buckets": inputs.buckets[user_id]}, 200))
+    set_transport(transport)
+    return lambda user_id: calculate_wellness_scores(user_id, 50), inputs.users
+
+def chat_classifier(inputs, config):
+    """The keyword classification chat_with_gemini does before any reply is generated"""
+    from app import canned_chat_response
+
+    lexicon = get_lexicon("chat", config)
+
+    def classify(message):
+        matched = lexicon.find(message)
+        return "CRISIS_DETECTED" if matched.get("crisis") else canned_chat_response(matched)
+
+    return classify, inputs.messages
+
+BENCHMARKS = {
+    "severity-fallback": severity_fallback,
+    "keyword-score": keyword_score,
+    "local-model-score": local_model_score,
+    "first-tier": first_tier,
+    "wellness-history": wellness_from_history,
+    "wellness-buckets": wellness_from_buckets,
+    "wellness-in-process": wellness_in_process,
+    "chat-classifier": chat_classifier
+}
+
+def run_benchmark(func, inputs, rounds, warmup):
+    """Per-call timings in microseconds, one sample per round"""
+    for _ in range(warmup):
+        for item in inputs:
+            func(item)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in inputs:
+            func(item)
+        samples.append((time.perf_counter() - start) / len(inputs) * 1e6)
+    mean = statistics.fmean(samples)
+    return {
+        "calls_per_round": len(inputs),
+        "rounds": rounds,
+        "min_us": round(min(samples), 3),
+        "max_us": round(max(samples), 3),
+        "mean_us": round(mean, 3),
+        "stddev_us": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        "median_us": round(statistics.median(samples), 3),
+        "ops": round(1e6 / mean, 1) if mean else 0.0
+    }
+
+def print_comparison(report, baseline):
+    print(f"\nCompared with {baseline.get('run', {}).get('commit') or 'baseline'}:")
+    for name, current in report["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if not before:
+            continue
+        change = (current["mean_us"] - before["mean_us"]) / before["mean_us"] if before["mean_us"] else 0.0
+        print(f"  {name:<20} mean {before['mean_us']:>10.2f} -> {current['mean_us']:>10.2f} us ({change:+.0%})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks for severity, wellness and chat scoring")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"comma separated, from: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--corpus", help="JSONL transcripts to use instead of generated ones")
+    parser.add_argument("--transcripts", type=int, default=5000, help="transcripts and chat messages per round")
+    parser.add_argument("--users", type=int, default=500, help="call histories per round")
+    parser.add_argument("--calls-per-day", type=float, default=3.0)
+    parser.add_argument("--mix", help="severity tier weights (see synthetic_corpus.py)")
+    parser.add_argument("--keyword-density", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured rounds before timing")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="earlier results file to compare mean times with")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    # Per-call log lines would otherwise be most of what is measured
+    logging.getLogger("Agents.first_responder_agent").setLevel(logging.ERROR)
+
+    config = get_config()
+    inputs = Inputs(args, config)
+    report = {
+        "run": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "corpus": args.corpus or f"synthetic (seed {args.seed})",
+            "transcripts": len(inputs.transcripts),
+            "users": len(inputs.users),
+            "rounds": args.rounds,
+            "python": sys.version.split()[0]
+        },
+        "benchmarks": {}
+    }
+
+    print(f"{'Name':<20} {'Min':>10} {'Max':>10} {'Mean':>10} {'StdDev':>10} {'Median':>10} {'OPS':>12}  (us per call)")
+    for name in names:
+        setup = BENCHMARKS[name](inputs, config)
+        if setup is None:
+            print(f"[X] {name}: skipped (not available in this environment)")
+            continue
+        result = run_benchmark(*setup, args.rounds, args.warmup)
+        report["benchmarks"][name] = result
+        print(f"{name:<20} {result['min_us']:>10.2f} {result['max_us']:>10.2f} {result['mean_us']:>10.2f} "
+              f"{result['stddev_us']:>10.2f} {result['median_us']:>10.2f} {result['ops']:>12.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            print_comparison(report, json.load(f))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
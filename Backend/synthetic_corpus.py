@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic dispatch transcripts and call histories.
+
+Transcripts are assembled from per-severity incident templates, locations and
+radio phrasing, with high_risk_keywords from config.json mixed in at a
+controllable density. The same seed and settings always produce the same
+records, and records are generated lazily, so millions can be written without
+holding them in memory.
+
+Usage:
+    python synthetic_corpus.py transcripts --count 1000000 --output transcripts.jsonl
+    python synthetic_corpus.py transcripts --count 50000 --mix minor=0.7,moderate=0.2,critical=0.1 --keyword-density 2
+    python synthetic_corpus.py history --users 1000 --days 30 --calls-per-day 3 --output calls.jsonl
+
+Transcript records (each with a responder chat "message") feed load_test.py
+--corpus and scoring_benchmark.py; history records have the call_records
+shape and feed train_local_model.py train --input.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path for importing Agents
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agents.first_responder_agent.utils import get_config
+
+# Severity tiers of SEVERITY_PROMPT: score range, incident templates and how many
+# high-risk keywords a transcript of the tier carries at keyword density 1
+TIERS = {
+    "minor": {
+        "scores": (1, 20),
+        "keyword_weight": 0.1,
+        "incidents": [
+            "a minor fender bender at {location}. No injuries reported, just need an officer for the report.",
+            "a lift assist at {location}, elderly male on the floor, no injuries.",
+            "a noise complaint at {location}, loud music for the last two hours.",
+            "an alarm activation at {location}, keyholder en route, likely a false alarm.",
+            "a vehicle lockout at {location}, engine running, child seat empty.",
+            "a welfare check at {location}, neighbor has not seen the resident in two days."
+        ]
+    },
+    "moderate": {
+        "scores": (21, 40),
+        "keyword_weight": 0.5,
+        "incidents": [
+            "a dumpster fire behind {location}, no exposures.",
+            "an elderly person who fell at {location}, might have broken hip, conscious and breathing.",
+            "a two-vehicle accident at {location} with minor injuries, airbags deployed.",
+            "a shoplifting suspect detained by security at {location}, combative.",
+            "a brush fire along {location}, about a quarter acre, slow spread."
+        ]
+    },
+    "serious": {
+        "scores": (41, 60),
+        "keyword_weight": 1.0,
+        "incidents": [
+            "a house fire at {location}, smoke showing from the second floor.",
+            "a multi-car accident at {location}, at least 3 vehicles involved, multiple injuries reported.",
+            "an assault in progress at {location}, victim bleeding from the head.",
+            "a person unconscious at {location}, possible overdose, breathing shallow.",
+            "a motorcycle down at {location}, rider thrown, not wearing a helmet."
+        ]
+    },
+    "critical": {
+        "scores": (61, 80),
+        "keyword_weight": 2.0,
+        "incidents": [
+            "a structure fire at {location} with multiple families trapped on the second floor.",
+            "shots fired at {location}, one victim down, suspect fled on foot.",
+            "a head-on collision at {location} with entrapment, two patients critical.",
+            "an infant not breathing at {location}, caller doing CPR.",
+            "a domestic disturbance at {location}, weapon seen, children in the home."
+        ]
+    },
+    "catastrophic": {
+        "scores": (81, 100),
+        "keyword_weight": 3.0,
+        "incidents": [
+            "an active shooter at {location}, multiple shots fired, people are hiding.",
+            "an explosion at {location}, mass casualty incident declared.",
+            "a school bus rollover at {location} with multiple children injured.",
+            "an officer down at {location}, shooting ongoing, requesting all available units.",
+            "a building collapse at {location}, dozens unaccounted for."
+        ]
+    }
+}
+
+DEFAULT_MIX = {"minor": 0.4, "moderate": 0.3, "serious": 0.15, "critical": 0.1, "catastrophic": 0.05}
+
+OPENERS = ["911 dispatch, we have", "Dispatch to all units, respond to", "Caller reports", "Emergency! We have",
+           "Engine 7, Medic 3, respond to", "Units be advised, we have"]
+CLOSERS = ["Need immediate response!", "Units en route.", "Caller is hysterical.", "Requesting additional units.",
+           "ETA four minutes.", "Fire and EMS staged nearby.", "Caller is staying on the line.", ""]
+STREETS = ["Main Street", "Oak Street", "5th Avenue", "Elm Drive", "Highway 101", "Maple Court", "Riverside Boulevard",
+           "Cedar Lane", "Washington Avenue", "Industrial Parkway", "Lincoln Road", "Harbor Way"]
+PLACES = ["the downtown office building", "the Walmart parking lot", "Lincoln Elementary School", "the county fairgrounds",
+          "the train station", "the apartment complex", "the gas station", "the high school stadium"]
+KEYWORD_PHRASES = ["Caller mentions {keyword}.", "Possible {keyword} involved.", "Reports of {keyword} on scene.",
+                   "Dispatcher notes {keyword}."]
+
+# Responder chat messages: filler sentences, with a chat_keywords phrase for every mood but neutral
+CHAT_MOODS = {"neutral": 0.4, "positive": 0.3, "concern": 0.25, "crisis": 0.05}
+CHAT_FILLERS = ["That last call was a long one.", "We got back to the station around three.",
+                "My partner handled the family while I worked on the patient.", "I keep thinking about the scene.",
+                "Shift ends in a couple of hours.", "I haven't talked to anyone about it yet."]
+CHAT_PHRASES = ["Honestly I feel {keyword}.", "It's been {keyword} since then.", "I'm {keyword}, I think."]
+
+def parse_mix(text):
+    """Tier weights from "minor=0.6,critical=0.4"; unlisted tiers get weight 0"""
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(","):
+        tier, _, weight = part.partition("=")
+        tier = tier.strip()
+        if tier not in TIERS:
+            raise ValueError(f"Unknown severity tier {tier!r}; expected one of {', '.join(TIERS)}")
+        mix[tier] = float(weight)
+    if sum(mix.values()) <= 0:
+        raise ValueError("The severity mix needs at least one positive weight")
+    return mix
+
+def _poisson(rng, mean):
+    """Knuth's method; fine for the small means used here"""
+    if mean <= 0:
+        return 0
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+def _location(rng):
+    if rng.random() < 0.3:
+        return rng.choice(PLACES)
+    return f"{rng.randint(10, 9999)} {rng.choice(STREETS)}"
+
+class TranscriptGenerator:
+    def __init__(self, seed=0, mix=None, keyword_density=1.0, config=None):
+        config = config if config is not None else get_config()
+        self.rng = random.Random(seed)
+        self.mix = mix or dict(DEFAULT_MIX)
+        self.keyword_density = keyword_density
+        self.keywords = config.get("high_risk_keywords", [])
+        self.chat_keywords = config.get("chat_keywords", {})
+        self._tiers = list(self.mix)
+        self._weights = [self.mix[tier] for tier in self._tiers]
+
+    def transcript(self, tier=None):
+        """(tier, transcript, reference severity score, high-risk keywords mixed in)"""
+        rng = self.rng
+        tier = tier or rng.choices(self._tiers, self._weights)[0]
+        spec = TIERS[tier]
+        parts = [rng.choice(OPENERS), rng.choice(spec["incidents"]).format(location=_location(rng))]
+
+        keywords = []
+        if self.keywords:
+            for _ in range(_poisson(rng, self.keyword_density * spec["keyword_weight"])):
+                keyword = rng.choice(self.keywords)
+                keywords.append(keyword)
+                parts.append(rng.choice(KEYWORD_PHRASES).format(keyword=keyword))
+        parts.append(rng.choice(CLOSERS))
+        return tier, " ".join(part for part in parts if part), rng.randint(*spec["scores"]), keywords
+
+    def chat_message(self):
+        """(mood, message) for the chat endpoints; the mood is what the chat lexicon should match"""
+        rng = self.rng
+        mood = rng.choices(list(CHAT_MOODS), list(CHAT_MOODS.values()))[0]
+        parts = rng.sample(CHAT_FILLERS, rng.randint(1, 3))
+        if self.chat_keywords.get(mood):
+            parts.insert(rng.randrange(len(parts) + 1),
+                         rng.choice(CHAT_PHRASES).format(keyword=rng.choice(self.chat_keywords[mood])))
+        return mood, " ".join(parts)
+
+    def transcripts(self, count, users=1000, first_call_id=100000):
+        """Transcript corpus records for load_test.py and the micro-benchmarks"""
+        for index in range(count):
+            tier, transcript, score, keywords = self.transcript()
+            _, message = self.chat_message()
+            yield {
+                "transcript": transcript,
+                "call_id": first_call_id + index,
+                "user_id": f"user_{self.rng.randrange(users):05d}",
+                "severity_score": score,
+                "tier": tier,
+                "keywords": keywords,
+                "message": message
+            }
+
+    def call_history(self, users, days, calls_per_day, end=None, first_call_id=100000):
+        """
+        call_records documents for users over the last days days, about
+        calls_per_day per user per day, oldest day first
+        """
+        end = end or datetime.now().replace(microsecond=0)
+        call_id = first_call_id
+        for day in range(days - 1, -1, -1):
+            day_start = (end - timedelta(days=day)).replace(hour=0, minute=0, second=0)
+            for user in range(users):
+                for _ in range(_poisson(self.rng, calls_per_day)):
+                    tier, transcript, score, _ = self.transcript()
+                    date = min(day_start + timedelta(seconds=self.rng.randrange(86400)), end)
+                    yield {
+                        "callID": call_id,
+                        "userID": f"user_{user:05d}",
+                        "transcripts": transcript,
+                        "severityScore": score,
+                        "severitySource": "model",
+                        "date": date.isoformat()
+                    }
+                    call_id += 1
+
+def write_jsonl(records, path):
+    count = 0
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic transcripts and call histories")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    transcripts_parser = commands.add_parser("transcripts", help="transcript corpus for load tests and benchmarks")
+    transcripts_parser.add_argument("--count", type=int, default=100000)
+    transcripts_parser.add_argument("--users", type=int, default=1000)
+
+    history_parser = commands.add_parser("history", help="call_records documents over a date range")
+    history_parser.add_argument("--users", type=int, default=100)
+    history_parser.add_argument("--days", type=int, default=30)
+    history_parser.add_argument("--calls-per-day", type=float, default=3.0, help="mean calls per user per day")
+
+    for subparser in (transcripts_parser, history_parser):
+        subparser.add_argument("--output", required=True)
+        subparser.add_argument("--seed", type=int, default=0)
+        subparser.add_argument("--mix", help="severity tier weights, e.g. minor=0.6,serious=0.3,catastrophic=0.1")
+        subparser.add_argument("--keyword-density", type=float, default=1.0,
+                               help="scales the high-risk keywords per transcript (0 for none)")
+    args = parser.parse_args()
+
+    generator = TranscriptGenerator(seed=args.seed, mix=parse_mix(args.mix), keyword_density=args.keyword_density)
+    start = time.perf_counter()
+    if args.command == "transcripts":
+        count = write_jsonl(generator.transcripts(args.count, users=args.users), args.output)
+    else:
+        count = write_jsonl(generator.call_history(args.users, args.days, args.calls_per_day), args.output)
+    elapsed = time.perf_counter() - start
+    print(f"[OK] Wrote {count} records to {args.output} in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f}/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
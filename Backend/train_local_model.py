@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Train and run the local CPU severity model (Agents/first_responder_agent/local_model.py).
+
+The model is fitted to call_records whose severityScore came from Vertex AI
+(severitySource "model") and is used by the scoring fallback once saved. It
+needs only NumPy, so training from an export and backfills run fully offline.
+
+Usage:
+    python train_local_model.py train                          # train from call_records in MongoDB
+    python train_local_model.py train --input calls.jsonl      # train offline from exported records
+    python train_local_model.py export --output calls.jsonl    # export training records from MongoDB
+    python train_local_model.py backfill --input transcripts.jsonl --output scores.jsonl
+
+JSONL records carry "transcripts" (or "transcript") and, for training, "severityScore".
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path for importing Agents
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agents.first_responder_agent.utils import get_config, local_model_path
+
+def training_query(include_unlabeled=False):
+    """call_records with a numeric severityScore assigned by the model"""
+    query = {"severityScore": {"$type": "number"}, "transcripts": {"$type": "string"}}
+    if include_unlabeled:
+        # Records stored before severitySource existed may hold model or keyword scores
+        query["$or"] = [{"severitySource": "model"}, {"severitySource": {"$exists": False}}]
+    else:
+        query["severitySource"] = "model"
+    return query
+
+def records_from_db(include_unlabeled=False, limit=0):
+    from mongo import get_db
+
+    cursor = get_db()["call_records"].find(
+        training_query(include_unlabeled), {"_id": 0, "transcripts": 1, "severityScore": 1}
+    ).limit(limit)
+    return list(cursor)
+
+def read_jsonl(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def transcript_of(record):
+    return record.get("transcripts") or record.get("transcript") or ""
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and run the local severity model")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="fit the model and save it where the fallback loads it")
+    train_parser.add_argument("--input", help="JSONL records to train on instead of MongoDB")
+    train_parser.add_argument("--include-unlabeled", action="store_true",
+                              help="also train on records that predate severitySource")
+    train_parser.add_argument("--limit", type=int, default=0, help="maximum records to read from MongoDB")
+    train_parser.add_argument("--output", help="model directory (default: local_model.path in config.json)")
+
+    export_parser = commands.add_parser("export", help="write training records from MongoDB to JSONL")
+    export_parser.add_argument("--output", required=True)
+    export_parser.add_argument("--include-unlabeled", action="store_true")
+    export_parser.add_argument("--limit", type=int, default=0)
+
+    backfill_parser = commands.add_parser("backfill", help="score a JSONL of transcripts across processes")
+    backfill_parser.add_argument("--input", required=True)
+    backfill_parser.add_argument("--output", required=True, help="input records with localSeverityScore added")
+    backfill_parser.add_argument("--model", help="model directory (default: local_model.path in config.json)")
+    backfill_parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    config = get_config()
+    settings = config.get("local_model", {})
+
+    if args.command == "export":
+        records = records_from_db(args.include_unlabeled, args.limit)
+        with open(args.output, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        print(f"[OK] Exported {len(records)} records to {args.output}")
+        return 0
+
+    from Agents.first_responder_agent.local_model import LocalSeverityModel, score_in_processes, train
+
+    if args.command == "train":
+        records = read_jsonl(args.input) if args.input else records_from_db(args.include_unlabeled, args.limit)
+        records = [record for record in records
+                   if transcript_of(record) and isinstance(record.get("severityScore"), (int, float))]
+        if not records:
+            print("[X] No model-scored call records to train on")
+            return 1
+
+        start = time.perf_counter()
+        model, metrics = train(
+            [transcript_of(record) for record in records],
+            [record["severityScore"] for record in records],
+            validation_fraction=settings.get("validation_fraction", 0.2),
+            n_features=settings.get("n_features", 2 ** 18),
+            ngram_range=tuple(settings.get("ngram_range", [1, 2])),
+            alpha=settings.get("alpha", 1.0),
+            max_iter=settings.get("max_iter", 200)
+        )
+        path = args.output or local_model_path(config)
+        model.save(path)
+        print(f"[OK] Trained on {len(records)} records in {time.perf_counter() - start:.1f}s, saved to {path}")
+        if metrics.get("samples"):
+            print(f"     Held-out MAE {metrics['mean_abs_error']} on {metrics['samples']} records, "
+                  f"{metrics['within_10']:.0%} within 10 points")
+        return 0
+
+    # backfill
+    path = args.model or local_model_path(config)
+    LocalSeverityModel.load(path)  # fail fast if there is no trained model
+    records = read_jsonl(args.input)
+    start = time.perf_counter()
+    scores = score_in_processes(
+        [transcript_of(record) for record in records],
+        path,
+        workers=args.workers or settings.get("backfill_workers", 4),
+        chunk_size=settings.get("chunk_size", 2048)
+    )
+    with open(args.output, "w") as f:
+        for record, score in zip(records, scores):
+            f.write(json.dumps({**record, "localSeverityScore": score}) + "\n")
+    elapsed = time.perf_counter() - start
+    print(f"[OK] Scored {len(records)} transcripts in {elapsed:.1f}s ({len(records) / max(elapsed, 1e-9):.0f}/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Write-behind buffering for insert-only collections.
+
+A WriteBehindBuffer queues documents for one collection and a background
+thread writes them with insert_many(ordered=False) once max_batch documents
+are waiting or the oldest has waited max_delay_ms. Every submitted document
+gets a Future. A caller that must know the write landed waits on it; any other
+caller returns straight away.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from bson import ObjectId
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+class WriteBehindBuffer:
+    def __init__(self, collection, max_batch=100, max_delay_ms=50, max_queue=10000, write_concern=None,
+                 on_flush=None):
+        if write_concern is not None:
+            # Each buffer may relax (or tighten) the client's default write concern
+            collection = collection.with_options(write_concern=WriteConcern(**write_concern))
+        self.collection = collection
+        self.name = collection.name
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_queue = max_queue
+        # Called with the documents of each batch that were written successfully
+        self.on_flush = on_flush
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_requested = False
+        self._closed = False
+
+        self.flushed_batches = 0
+        self.flushed_documents = 0
+        self.failed_documents = 0
+        self.max_queue_depth = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+        self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, document, wait=False, timeout=None):
+        """
+        Queue a document for insertion and return its Future. The _id is assigned
+        up front so callers can reference the document before it is written.
+        With wait=True this blocks until the batch holding it has been written and
+        re-raises its write error.
+        """
+        document.setdefault("_id", ObjectId())
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"Write-behind buffer for {self.name} is closed")
+            # Backpressure: block producers rather than grow without bound
+            while len(self._queue) >= self.max_queue:
+                self._cond.wait()
+            self._queue.append((document, future, time.monotonic()))
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._cond.notify_all()
+
+        if wait:
+            future.result(timeout)
+        return future
+
+    def flush(self, timeout=None):
+        """Write everything queued so far and wait for it"""
+        with self._cond:
+            pending = [future for _, future, _ in self._queue]
+            self._flush_requested = True
+            self._cond.notify_all()
+        for future in pending:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass  # reported to whoever submitted the document
+
+    def close(self, timeout=None):
+        """Stop accepting documents, drain the queue and stop the flusher thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+
+                # Let the batch fill up until it is full or the oldest document is due
+                deadline = self._queue[0][2] + self.max_delay
+                while (len(self._queue) < self.max_batch and not self._flush_requested
+                       and not self._closed):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+                if not self._queue:
+                    self._flush_requested = False
+                self._cond.notify_all()
+
+            self._write(batch)
+
+    def _write(self, batch):
+        documents = [document for document, _, _ in batch]
+        errors = {}
+        start = time.perf_counter()
+        try:
+            self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                error_type = DuplicateKeyError if write_error.get("code") == 11000 else BulkWriteError
+                errors[write_error["index"]] = error_type(write_error.get("errmsg", "Write failed"))
+        except Exception as e:
+            errors = {index: e for index in range(len(documents))}
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._cond:
+            self.flushed_batches += 1
+            self.flushed_documents += len(documents) - len(errors)
+            self.failed_documents += len(errors)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+
+        if self.on_flush:
+            try:
+                self.on_flush([document for index, document in enumerate(documents) if index not in errors])
+            except Exception as e:
+                print(f"Write-behind on_flush for {self.name} failed: {e}")
+
+        for index, (_, future, _) in enumerate(batch):
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(documents[index]["_id"])
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "flushed_batches": self.flushed_batches,
+                "flushed_documents": self.flushed_documents,
+                "failed_documents": self.failed_documents,
+                "last_flush_ms": round(self.last_flush_ms, 2),
+                "max_flush_ms": round(self.max_flush_ms, 2),
+                "avg_flush_ms": round(self._total_flush_ms / self.flushed_batches, 2) if self.flushed_batches else 0.0
+            }
@@ -22,12 +22,19 @@ export default function Index() {
 	const textTranslateY = useRef(new Animated.Value(20)).current;
 	const ambientPulse = useRef(new Animated.Value(1)).current;
 	
-	// Polling function for chat triggers
-	const pollChatTriggers = async () => {
-		if (!pollingActive) return; // Stop polling if inactive
+	// Id of the last chat trigger received, so each long-poll resumes after it
+	const lastTriggerId = useRef<string | null>(null);
+	
+	// Long-poll for chat triggers: the request is held open until the backend
+	// pushes a trigger for this user or the wait expires. Returns whether to poll again.
+	const pollChatTriggers = async (): Promise<boolean> => {
+		if (!pollingActive) return false; // Stop polling if inactive
 		
 		try {
-			const response = await fetch(`http://localhost:5001/users/${userId}/calls`, {
+			const params = new URLSearchParams({ wait: '25' });
+			if (lastTriggerId.current) params.set('after', lastTriggerId.current);
+			
+			const response = await fetch(`http://localhost:5001/users/${userId}/chat-triggers?${params}`, {
 				method: 'GET',
 				headers: {
 					'Content-Type': 'application/json',
@@ -36,34 +43,37 @@ export default function Index() {
 			
 			if (response.ok) {
 				const data = await response.json();
-				console.log('🔍 Polling user calls...', data);
+				lastTriggerId.current = data.last_event_id || lastTriggerId.current;
 				
-				// Check if there are new calls (DEMO: Always trigger for demo)
-				if (data.calls && data.calls.length > 0) {
-					// For demo purposes, check if we have any calls and trigger
-					const latestCall = data.calls.sort((a, b) => 
-						new Date(b.timestamp || b.createdAt).getTime() - new Date(a.timestamp || a.createdAt).getTime()
-					)[0];
-					
-					console.log('DEMO MODE: NEW CALL DETECTED!', latestCall);
+				if (data.triggers && data.triggers.length > 0) {
+					const latestTrigger = data.triggers[data.triggers.length - 1];
+					console.log('Chat trigger received', latestTrigger);
 					
 					// Stop polling immediately
 					setPollingActive(false);
+					acknowledgeTrigger(latestTrigger.id);
 					
 					// Navigate to PostCallPause first, then to chat
 					router.push({
 						pathname: "/(modals)/post-call-pause",
 						params: {
-							incidentId: latestCall._id || latestCall.callId || 'demo_call_123',
-							severity: latestCall.severity ? latestCall.severity.toString() : '0.85',
+							incidentId: String(latestTrigger.call_id),
+							severity: (latestTrigger.severity_score / 100).toString(),
 							source: 'call_trigger',
-							triggerId: latestCall._id || 'demo_trigger_456'
+							triggerId: latestTrigger.id
 						}
 					});
+					return false;
 				}
+			} else {
+				// Back off instead of retrying a failing endpoint in a tight loop
+				await new Promise(resolve => setTimeout(resolve, 5000));
 			}
+			
+			// Nothing yet: wait for the next trigger
+			return true;
 		} catch (error) {
-			console.error('Error polling user calls:', error);
+			console.error('Error polling chat triggers:', error);
 			
 			// DEMO MODE: Simulate a trigger after 10 seconds if no real endpoint
 			console.log('🔍 No real endpoint - simulating demo trigger after 10 seconds...');
@@ -88,13 +98,14 @@ export default function Index() {
 					});
 				}
 			}, 10000); // 10 seconds delay
+			return false;
 		}
 	};
 	
 	// Function to acknowledge a trigger (mark as seen)
 	const acknowledgeTrigger = async (triggerId: string) => {
 		try {
-			await fetch(`/users/${userId}/chat-triggers/${triggerId}/acknowledge`, {
+			await fetch(`http://localhost:5001/users/${userId}/chat-triggers/${triggerId}/acknowledge`, {
 				method: 'POST',
 				headers: {
 					'Content-Type': 'application/json',
@@ -201,13 +212,16 @@ export default function Index() {
 			}
 		}, 10000); // 10 seconds
 		
-		// Also try the real polling for backup
-		pollChatTriggers();
-		const pollingInterval = setInterval(pollChatTriggers, 10000);
+		// Also listen for real chat triggers
+		let listening = true;
+		const listen = async () => {
+			while (listening && await pollChatTriggers()) {}
+		};
+		listen();
 		
 		return () => {
+			listening = false;
 			clearTimeout(demoTrigger);
-			clearInterval(pollingInterval);
 		};
 	}, [userId, pollingActive]);
 	return (